@@ -1,26 +1,174 @@
 #ifndef INCLUDE_BENCHMARK_ENGINE_H_
 #define INCLUDE_BENCHMARK_ENGINE_H_
 
+#include <cassert>
+#include <algorithm>
 #include <set>
+#include <span>
 #include <utility>
 #include <vector>
 #include "engine_interface.h"
 #include "engine_types.h"
+#include "order_index.h"
+#include "trader_index.h"
 
 namespace cupid {
 // This is a basic implementation used as the benchmark lower bound
 class benchmark_engine : public engine_interface<benchmark_engine> {
  public:
+  using engine_interface<benchmark_engine>::limit;
+
   benchmark_engine();
-  std::pair<orderid_t, std::vector<execution_t>> limit(order_t order) noexcept;
+  template <typename Sink>
+  orderid_t limit(order_t order, Sink &&sink) noexcept;
   bool cancel(orderid_t orderid) noexcept;
+  std::size_t cancel_all(const trader_t &trader, side_t side = side_t::invalid, const instr_t &instr = {}) noexcept;
+  template <typename Sink>
+  orderid_t modify(orderid_t orderid, price_t px, quantity_t qty, Sink &&sink) noexcept;
+  std::size_t depth(side_t side, std::span<price_level_t> levels) const noexcept;
+  [[nodiscard]] bool resting(orderid_t orderid) const noexcept { return locations.find(orderid) != nullptr; }
+  void skip_orderid() noexcept { ++next_orderid; }
 
  private:
+  // whether the resting orders an incoming order on 'side' limited to 'px' would cross add up to 'qty'
+  [[nodiscard]] bool can_fill(side_t side, price_t px, quantity_t qty) const noexcept;
+
   orderid_t next_orderid;
   std::set<order_t> bid_side;
   std::set<order_t> ask_side;
+  // position of each resting order in its side, and its slot in traders
+  struct location {
+    std::set<order_t>::iterator position;
+    pooled_trader_index::slot_t trader_slot;
+  };
+  order_index<location> locations;
+  // resting orders of each trader, walked by cancel_all
+  pooled_trader_index traders;
 };
 
+template <typename Sink>
+orderid_t benchmark_engine::limit(order_t order, Sink &&sink) noexcept {
+  orderid_t curr_id = next_orderid++;
+  order.id = curr_id;
+  price_t px = order.limit_px();
+  assert(order.qty > 0);
+  if (order.tif == time_in_force::fok && !can_fill(order.side, px, order.qty)) {
+    // killed without touching the book
+    return curr_id;
+  }
+  if (order.side == side_t::bid) {
+    for (auto ask_it = ask_side.begin(); ask_it != ask_side.end();) {
+      if (ask_it->px > px) {
+        // bid order rest on book
+        break;
+      } else {
+        self_trade_cut cut;
+        if (ask_it->trader == order.trader && order.stp != self_trade_prevention::none) [[unlikely]] {
+          // no trade, quantity is cancelled off either order or both instead
+          cut = prevent_self_trade(order.stp, order.qty, ask_it->qty);
+          if constexpr (reports_self_trades<Sink>) {
+            sink(cut, *ask_it);
+          }
+        } else {
+          // match happen
+          price_t traded_px = ask_it->px;
+          quantity_t traded_qty = std::min(ask_it->qty, order.qty);
+          sink(fill_t{ask_it->id, curr_id, traded_px, traded_qty, side_t::bid}, *ask_it);
+          cut = {traded_qty, traded_qty};
+        }
+        auto node = ask_side.extract(ask_it++);
+        node.value().qty -= cut.resting_qty;
+        // ask_it->qty -= traded_qty;
+        order.qty -= cut.incoming_qty;
+        if (node.value().qty == 0) {
+          // fully filled
+          traders.erase(locations.find(node.value().id)->trader_slot);
+          locations.erase(node.value().id);
+        } else {
+          // the node is reinserted, so the resting order moves to a new iterator
+          auto res = ask_side.insert(std::move(node));
+          locations.find(res.position->id)->position = res.position;
+        }
+        if (order.qty == 0) {
+          // full executed
+          break;
+        }
+      }
+    }
+    if (order.qty > 0 && order.rests()) {
+      locations.insert(curr_id, {bid_side.insert(order).first, traders.insert(curr_id, order.trader)});
+    }
+  } else {
+    for (auto bid_it = bid_side.begin(); bid_it != bid_side.end();) {
+      if (bid_it->px < px) {
+        // ask order rest on book
+        break;
+      } else {
+        self_trade_cut cut;
+        if (bid_it->trader == order.trader && order.stp != self_trade_prevention::none) [[unlikely]] {
+          // no trade, quantity is cancelled off either order or both instead
+          cut = prevent_self_trade(order.stp, order.qty, bid_it->qty);
+          if constexpr (reports_self_trades<Sink>) {
+            sink(cut, *bid_it);
+          }
+        } else {
+          // match happen
+          price_t traded_px = bid_it->px;
+          quantity_t traded_qty = std::min(bid_it->qty, order.qty);
+          sink(fill_t{bid_it->id, curr_id, traded_px, traded_qty, side_t::ask}, *bid_it);
+          cut = {traded_qty, traded_qty};
+        }
+        // bid_it->qty -= traded_qty;
+        auto node = bid_side.extract(bid_it++);
+        node.value().qty -= cut.resting_qty;
+        order.qty -= cut.incoming_qty;
+        if (node.value().qty == 0) {
+          // fully filled
+          traders.erase(locations.find(node.value().id)->trader_slot);
+          locations.erase(node.value().id);
+        } else {
+          // the node is reinserted, so the resting order moves to a new iterator
+          auto res = bid_side.insert(std::move(node));
+          locations.find(res.position->id)->position = res.position;
+        }
+        if (order.qty == 0) {
+          // full executed
+          break;
+        }
+      }
+    }
+    if (order.qty > 0 && order.rests()) {
+      locations.insert(curr_id, {ask_side.insert(order).first, traders.insert(curr_id, order.trader)});
+    }
+  }
+  return curr_id;
+}
+
+template <typename Sink>
+orderid_t benchmark_engine::modify(orderid_t orderid, price_t px, quantity_t qty, Sink &&sink) noexcept {
+  assert(qty > 0);
+  location *loc = locations.find(orderid);
+  if (loc == nullptr) {
+    return 0;
+  }
+  std::set<order_t> &side = loc->position->side == side_t::bid ? bid_side : ask_side;
+  auto node = side.extract(loc->position);
+  if (px == node.value().px && qty <= node.value().qty) {
+    // reduced in place, (px, id) is unchanged so the order keeps its time priority
+    node.value().qty = qty;
+    loc->position = side.insert(std::move(node)).position;
+    return orderid;
+  }
+  // re-queued under a new id
+  order_t order = node.value();
+  traders.erase(loc->trader_slot);
+  locations.erase(orderid);
+  order.px = px;
+  order.qty = qty;
+  orderid_t requeued = limit(order, std::forward<Sink>(sink));
+  return locations.find(requeued) != nullptr ? requeued : 0;
+}
+
 }  // namespace cupid
 
 #endif  // INCLUDE_BENCHMARK_ENGINE_H_
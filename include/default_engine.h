@@ -1,30 +1,215 @@
 #ifndef INCLUDE_DEFAULT_ENGINE_H_
 #define INCLUDE_DEFAULT_ENGINE_H_
 
-#include <set>
+#include <cassert>
+#include <algorithm>
+#include <cstdint>
+#include <ranges>
+#include <span>
 #include <utility>
 #include <vector>
-#include <unordered_set>
 #include "engine_interface.h"
 #include "engine_types.h"
+#include "order_index.h"
+#include "trader_index.h"
 
 namespace cupid {
 
+// where the top of book sits in the vector of each side
+enum class top_of_book : int8_t { front = 0, back = 1 };
+
+// Each side is a contiguous vector of resting orders sorted on price-time priority, Top choosing
+// which end holds the top of book. With the top of book at the front, a fully filled order is erased
+// from the front and the orders behind it shift; at the back it is popped in O(1), and resting an
+// order near the top of book only shifts the few orders ahead of it.
 // Nasdaq match engine spec section F:
 // https://www.sec.gov/files/rules/other/nasdaqllcf1a4_5/e_sysdesc.pdf
-class default_engine : public engine_interface<default_engine> {
+template <top_of_book Top>
+class sorted_vector_engine : public engine_interface<sorted_vector_engine<Top>> {
  public:
-  default_engine();
-  std::pair<orderid_t, std::vector<execution_t>> limit(order_t order) noexcept;
+  using engine_interface<sorted_vector_engine<Top>>::limit;
+
+  sorted_vector_engine();
+  template <typename Sink>
+  orderid_t limit(order_t order, Sink &&sink) noexcept;
   bool cancel(orderid_t orderid) noexcept;
+  std::size_t cancel_all(const trader_t &trader, side_t side = side_t::invalid, const instr_t &instr = {}) noexcept;
+  template <typename Sink>
+  orderid_t modify(orderid_t orderid, price_t px, quantity_t qty, Sink &&sink) noexcept;
+  std::size_t depth(side_t side, std::span<price_level_t> levels) const noexcept;
+  [[nodiscard]] bool resting(orderid_t orderid) const noexcept { return locations.find(orderid) != nullptr; }
+  void skip_orderid() noexcept { ++next_orderid; }
 
  private:
+  // whether the resting orders an incoming order on 'side' limited to 'px' would cross add up to 'qty'
+  [[nodiscard]] bool can_fill(side_t side, price_t px, quantity_t qty) const noexcept;
+
+  // the fields of a resting order the matching loop walks, the others are kept in its location
+  struct book_entry {
+    orderid_t id;
+    price_t px;
+    quantity_t qty;
+    // fits in the padding after qty, so self-trade prevention compares it without a lookup
+    trader_t trader;
+  };
+
+  // whether 'o1' sorts before 'o2' in the vector of 'Side'
+  template <side_t Side>
+  static bool sorts_before(const book_entry &o1, const book_entry &o2) noexcept {
+    // price-time priority, a better price first and within one price the oldest order first
+    auto ahead = [](const book_entry &l, const book_entry &r) {
+      return (Side == side_t::bid ? l.px > r.px : l.px < r.px) || (l.px == r.px && l.id < r.id);
+    };
+    return Top == top_of_book::front ? ahead(o1, o2) : ahead(o2, o1);
+  }
+  // the resting orders of a side from top of book down
+  static auto from_top(const std::vector<book_entry> &book) noexcept {
+    if constexpr (Top == top_of_book::front) {
+      return std::views::all(book);
+    } else {
+      return std::views::reverse(book);
+    }
+  }
+  static book_entry &top(std::vector<book_entry> &book) noexcept {
+    return Top == top_of_book::front ? book.front() : book.back();
+  }
+  static void pop_top(std::vector<book_entry> &book) noexcept {
+    if constexpr (Top == top_of_book::front) {
+      book.erase(book.begin());
+    } else {
+      book.pop_back();
+    }
+  }
+  // trade 'order' against the resting orders of the other side it crosses, top of book first
+  template <side_t Side, typename Sink>
+  void match(order_t &order, price_t px, Sink &sink) noexcept;
+
   orderid_t next_orderid;
-  // ordered from top of book to depth of book based on price-time priority
-  std::vector<order_t> bid_side;
-  std::vector<order_t> ask_side;
+  // sorted on price-time priority, the top of book at the Top end
+  std::vector<book_entry> bid_side;
+  std::vector<book_entry> ask_side;
+  // price of each resting order, its position is then found by binary search on (px, id)
+  // the attributes only needed to report a fill are kept here rather than in the sides, and so is
+  // the slot of the order in traders
+  struct location {
+    price_t px;
+    side_t side;
+    instr_t instr;
+    stp_t stp;
+    pooled_trader_index::slot_t trader_slot;
+  };
+  order_index<location> locations;
+  // resting orders of each trader, walked by cancel_all
+  pooled_trader_index traders;
+
+  // position of a resting order in its side, found by binary search on (px, id)
+  typename std::vector<book_entry>::iterator find_entry(orderid_t orderid, const location &loc) noexcept;
+  // reassemble a resting order, only done to report its fills
+  order_t to_order(const book_entry &entry) noexcept {
+    const location *loc = locations.find(entry.id);
+    assert(loc != nullptr);
+    // only day limit orders rest
+    return {entry.id,   entry.px,     entry.qty,         loc->side,
+            loc->instr, entry.trader, order_type::limit, time_in_force::day, loc->stp};
+  }
 };
 
+using default_engine = sorted_vector_engine<top_of_book::front>;
+using reverse_vector_engine = sorted_vector_engine<top_of_book::back>;
+
+template <top_of_book Top>
+template <side_t Side, typename Sink>
+void sorted_vector_engine<Top>::match(order_t &order, price_t px, Sink &sink) noexcept {
+  // a bid trades against the asks and the other way round
+  std::vector<book_entry> &book = Side == side_t::bid ? ask_side : bid_side;
+  while (!book.empty()) {
+    book_entry &resting = top(book);
+    if (Side == side_t::bid ? resting.px > px : resting.px < px) {
+      // the rest of the order rests on book
+      break;
+    }
+    if (resting.trader == order.trader && order.stp != self_trade_prevention::none) [[unlikely]] {
+      // no trade, quantity is cancelled off either order or both instead
+      self_trade_cut cut = prevent_self_trade(order.stp, order.qty, resting.qty);
+      if constexpr (reports_self_trades<Sink>) {
+        sink(cut, to_order(resting));
+      }
+      order.qty -= cut.incoming_qty;
+      resting.qty -= cut.resting_qty;
+    } else {
+      // match happens
+      quantity_t traded_qty = std::min(resting.qty, order.qty);
+      sink(fill_t{resting.id, order.id, resting.px, traded_qty, Side}, to_order(resting));
+      order.qty -= traded_qty;
+      resting.qty -= traded_qty;
+    }
+    if (resting.qty == 0) {
+      traders.erase(locations.find(resting.id)->trader_slot);
+      locations.erase(resting.id);
+      pop_top(book);
+    }
+    if (order.qty == 0) {
+      // incoming order fully executed
+      break;
+    }
+  }
+}
+
+template <top_of_book Top>
+template <typename Sink>
+orderid_t sorted_vector_engine<Top>::limit(order_t order, Sink &&sink) noexcept {
+  orderid_t curr_id = next_orderid++;
+  order.id = curr_id;
+  price_t px = order.limit_px();
+  assert(order.qty > 0);
+  if (order.tif == time_in_force::fok && !can_fill(order.side, px, order.qty)) {
+    // killed without touching the book
+    return curr_id;
+  }
+  if (order.side == side_t::bid) {
+    match<side_t::bid>(order, px, sink);
+  } else {
+    match<side_t::ask>(order, px, sink);
+  }
+  if (order.qty > 0 && order.rests()) {
+    // not fully executed, rest on book behind the orders of the same price
+    locations.insert(curr_id, {px, order.side, order.instr, order.stp, traders.insert(curr_id, order.trader)});
+    book_entry entry{curr_id, px, order.qty, order.trader};
+    if (order.side == side_t::bid) {
+      bid_side.insert(std::lower_bound(bid_side.begin(), bid_side.end(), entry, sorts_before<side_t::bid>), entry);
+    } else {
+      ask_side.insert(std::lower_bound(ask_side.begin(), ask_side.end(), entry, sorts_before<side_t::ask>), entry);
+    }
+  }
+  return curr_id;
+}
+
+template <top_of_book Top>
+template <typename Sink>
+orderid_t sorted_vector_engine<Top>::modify(orderid_t orderid, price_t px, quantity_t qty, Sink &&sink) noexcept {
+  assert(qty > 0);
+  const location *loc = locations.find(orderid);
+  if (loc == nullptr) {
+    return 0;
+  }
+  std::vector<book_entry> &side = loc->side == side_t::bid ? bid_side : ask_side;
+  auto it = find_entry(orderid, *loc);
+  if (px == loc->px && qty <= it->qty) {
+    // reduced in place, the order keeps its time priority
+    it->qty = qty;
+    return orderid;
+  }
+  // re-queued under a new id behind the orders already resting at the new price
+  order_t order = to_order(*it);
+  side.erase(it);
+  traders.erase(loc->trader_slot);
+  locations.erase(orderid);
+  order.px = px;
+  order.qty = qty;
+  orderid_t requeued = limit(order, std::forward<Sink>(sink));
+  return locations.find(requeued) != nullptr ? requeued : 0;
+}
+
 }  // namespace cupid
 
 #endif  // INCLUDE_DEFAULT_ENGINE_H_
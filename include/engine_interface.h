@@ -3,25 +3,105 @@
 #ifndef INCLUDE_ENGINE_INTERFACE_H_
 #define INCLUDE_ENGINE_INTERFACE_H_
 
+#include <cassert>
+#include <span>
+#include <type_traits>
 #include <utility>
 #include <vector>
 #include "engine_types.h"
 
 namespace cupid {
 
+// whether a sink also takes the cuts of self-trade prevention, see engine_interface::limit
+template <typename Sink>
+constexpr bool reports_self_trades = std::is_invocable_v<Sink &, const self_trade_cut &, const order_t &>;
+
+// one callable out of several lambdas, for a sink taking both fills and self-trade cuts
+template <typename... Fns>
+struct overloaded : Fns... {
+  using Fns::operator()...;
+};
+
 template <typename Impl>
 class engine_interface {
  public:
-  // TODO(yukunj) get rid of the dynamic array std::vector for reporting how many
-  // resting orders are executed the passive side matched should be reported
-  // first in the returned vector
+  // fills are handed to the caller supplied sink as they happen, invoked as
+  // sink(const fill_t &fill, const order_t &resting) once per match in matching order.
+  // The sink is a template parameter, so it is inlined into the matching loop and
+  // reporting costs no allocation. A sink also invocable as sink(const self_trade_cut &cut, const order_t &resting)
+  // is handed every cut self-trade prevention makes instead of a trade, before it is taken off the orders.
+  // Returns the id assigned to the order, or 0 if the engine rejects it
+  template <typename Sink>
+  orderid_t limit(order_t order, Sink &&sink) noexcept {
+    return impl().limit(order, std::forward<Sink>(sink));
+  }
+  // convenience adapter expanding every fill into an execution_t for each side, the
+  // passive side matched is reported first in the returned vector
   [[nodiscard]] std::pair<orderid_t, std::vector<execution_t>> limit(order_t order) noexcept {
-    return impl().limit(order);
+    std::vector<execution_t> execs;
+    orderid_t orderid = impl().limit(order, [&execs, &order](const fill_t &fill, const order_t &resting) {
+      execs.push_back({fill.resting_id, fill.px, fill.qty, resting.side, resting.instr, resting.trader});
+      execs.push_back({fill.aggressor_id, fill.px, fill.qty, fill.aggressor_side, order.instr, order.trader});
+    });
+    return {orderid, std::move(execs)};
   }
   // return True if the order is located and cancelled successfully
   bool cancel(orderid_t orderid) noexcept { return impl().cancel(orderid); }
+  // cancel every resting order of 'trader', only those on 'side' unless it is side_t::invalid and
+  // only those on 'instr' unless it is empty, return how many were cancelled. Costs as many steps
+  // as the trader has resting orders, whatever the size of the book
+  std::size_t cancel_all(const trader_t &trader, side_t side = side_t::invalid, const instr_t &instr = {}) noexcept {
+    return impl().cancel_all(trader, side, instr);
+  }
+  // change the price and quantity of a resting order, return the id it rests under or 0 if it is
+  // not resting. Reducing the quantity at the same price happens in place and keeps the time
+  // priority and the id. A new price or a larger quantity re-queues the order as a new limit order
+  // under a new id, which may trade, its fills and cuts are handed to the sink as in limit. A re-queued order
+  // which trades entirely still uses up the new id, as the aggressor of its fills, but returns 0
+  template <typename Sink>
+  orderid_t modify(orderid_t orderid, price_t px, quantity_t qty, Sink &&sink) noexcept {
+    return impl().modify(orderid, px, qty, std::forward<Sink>(sink));
+  }
+  // whether the order rests on book
+  [[nodiscard]] bool resting(orderid_t orderid) const noexcept { return impl().resting(orderid); }
+  // use up the next order id without an order, for a limit order rejected before it reaches the engine,
+  // so the ids of the later orders stay those the order flow counted
+  void skip_orderid() noexcept { impl().skip_orderid(); }
+  // the best price levels of a side from top of book down, at most levels.size() of them,
+  // return how many were written
+  std::size_t depth(side_t side, std::span<price_level_t> levels) const noexcept {
+    return impl().depth(side, levels);
+  }
+  // run a batch of actions in order, with fills handed to the sink as in limit. results[i] receives
+  // what limit returns for the limit order of actions[i], or for a cancel the cancelled id if the order
+  // was found and 0 otherwise, while a reject uses up an id and receives 0. While an action runs, the
+  // book locations touched by the action PREFETCH_DISTANCE places ahead are prefetched
+  template <typename Sink>
+  void submit(std::span<const action_t> actions, std::span<orderid_t> results, Sink &&sink) noexcept {
+    assert(results.size() >= actions.size());
+    for (std::size_t i = 0; i < actions.size(); ++i) {
+      if (i + PREFETCH_DISTANCE < actions.size()) {
+        impl().prefetch(actions[i + PREFETCH_DISTANCE]);
+      }
+      const action_t &action = actions[i];
+      if (action.is_limit()) {
+        results[i] = impl().limit(action.order, sink);
+      } else if (action.is_cancel()) {
+        results[i] = impl().cancel(action.cancel_id) ? action.cancel_id : 0;
+      } else if (action.is_reject()) {
+        impl().skip_orderid();
+        results[i] = 0;
+      } else {
+        results[i] = 0;
+      }
+    }
+  }
+  // hint that 'action' comes soon, engines hide it to pull the parts of their book it touches into cache
+  void prefetch(const action_t &) const noexcept {}
 
  protected:
+  constexpr static std::size_t PREFETCH_DISTANCE = 4;
+
   engine_interface() = default;
   ~engine_interface() = default;
 
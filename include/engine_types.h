@@ -1,8 +1,11 @@
 #ifndef INCLUDE_ENGINE_TYPES_H_
 #define INCLUDE_ENGINE_TYPES_H_
 
+#include <cassert>
+#include <algorithm>
 #include <array>
 #include <cstdint>
+#include <limits>
 #include <type_traits>
 
 namespace cupid {
@@ -25,6 +28,53 @@ using instr_t = std::array<char, INSTRUMENT_LEN>;
 constexpr static std::size_t TRADER_LEN = 4;
 using trader_t = std::array<char, TRADER_LEN>;
 
+// a market order trades at any price
+enum class order_type : int8_t { limit = 0, market = 1 };
+using order_type_t = order_type;
+
+// what happens to the quantity left once an order has matched all it could:
+// day rests on book, ioc (immediate or cancel) is dropped, and a fok (fill or kill) order is
+// rejected up front unless it can be filled entirely
+enum class time_in_force : int8_t { day = 0, ioc = 1, fok = 2 };
+using tif_t = time_in_force;
+
+// what an incoming order does instead of trading against a resting order of the same trader:
+// cancel_newest cancels the rest of the incoming order, cancel_oldest cancels the resting one and
+// goes on matching, cancel_both cancels both, and decrement takes the smaller quantity off both,
+// cancelling whichever is left empty. none lets the trader trade with themselves. The fill or kill
+// check counts the trader's own resting orders, so a fok order may still be cut short by prevention
+enum class self_trade_prevention : int8_t {
+  none = 0,
+  cancel_newest = 1,
+  cancel_oldest = 2,
+  cancel_both = 3,
+  decrement = 4,
+};
+using stp_t = self_trade_prevention;
+
+// quantities taken off an incoming order and the resting order of the same trader it meets
+struct self_trade_cut {
+  quantity_t incoming_qty;
+  quantity_t resting_qty;
+};
+
+constexpr self_trade_cut prevent_self_trade(stp_t stp, quantity_t incoming_qty, quantity_t resting_qty) noexcept {
+  switch (stp) {
+    case self_trade_prevention::cancel_newest:
+      return {incoming_qty, 0};
+    case self_trade_prevention::cancel_oldest:
+      return {0, resting_qty};
+    case self_trade_prevention::cancel_both:
+      return {incoming_qty, resting_qty};
+    case self_trade_prevention::decrement:
+      return {std::min(incoming_qty, resting_qty), std::min(incoming_qty, resting_qty)};
+    default:
+      // not a mode, both orders still lose what a trade would take so the matching loops go on
+      assert(false);
+      return {std::min(incoming_qty, resting_qty), std::min(incoming_qty, resting_qty)};
+  }
+}
+
 struct order {
   orderid_t id;  // filled and assigned after order acceptance
   price_t px;
@@ -32,6 +82,19 @@ struct order {
   side_t side;
   instr_t instr;
   trader_t trader;
+  order_type_t type = order_type::limit;
+  tif_t tif = time_in_force::day;
+  stp_t stp = self_trade_prevention::none;  // only the incoming order's applies
+
+  // the worst price the order may trade at
+  [[nodiscard]] constexpr price_t limit_px() const noexcept {
+    if (type == order_type::market) {
+      return side == side_t::bid ? std::numeric_limits<price_t>::max() : 0;
+    }
+    return px;
+  }
+  // whether the unfilled quantity rests on book
+  [[nodiscard]] constexpr bool rests() const noexcept { return type == order_type::limit && tif == time_in_force::day; }
 
   bool operator==(const order &) const = default;
   bool operator<(const order &rhs) const {
@@ -45,6 +108,73 @@ static_assert(std::is_trivially_copyable_v<order>);
 using order_t = order;
 using execution_t = order_t;
 
+// Compact report of one match, emitted once per fill instead of an execution_t for each side.
+// The remaining attributes of the aggressor are those of the submitted order, and those of the
+// resting order are handed to the sink alongside the fill for the consumers which need them.
+struct fill {
+  orderid_t resting_id;
+  orderid_t aggressor_id;
+  price_t px;
+  quantity_t qty;
+  side_t aggressor_side;
+
+  bool operator==(const fill &) const = default;
+};
+static_assert(sizeof(fill) <= sizeof(order));
+static_assert(std::is_trivially_copyable_v<fill>);
+
+using fill_t = fill;
+
+// aggregate of the orders resting at one price
+struct price_level {
+  price_t px;
+  uint64_t qty;
+  uint32_t count;
+
+  bool operator==(const price_level &) const = default;
+};
+
+using price_level_t = price_level;
+
+enum class level_update_type : int8_t { add = 0, change = 1, remove = 2 };
+
+// new state of a price level once an action is done, qty and count are the level's aggregates
+struct level_update {
+  level_update_type type;
+  side_t side;
+  price_t px;
+  uint64_t qty;
+  uint32_t count;
+
+  bool operator==(const level_update &) const = default;
+};
+static_assert(std::is_trivially_copyable_v<level_update>);
+
+using level_update_t = level_update;
+
+enum class action_type : int8_t {
+  limit = 0,
+  cancel = 1,
+  reject = 2,
+};
+
+// one step of an order flow, either a limit order to submit or the id of an order to cancel, or a
+// limit order rejected before it reached the engine, which only uses up its order id
+struct order_action {
+  action_type action;
+  order_t order;
+  orderid_t cancel_id;
+
+  [[nodiscard]] constexpr bool is_limit() const noexcept { return action == action_type::limit; }
+
+  [[nodiscard]] constexpr bool is_cancel() const noexcept { return action == action_type::cancel; }
+
+  [[nodiscard]] constexpr bool is_reject() const noexcept { return action == action_type::reject; }
+};
+static_assert(std::is_trivially_copyable_v<order_action>);
+
+using action_t = order_action;
+
 }  // namespace cupid
 
 #endif  // INCLUDE_ENGINE_TYPES_H_
@@ -0,0 +1,195 @@
+#ifndef INCLUDE_FLAT_MAP_ENGINE_H_
+#define INCLUDE_FLAT_MAP_ENGINE_H_
+
+#include <cassert>
+#include <algorithm>
+#include <cstddef>
+#include <cstdint>
+#include <span>
+#include <utility>
+#include <vector>
+#include "engine_interface.h"
+#include "engine_types.h"
+#include "order_index.h"
+#include "order_pool.h"
+#include "trader_index.h"
+
+namespace cupid {
+
+// Price levels of each side are kept in a sorted flat vector, ordered from depth of book to top of
+// book so that the best level is at the back and is popped in O(1) once filled. Each level is a FIFO
+// queue of resting orders linked through a preallocated order_pool.
+// Unlike ladder_engine any price may rest, and unlike benchmark_engine the sorted structure holds
+// levels rather than orders: finding the level of an order is a binary search over contiguous
+// levels, and opening a level near the top of book only shifts the few levels ahead of it.
+class flat_map_engine : public engine_interface<flat_map_engine> {
+ public:
+  using engine_interface<flat_map_engine>::limit;
+
+  constexpr static std::size_t DEFAULT_ORDER_CAPACITY = 1 << 16;
+
+  flat_map_engine();
+  explicit flat_map_engine(std::size_t order_capacity);
+  template <typename Sink>
+  orderid_t limit(order_t order, Sink &&sink) noexcept;
+  bool cancel(orderid_t orderid) noexcept;
+  std::size_t cancel_all(const trader_t &trader, side_t side = side_t::invalid, const instr_t &instr = {}) noexcept;
+  template <typename Sink>
+  orderid_t modify(orderid_t orderid, price_t px, quantity_t qty, Sink &&sink) noexcept;
+  std::size_t depth(side_t side, std::span<price_level_t> levels) const noexcept;
+  [[nodiscard]] bool resting(orderid_t orderid) const noexcept { return locations.find(orderid) != nullptr; }
+  void skip_orderid() noexcept { ++next_orderid; }
+  // aggregate of the orders resting at 'px', with no order when the level is empty
+  [[nodiscard]] price_level_t level(side_t side, price_t px) const noexcept;
+  // the resting order, nullptr if it is not resting
+  [[nodiscard]] const order_t *find(orderid_t orderid) const noexcept {
+    const node_t *loc = locations.find(orderid);
+    return loc == nullptr ? nullptr : &pool[*loc].order;
+  }
+  // fn(order) for every resting order of 'trader'
+  template <typename Fn>
+  void for_each_order(const trader_t &trader, Fn &&fn) const {
+    traders.for_each(trader, [&](node_t node) { fn(pool[node].order); });
+  }
+
+ private:
+  // whether the resting orders an incoming order on 'side' limited to 'px' would cross add up to 'qty'
+  [[nodiscard]] bool can_fill(side_t side, price_t px, quantity_t qty) const noexcept;
+
+  // FIFO queue of the orders resting at one price, with their aggregate quantity and count
+  struct level_t {
+    price_t px;
+    order_queue orders;
+    uint64_t qty;
+    uint32_t count;
+  };
+  using level_iterator = std::vector<level_t>::iterator;
+
+  // worst to best price
+  static bool bid_before(const level_t &l, price_t px) noexcept { return l.px < px; }
+  static bool ask_before(const level_t &l, price_t px) noexcept { return l.px > px; }
+
+  // the level of 'px', or where it would be inserted
+  level_iterator find_level(side_t side, price_t px) noexcept {
+    if (side == side_t::bid) {
+      return std::lower_bound(bid_levels.begin(), bid_levels.end(), px, bid_before);
+    }
+    return std::lower_bound(ask_levels.begin(), ask_levels.end(), px, ask_before);
+  }
+
+  // trade 'order' against the levels of the other side it crosses, top of book first
+  template <side_t Side, typename Sink>
+  void match(order_t &order, price_t px, Sink &sink) noexcept;
+
+  orderid_t next_orderid;
+  // ordered from depth of book to top of book
+  std::vector<level_t> bid_levels;
+  std::vector<level_t> ask_levels;
+  order_pool pool;
+  order_index<node_t> locations;
+  // resting orders of each trader, walked by cancel_all
+  trader_index<node_t> traders;
+};
+
+template <side_t Side, typename Sink>
+void flat_map_engine::match(order_t &order, price_t px, Sink &sink) noexcept {
+  // a bid trades against the asks and the other way round
+  std::vector<level_t> &levels = Side == side_t::bid ? ask_levels : bid_levels;
+  while (order.qty > 0 && !levels.empty()) {
+    level_t &best = levels.back();
+    if (Side == side_t::bid ? best.px > px : best.px < px) {
+      // the rest of the order rests on book
+      break;
+    }
+    order_queue &orders = best.orders;
+    while (order.qty > 0 && !orders.empty()) {
+      // match happens
+      node_t head = orders.head;
+      order_t &resting = pool[head].order;
+      if (resting.trader == order.trader && order.stp != self_trade_prevention::none) [[unlikely]] {
+        // no trade, quantity is cancelled off either order or both instead
+        self_trade_cut cut = prevent_self_trade(order.stp, order.qty, resting.qty);
+        if constexpr (reports_self_trades<Sink>) {
+          sink(cut, resting);
+        }
+        order.qty -= cut.incoming_qty;
+        resting.qty -= cut.resting_qty;
+        best.qty -= cut.resting_qty;
+      } else {
+        quantity_t traded_qty = std::min(resting.qty, order.qty);
+        sink(fill_t{resting.id, order.id, resting.px, traded_qty, Side}, resting);
+        order.qty -= traded_qty;
+        resting.qty -= traded_qty;
+        best.qty -= traded_qty;
+      }
+      if (resting.qty == 0) {
+        locations.erase(resting.id);
+        traders.erase(head);
+        --best.count;
+        pool.unlink(orders, head);
+        pool.release(head);
+      }
+    }
+    if (orders.empty()) {
+      levels.pop_back();
+    }
+  }
+}
+
+template <typename Sink>
+orderid_t flat_map_engine::limit(order_t order, Sink &&sink) noexcept {
+  orderid_t curr_id = next_orderid++;
+  order.id = curr_id;
+  price_t px = order.limit_px();
+  assert(order.qty > 0);
+  if (order.tif == time_in_force::fok && !can_fill(order.side, px, order.qty)) {
+    // killed without touching the book
+    return curr_id;
+  }
+  if (order.side == side_t::bid) {
+    match<side_t::bid>(order, px, sink);
+  } else {
+    match<side_t::ask>(order, px, sink);
+  }
+  if (order.qty > 0 && order.rests()) {
+    // not fully executed, rest at the back of its price level, opening the level if needed
+    auto it = find_level(order.side, px);
+    if (it == (order.side == side_t::bid ? bid_levels.end() : ask_levels.end()) || it->px != px) {
+      it = (order.side == side_t::bid ? bid_levels : ask_levels).insert(it, {px, {}, 0, 0});
+    }
+    node_t node = pool.allocate(order);
+    locations.insert(curr_id, node);
+    traders.insert(node, order.trader);
+    pool.push_back(it->orders, node);
+    it->qty += order.qty;
+    ++it->count;
+  }
+  return curr_id;
+}
+
+template <typename Sink>
+orderid_t flat_map_engine::modify(orderid_t orderid, price_t px, quantity_t qty, Sink &&sink) noexcept {
+  assert(qty > 0);
+  node_t *loc = locations.find(orderid);
+  if (loc == nullptr) {
+    return 0;
+  }
+  order_t &resting = pool[*loc].order;
+  if (px == resting.px && qty <= resting.qty) {
+    // reduced in place, the order keeps its place in the level queue
+    find_level(resting.side, px)->qty -= resting.qty - qty;
+    resting.qty = qty;
+    return orderid;
+  }
+  // re-queued under a new id at the back of the new price level
+  order_t order = resting;
+  cancel(orderid);
+  order.px = px;
+  order.qty = qty;
+  orderid_t requeued = limit(order, std::forward<Sink>(sink));
+  return locations.find(requeued) != nullptr ? requeued : 0;
+}
+
+}  // namespace cupid
+
+#endif  // INCLUDE_FLAT_MAP_ENGINE_H_
@@ -0,0 +1,89 @@
+#ifndef INCLUDE_INSTRUMENT_MAP_H_
+#define INCLUDE_INSTRUMENT_MAP_H_
+
+#include <bit>
+#include <cassert>
+#include <cstdint>
+#include <limits>
+#include <vector>
+#include "engine_types.h"
+
+namespace cupid {
+
+using instr_key_t = uint32_t;
+static_assert(sizeof(instr_key_t) == INSTRUMENT_LEN);
+
+// the 4-byte symbol packed into one integer, so comparing symbols is a single compare
+constexpr instr_key_t to_instr_key(const instr_t &instr) noexcept { return std::bit_cast<instr_key_t>(instr); }
+
+// Flat open addressing table from instrument to a dense index in [0, max_instruments), assigned
+// in order of first appearance. Keys and values sit in two arrays of at least twice the universe
+// size probed linearly, so a lookup is a multiply, a shift and usually a single compare.
+// The all-zero symbol marks an empty slot and is never a valid instrument.
+class instrument_map {
+ public:
+  constexpr static uint32_t NO_INDEX = std::numeric_limits<uint32_t>::max();
+
+  explicit instrument_map(std::size_t max_instruments)
+      : max_instruments{max_instruments}, num_instruments{0} {
+    assert(max_instruments > 0 && max_instruments < NO_INDEX);
+    std::size_t capacity = std::bit_ceil(max_instruments * 2);
+    shift = std::numeric_limits<instr_key_t>::digits - std::countr_zero(capacity);
+    keys.assign(capacity, EMPTY_KEY);
+    values.assign(capacity, NO_INDEX);
+  }
+
+  // NO_INDEX if the instrument was never seen
+  [[nodiscard]] uint32_t find(const instr_t &instr) const noexcept {
+    instr_key_t key = to_instr_key(instr);
+    for (std::size_t slot = home_slot(key);; slot = (slot + 1) & (keys.size() - 1)) {
+      if (keys[slot] == key) {
+        return key == EMPTY_KEY ? NO_INDEX : values[slot];
+      }
+      if (keys[slot] == EMPTY_KEY) {
+        return NO_INDEX;
+      }
+    }
+  }
+
+  // assign the next index to an unseen instrument, NO_INDEX once the universe is exhausted
+  uint32_t find_or_insert(const instr_t &instr) noexcept {
+    instr_key_t key = to_instr_key(instr);
+    if (key == EMPTY_KEY) {
+      return NO_INDEX;
+    }
+    for (std::size_t slot = home_slot(key);; slot = (slot + 1) & (keys.size() - 1)) {
+      if (keys[slot] == key) {
+        return values[slot];
+      }
+      if (keys[slot] == EMPTY_KEY) {
+        if (num_instruments == max_instruments) {
+          return NO_INDEX;
+        }
+        keys[slot] = key;
+        values[slot] = static_cast<uint32_t>(num_instruments++);
+        return values[slot];
+      }
+    }
+  }
+
+  [[nodiscard]] std::size_t size() const noexcept { return num_instruments; }
+
+ private:
+  constexpr static instr_key_t EMPTY_KEY = 0;
+
+  // Fibonacci hashing, the high bits of the product are the best mixed
+  [[nodiscard]] std::size_t home_slot(instr_key_t key) const noexcept {
+    return static_cast<instr_key_t>(key * 0x9E3779B1U) >> shift;
+  }
+
+  std::size_t max_instruments;
+  std::size_t num_instruments;
+  int shift;
+  std::vector<instr_key_t> keys;
+  std::vector<uint32_t> values;
+};
+
+}  // namespace cupid
+
+#endif  // INCLUDE_INSTRUMENT_MAP_H_
@@ -0,0 +1,220 @@
+#ifndef INCLUDE_INSTRUMENT_ROUTER_H_
+#define INCLUDE_INSTRUMENT_ROUTER_H_
+
+#include <cstdint>
+#include <functional>
+#include <memory>
+#include <utility>
+#include <vector>
+#include "engine_interface.h"
+#include "engine_types.h"
+#include "instrument_map.h"
+#include "order_index.h"
+
+namespace cupid {
+
+// Routes every order to the book of its instrument, each book being an independent Engine built by
+// make_book for that instrument, so that books may be sized per symbol.
+// Books are created on the first order of their instrument, up to max_instruments of them; an order
+// for an instrument beyond that universe is rejected as a book would reject it: it uses up an id but
+// neither trades nor rests, and limit returns 0.
+// Order ids are assigned by the router across all instruments, and translated to and from the ids
+// each book assigns on its own, so ids in fills and cancels are always the router's. Only the ids of
+// resting orders are translated: a route is dropped once its order is filled, cut off by self-trade
+// prevention, cancelled or re-queued, so the routes are bounded by the orders resting at once. The
+// orders a mass cancel takes off a book are not reported, their routes are dropped in one sweep when
+// the routes would otherwise grow while a quarter of them or more are left over from mass cancels.
+template <typename Engine>
+class instrument_router : public engine_interface<instrument_router<Engine>> {
+ public:
+  using engine_interface<instrument_router<Engine>>::limit;
+  using book_factory = std::function<std::unique_ptr<Engine>(const instr_t &)>;
+
+  constexpr static std::size_t DEFAULT_MAX_INSTRUMENTS = 64;
+
+  instrument_router() : instrument_router(DEFAULT_MAX_INSTRUMENTS) {}
+  explicit instrument_router(std::size_t max_instruments,
+                             book_factory make_book = [](const instr_t &) { return std::make_unique<Engine>(); })
+      : next_orderid{1}, unrouted{0}, book_index(max_instruments), make_book(std::move(make_book)) {
+    books.reserve(max_instruments);
+  }
+
+  template <typename Sink>
+  orderid_t limit(order_t order, Sink &&sink) noexcept;
+  bool cancel(orderid_t orderid) noexcept;
+  std::size_t cancel_all(const trader_t &trader, side_t side = side_t::invalid, const instr_t &instr = {}) noexcept;
+  template <typename Sink>
+  orderid_t modify(orderid_t orderid, price_t px, quantity_t qty, Sink &&sink) noexcept;
+  [[nodiscard]] bool resting(orderid_t orderid) const noexcept {
+    const route *r = routes.find(orderid);
+    return r != nullptr && books[r->book].engine->resting(r->book_orderid);
+  }
+
+  // the router's id only, the books never see the order
+  void skip_orderid() noexcept { ++next_orderid; }
+
+  [[nodiscard]] std::size_t num_books() const noexcept { return books.size(); }
+
+ private:
+  struct book {
+    std::unique_ptr<Engine> engine;
+    // router order id of each resting order, by the id the book assigned
+    order_index<orderid_t> orderids;
+  };
+  struct route {
+    uint32_t book;
+    orderid_t book_orderid;
+  };
+
+  // the sink handed to book 'b', translating the book's order ids into the router's for 'sink' and
+  // dropping the routes of the orders which stop resting
+  template <typename Sink>
+  auto routing(book &b, orderid_t curr_id, Sink &sink) {
+    return overloaded{[this, &b, curr_id, &sink](const fill_t &fill, const order_t &resting) {
+                        orderid_t resting_id = *b.orderids.find(fill.resting_id);
+                        order_t routed = resting;
+                        routed.id = resting_id;
+                        if (fill.qty == resting.qty) {
+                          unroute(b, resting_id, fill.resting_id);
+                        }
+                        sink(fill_t{resting_id, curr_id, fill.px, fill.qty, fill.aggressor_side}, routed);
+                      },
+                      [this, &b, &sink](const self_trade_cut &cut, const order_t &resting) {
+                        order_t routed = resting;
+                        routed.id = *b.orderids.find(resting.id);
+                        if (cut.resting_qty == resting.qty) {
+                          unroute(b, routed.id, resting.id);
+                        }
+                        if constexpr (reports_self_trades<Sink>) {
+                          sink(cut, routed);
+                        }
+                      }};
+  }
+  // the order the book assigned 'book_orderid' rests under 'orderid'
+  void route_order(uint32_t idx, orderid_t orderid, orderid_t book_orderid) {
+    if (routes.full() && 4 * unrouted >= routes.size()) [[unlikely]] {
+      // make room out of the routes of mass cancelled orders rather than growing, the sweep walks a
+      // table at most 4 times as large as the routes it drops
+      prune();
+    }
+    routes.insert(orderid, {idx, book_orderid});
+    books[idx].orderids.insert(book_orderid, orderid);
+  }
+  void unroute(book &b, orderid_t orderid, orderid_t book_orderid) noexcept {
+    routes.erase(orderid);
+    b.orderids.erase(book_orderid);
+  }
+  // drop the routes of the orders no longer resting in their book
+  void prune() noexcept {
+    routes.erase_if([this](orderid_t, const route &r) {
+      book &b = books[r.book];
+      if (b.engine->resting(r.book_orderid)) {
+        return false;
+      }
+      b.orderids.erase(r.book_orderid);
+      return true;
+    });
+    unrouted = 0;
+  }
+
+  orderid_t next_orderid;
+  // routes of the orders mass cancelled since the last prune
+  std::size_t unrouted;
+  instrument_map book_index;
+  std::vector<book> books;
+  // book and book order id of each resting order, by router order id
+  order_index<route> routes;
+  book_factory make_book;
+};
+
+template <typename Engine>
+template <typename Sink>
+orderid_t instrument_router<Engine>::limit(order_t order, Sink &&sink) noexcept {
+  orderid_t curr_id = next_orderid++;
+  uint32_t idx = book_index.find_or_insert(order.instr);
+  if (idx == instrument_map::NO_INDEX) {
+    // outside of the symbol universe, reject
+    return 0;
+  }
+  if (idx == books.size()) {
+    // first order of this instrument
+    books.push_back({make_book(order.instr), {}});
+  }
+  book &b = books[idx];
+  // a book rejecting the order returns 0
+  orderid_t book_orderid = b.engine->limit(order, routing(b, curr_id, sink));
+  if (book_orderid == 0) {
+    return 0;
+  }
+  if (b.engine->resting(book_orderid)) {
+    route_order(idx, curr_id, book_orderid);
+  }
+  return curr_id;
+}
+
+template <typename Engine>
+bool instrument_router<Engine>::cancel(orderid_t orderid) noexcept {
+  const route *r = routes.find(orderid);
+  if (r == nullptr) {
+    return false;
+  }
+  book &b = books[r->book];
+  orderid_t book_orderid = r->book_orderid;
+  // false for an order a mass cancel took off the book, whose route is dropped all the same
+  bool cancelled = b.engine->cancel(book_orderid);
+  if (!cancelled) {
+    --unrouted;
+  }
+  unroute(b, orderid, book_orderid);
+  return cancelled;
+}
+
+template <typename Engine>
+std::size_t instrument_router<Engine>::cancel_all(const trader_t &trader, side_t side, const instr_t &instr) noexcept {
+  std::size_t cancelled = 0;
+  if (instr != instr_t{}) {
+    // only the book of that instrument holds orders on it
+    uint32_t idx = book_index.find(instr);
+    cancelled = idx < books.size() ? books[idx].engine->cancel_all(trader, side, instr) : 0;
+  } else {
+    for (book &b : books) {
+      cancelled += b.engine->cancel_all(trader, side, instr);
+    }
+  }
+  // their routes are left for the next prune
+  unrouted += cancelled;
+  return cancelled;
+}
+
+template <typename Engine>
+template <typename Sink>
+orderid_t instrument_router<Engine>::modify(orderid_t orderid, price_t px, quantity_t qty, Sink &&sink) noexcept {
+  const route *found = routes.find(orderid);
+  if (found == nullptr) {
+    return 0;
+  }
+  route r = *found;
+  book &b = books[r.book];
+  if (!b.engine->resting(r.book_orderid)) {
+    return 0;
+  }
+  // the router id the order gets if the book re-queues it
+  orderid_t curr_id = next_orderid;
+  orderid_t book_orderid = b.engine->modify(r.book_orderid, px, qty, routing(b, curr_id, sink));
+  if (book_orderid == r.book_orderid) {
+    // modified in place
+    return orderid;
+  }
+  // re-queued, the new id is used up even if the order traded entirely and does not rest
+  ++next_orderid;
+  unroute(b, orderid, r.book_orderid);
+  if (book_orderid == 0) {
+    return 0;
+  }
+  route_order(r.book, curr_id, book_orderid);
+  return curr_id;
+}
+
+}  // namespace cupid
+
+#endif  // INCLUDE_INSTRUMENT_ROUTER_H_
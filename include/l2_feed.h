@@ -0,0 +1,158 @@
+#ifndef INCLUDE_L2_FEED_H_
+#define INCLUDE_L2_FEED_H_
+
+#include <algorithm>
+#include <span>
+#include <utility>
+#include <vector>
+#include "engine_interface.h"
+#include "engine_types.h"
+#include "trader_index.h"
+
+namespace cupid {
+
+// Engine producing an incremental price level (L2) feed of the book it wraps. While an action runs,
+// every level it touches is noted once along with its aggregate before the action: the level an
+// order rests on or is cancelled from, and each level it trades against as reported by the fills.
+// Self-trade prevention may cut a resting order without a fill, the engine reports those cuts to the
+// sink as well so their levels are noted the same way.
+// Once the action is done, one update per touched level which actually changed is published with
+// the level's new aggregate, so a sweep through one level is a single update rather than one per fill.
+// The wrapped Engine must answer level(side, px), find(orderid) and for_each_order(trader, fn) besides
+// the engine interface.
+template <typename Engine>
+class l2_feed : public engine_interface<l2_feed<Engine>> {
+ public:
+  using engine_interface<l2_feed<Engine>>::limit;
+
+  template <typename... Args>
+  explicit l2_feed(Args &&...args) : engine(std::forward<Args>(args)...) {}
+
+  template <typename Sink>
+  orderid_t limit(order_t order, Sink &&sink) noexcept;
+  bool cancel(orderid_t orderid) noexcept;
+  std::size_t cancel_all(const trader_t &trader, side_t side = side_t::invalid, const instr_t &instr = {}) noexcept;
+  template <typename Sink>
+  orderid_t modify(orderid_t orderid, price_t px, quantity_t qty, Sink &&sink) noexcept;
+  std::size_t depth(side_t side, std::span<price_level_t> levels) const noexcept { return engine.depth(side, levels); }
+  [[nodiscard]] bool resting(orderid_t orderid) const noexcept { return engine.resting(orderid); }
+  void skip_orderid() noexcept {
+    // no level changes
+    published.clear();
+    engine.skip_orderid();
+  }
+
+  // the updates published by the last action, valid until the next one
+  [[nodiscard]] std::span<const level_update_t> updates() const noexcept { return published; }
+
+ private:
+  struct touched_level {
+    side_t side;
+    price_level_t before;
+  };
+
+  void touch(side_t side, price_t px) {
+    for (const auto &t : touched) {
+      if (t.side == side && t.before.px == px) {
+        return;
+      }
+    }
+    touched.push_back({side, engine.level(side, px)});
+  }
+  void publish();
+  // fills and self-trade cuts reported to the caller, noting the level of the resting order on the way
+  template <typename Sink>
+  auto touching(Sink &sink) {
+    return overloaded{[this, &sink](const fill_t &fill, const order_t &resting) {
+                        touch(resting.side, fill.px);
+                        sink(fill, resting);
+                      },
+                      [this, &sink](const self_trade_cut &cut, const order_t &resting) {
+                        touch(resting.side, resting.px);
+                        if constexpr (reports_self_trades<Sink>) {
+                          sink(cut, resting);
+                        }
+                      }};
+  }
+
+  Engine engine;
+  // levels touched by the running action, an action touches few of them so a linear scan dedupes
+  std::vector<touched_level> touched;
+  std::vector<level_update_t> published;
+};
+
+template <typename Engine>
+template <typename Sink>
+orderid_t l2_feed<Engine>::limit(order_t order, Sink &&sink) noexcept {
+  touched.clear();
+  if (order.rests()) {
+    touch(order.side, order.px);
+  }
+  orderid_t orderid = engine.limit(order, touching(sink));
+  publish();
+  return orderid;
+}
+
+template <typename Engine>
+bool l2_feed<Engine>::cancel(orderid_t orderid) noexcept {
+  touched.clear();
+  if (const order_t *resting = engine.find(orderid); resting != nullptr) {
+    touch(resting->side, resting->px);
+  }
+  bool cancelled = engine.cancel(orderid);
+  publish();
+  return cancelled;
+}
+
+template <typename Engine>
+std::size_t l2_feed<Engine>::cancel_all(const trader_t &trader, side_t side, const instr_t &instr) noexcept {
+  touched.clear();
+  engine.for_each_order(trader, [&](const order_t &resting) {
+    if (in_cancel_scope(resting.side, resting.instr, side, instr)) {
+      touched.push_back({resting.side, {resting.px, 0, 0}});
+    }
+  });
+  // a trader may rest on many levels, sorting dedupes them without the quadratic scan of touch
+  auto key = [](const touched_level &t) { return std::pair{t.side, t.before.px}; };
+  std::sort(touched.begin(), touched.end(), [&](const auto &l, const auto &r) { return key(l) < key(r); });
+  auto same = [&](const auto &l, const auto &r) { return key(l) == key(r); };
+  touched.erase(std::unique(touched.begin(), touched.end(), same), touched.end());
+  for (auto &t : touched) {
+    t.before = engine.level(t.side, t.before.px);
+  }
+  std::size_t cancelled = engine.cancel_all(trader, side, instr);
+  publish();
+  return cancelled;
+}
+
+template <typename Engine>
+template <typename Sink>
+orderid_t l2_feed<Engine>::modify(orderid_t orderid, price_t px, quantity_t qty, Sink &&sink) noexcept {
+  touched.clear();
+  if (const order_t *resting = engine.find(orderid); resting != nullptr) {
+    touch(resting->side, resting->px);
+    touch(resting->side, px);
+  }
+  orderid_t modified = engine.modify(orderid, px, qty, touching(sink));
+  publish();
+  return modified;
+}
+
+template <typename Engine>
+void l2_feed<Engine>::publish() {
+  published.clear();
+  for (const auto &t : touched) {
+    price_level_t after = engine.level(t.side, t.before.px);
+    if (after == t.before) {
+      continue;
+    }
+    level_update_type type = after.count == 0   ? level_update_type::remove
+                             : t.before.count == 0 ? level_update_type::add
+                                                   : level_update_type::change;
+    published.push_back({type, t.side, after.px, after.qty, after.count});
+  }
+}
+
+}  // namespace cupid
+
+#endif  // INCLUDE_L2_FEED_H_
@@ -0,0 +1,325 @@
+#ifndef INCLUDE_LADDER_BOOK_H_
+#define INCLUDE_LADDER_BOOK_H_
+
+#include <cassert>
+#include <cstddef>
+#include <cstdint>
+#include <span>
+#include <utility>
+#include <vector>
+#include "engine_interface.h"
+#include "engine_types.h"
+#include "level_bitmap.h"
+#include "order_index.h"
+#include "order_pool.h"
+#include "trader_index.h"
+
+namespace cupid {
+
+// Tick ladder book shared by the engines which only differ in how an incoming order trades against a
+// price level. Impl provides match_level(level, order, sink), trading 'order' against the orders
+// resting on 'level' and dropping those it empties with remove_resting; the book does the rest.
+// Price levels sit in an array indexed by the tick offset from min_px, each level is a FIFO queue
+// of resting orders and the best level of each side is cached. Resting an order is O(1), and once
+// the best level empties the next non-empty one is found from an occupancy bitmap of each side,
+// so gaps in a sparse book are skipped a 64-bit word at a time.
+// Resting orders live in a preallocated order_pool and are linked into their level's queue, and the
+// order id index is sized for order_capacity resting orders, so after warm-up and while no more
+// orders rest at once neither resting, filling nor cancelling an order allocates.
+// Prices must be multiple of tick_size within [min_px, min_px + tick_size * num_levels). A day limit
+// order priced outside of the ladder could not rest, so it is rejected: it uses up an id but neither
+// trades nor rests and limit returns 0. Orders which never rest may still trade at any price.
+template <typename Impl>
+class ladder_book : public engine_interface<Impl> {
+ public:
+  using engine_interface<Impl>::limit;
+
+  constexpr static price_t DEFAULT_MIN_PX = 0;
+  constexpr static price_t DEFAULT_TICK_SIZE = 100;
+  constexpr static std::size_t DEFAULT_NUM_LEVELS = 1 << 16;
+  constexpr static std::size_t DEFAULT_ORDER_CAPACITY = 1 << 16;
+
+  template <typename Sink>
+  orderid_t limit(order_t order, Sink &&sink) noexcept;
+  bool cancel(orderid_t orderid) noexcept;
+  std::size_t cancel_all(const trader_t &trader, side_t side = side_t::invalid, const instr_t &instr = {}) noexcept;
+  template <typename Sink>
+  orderid_t modify(orderid_t orderid, price_t px, quantity_t qty, Sink &&sink) noexcept;
+  std::size_t depth(side_t side, std::span<price_level_t> levels) const noexcept;
+  [[nodiscard]] bool resting(orderid_t orderid) const noexcept { return locations.find(orderid) != nullptr; }
+  void skip_orderid() noexcept { ++next_orderid; }
+  // aggregate of the orders resting at 'px', with no order when the level is empty
+  [[nodiscard]] price_level_t level(side_t side, price_t px) const noexcept {
+    if (!on_ladder(px)) {
+      return {px, 0, 0};
+    }
+    const level_t &l = side == side_t::bid ? bid_levels[to_level(px)] : ask_levels[to_level(px)];
+    return {px, l.qty, l.count};
+  }
+  // the resting order, nullptr if it is not resting
+  [[nodiscard]] const order_t *find(orderid_t orderid) const noexcept {
+    const node_t *loc = locations.find(orderid);
+    return loc == nullptr ? nullptr : &pool[*loc].order;
+  }
+  // fn(order) for every resting order of 'trader'
+  template <typename Fn>
+  void for_each_order(const trader_t &trader, Fn &&fn) const {
+    traders.for_each(trader, [&](node_t node) { fn(pool[node].order); });
+  }
+  // the index slot of a cancelled order, or the level a limit order would rest on
+  void prefetch(const action_t &action) const noexcept {
+    if (action.is_cancel()) {
+      locations.prefetch(action.cancel_id);
+    } else if (on_ladder(action.order.px)) {
+      const auto &levels = action.order.side == side_t::bid ? bid_levels : ask_levels;
+      __builtin_prefetch(&levels[to_level(action.order.px)]);
+    }
+  }
+
+ protected:
+  // FIFO queue of the orders resting at one price, with their aggregate quantity and count
+  struct level_t {
+    order_queue orders;
+    uint64_t qty = 0;
+    uint32_t count = 0;
+
+    [[nodiscard]] bool empty() const noexcept { return orders.empty(); }
+  };
+
+  ladder_book(price_t min_px, price_t tick_size, std::size_t num_levels, std::size_t order_capacity);
+
+  // drop the order in 'node' from 'level' once it is filled or cancelled off by self-trade prevention
+  void remove_resting(level_t &level, node_t node) noexcept {
+    locations.erase(pool[node].order.id);
+    traders.erase(node);
+    --level.count;
+    pool.unlink(level.orders, node);
+    pool.release(node);
+  }
+
+ private:
+  constexpr static std::size_t NO_LEVEL = level_bitmap::NONE;
+
+  // whether the resting orders an incoming order on 'side' limited to 'px' would cross add up to 'qty'
+  [[nodiscard]] bool can_fill(side_t side, price_t px, quantity_t qty) const noexcept;
+
+  [[nodiscard]] bool on_ladder(price_t px) const noexcept {
+    return px >= min_px && (px - min_px) % tick_size == 0 && (px - min_px) / tick_size < bid_levels.size();
+  }
+  [[nodiscard]] std::size_t to_level(price_t px) const noexcept { return (px - min_px) / tick_size; }
+  [[nodiscard]] price_t to_px(std::size_t level) const noexcept { return min_px + level * tick_size; }
+  // the next non-empty level strictly worse than 'from', or NO_LEVEL
+  [[nodiscard]] std::size_t next_bid_level(std::size_t from) const noexcept {
+    return from == 0 ? NO_LEVEL : bid_occupied.prev_set(from - 1);
+  }
+  [[nodiscard]] std::size_t next_ask_level(std::size_t from) const noexcept {
+    return ask_occupied.next_set(from + 1);
+  }
+
+  Impl &impl() noexcept { return static_cast<Impl &>(*this); }
+
+  orderid_t next_orderid;
+  price_t min_px;
+  price_t tick_size;
+  std::vector<level_t> bid_levels;
+  std::vector<level_t> ask_levels;
+  // a bit per non-empty level
+  level_bitmap bid_occupied;
+  level_bitmap ask_occupied;
+  std::size_t best_bid;
+  std::size_t best_ask;
+
+ protected:
+  order_pool pool;
+
+ private:
+  order_index<node_t> locations;
+  // resting orders of each trader, walked by cancel_all
+  trader_index<node_t> traders;
+};
+
+template <typename Impl>
+ladder_book<Impl>::ladder_book(price_t min_px, price_t tick_size, std::size_t num_levels, std::size_t order_capacity)
+    : next_orderid{1},
+      min_px{min_px},
+      tick_size{tick_size},
+      bid_levels(num_levels),
+      ask_levels(num_levels),
+      bid_occupied(num_levels),
+      ask_occupied(num_levels),
+      best_bid{NO_LEVEL},
+      best_ask{NO_LEVEL},
+      pool(order_capacity) {
+  assert(tick_size > 0 && num_levels > 0);
+  locations.reserve(order_capacity);
+  traders.reserve(order_capacity);
+}
+
+template <typename Impl>
+bool ladder_book<Impl>::can_fill(side_t side, price_t px, quantity_t qty) const noexcept {
+  uint64_t available = 0;
+  if (side == side_t::bid) {
+    for (auto idx = best_ask; idx != NO_LEVEL && to_px(idx) <= px && available < qty; idx = next_ask_level(idx)) {
+      available += ask_levels[idx].qty;
+    }
+  } else {
+    for (auto idx = best_bid; idx != NO_LEVEL && to_px(idx) >= px && available < qty; idx = next_bid_level(idx)) {
+      available += bid_levels[idx].qty;
+    }
+  }
+  return available >= qty;
+}
+
+template <typename Impl>
+std::size_t ladder_book<Impl>::depth(side_t side, std::span<price_level_t> levels) const noexcept {
+  std::size_t n = 0;
+  if (side == side_t::bid) {
+    for (auto idx = best_bid; idx != NO_LEVEL && n < levels.size(); idx = next_bid_level(idx)) {
+      levels[n++] = {to_px(idx), bid_levels[idx].qty, bid_levels[idx].count};
+    }
+  } else {
+    for (auto idx = best_ask; idx != NO_LEVEL && n < levels.size(); idx = next_ask_level(idx)) {
+      levels[n++] = {to_px(idx), ask_levels[idx].qty, ask_levels[idx].count};
+    }
+  }
+  return n;
+}
+
+template <typename Impl>
+bool ladder_book<Impl>::cancel(orderid_t orderid) noexcept {
+  node_t *loc = locations.find(orderid);
+  if (loc == nullptr) {
+    return false;
+  }
+  node_t node = *loc;
+  locations.erase(orderid);
+  traders.erase(node);
+  const order_t &order = pool[node].order;
+  std::size_t idx = to_level(order.px);
+  level_t &level = order.side == side_t::bid ? bid_levels[idx] : ask_levels[idx];
+  pool.unlink(level.orders, node);
+  level.qty -= order.qty;
+  --level.count;
+  if (order.side == side_t::bid) {
+    if (level.empty()) {
+      bid_occupied.clear(idx);
+      if (idx == best_bid) {
+        best_bid = next_bid_level(idx);
+      }
+    }
+  } else {
+    if (level.empty()) {
+      ask_occupied.clear(idx);
+      if (idx == best_ask) {
+        best_ask = next_ask_level(idx);
+      }
+    }
+  }
+  pool.release(node);
+  return true;
+}
+
+template <typename Impl>
+std::size_t ladder_book<Impl>::cancel_all(const trader_t &trader, side_t side, const instr_t &instr) noexcept {
+  std::size_t cancelled = 0;
+  traders.for_each(trader, [&](node_t node) {
+    const order_t &order = pool[node].order;
+    if (in_cancel_scope(order.side, order.instr, side, instr)) {
+      cancel(order.id);
+      ++cancelled;
+    }
+  });
+  return cancelled;
+}
+
+template <typename Impl>
+template <typename Sink>
+orderid_t ladder_book<Impl>::limit(order_t order, Sink &&sink) noexcept {
+  orderid_t curr_id = next_orderid++;
+  order.id = curr_id;
+  price_t px = order.limit_px();
+  assert(order.qty > 0);
+  if (order.rests() && !on_ladder(px)) [[unlikely]] {
+    // rejected without touching the book
+    return 0;
+  }
+  if (order.tif == time_in_force::fok && !can_fill(order.side, px, order.qty)) {
+    // killed without touching the book
+    return curr_id;
+  }
+  if (order.side == side_t::bid) {
+    while (order.qty > 0 && best_ask != NO_LEVEL && to_px(best_ask) <= px) {
+      level_t &level = ask_levels[best_ask];
+      impl().match_level(level, order, sink);
+      if (level.empty()) {
+        ask_occupied.clear(best_ask);
+        best_ask = next_ask_level(best_ask);
+      }
+    }
+  } else {
+    while (order.qty > 0 && best_bid != NO_LEVEL && to_px(best_bid) >= px) {
+      level_t &level = bid_levels[best_bid];
+      impl().match_level(level, order, sink);
+      if (level.empty()) {
+        bid_occupied.clear(best_bid);
+        best_bid = next_bid_level(best_bid);
+      }
+    }
+  }
+  if (order.qty > 0 && order.rests()) {
+    // not fully executed, rest at the back of its price level
+    std::size_t idx = to_level(px);
+    node_t node = pool.allocate(order);
+    locations.insert(curr_id, node);
+    traders.insert(node, order.trader);
+    level_t &level = order.side == side_t::bid ? bid_levels[idx] : ask_levels[idx];
+    if (order.side == side_t::bid) {
+      if (level.empty()) {
+        bid_occupied.set(idx);
+      }
+      if (best_bid == NO_LEVEL || idx > best_bid) {
+        best_bid = idx;
+      }
+    } else {
+      if (level.empty()) {
+        ask_occupied.set(idx);
+      }
+      if (best_ask == NO_LEVEL || idx < best_ask) {
+        best_ask = idx;
+      }
+    }
+    pool.push_back(level.orders, node);
+    level.qty += order.qty;
+    ++level.count;
+  }
+  return curr_id;
+}
+
+template <typename Impl>
+template <typename Sink>
+orderid_t ladder_book<Impl>::modify(orderid_t orderid, price_t px, quantity_t qty, Sink &&sink) noexcept {
+  assert(qty > 0);
+  node_t *loc = locations.find(orderid);
+  if (loc == nullptr) {
+    return 0;
+  }
+  order_t &resting = pool[*loc].order;
+  if (px == resting.px && qty <= resting.qty) {
+    // reduced in place, the order keeps its place in the level queue
+    level_t &level = resting.side == side_t::bid ? bid_levels[to_level(px)] : ask_levels[to_level(px)];
+    level.qty -= resting.qty - qty;
+    resting.qty = qty;
+    return orderid;
+  }
+  // re-queued under a new id at the back of the new price level
+  order_t order = resting;
+  cancel(orderid);
+  order.px = px;
+  order.qty = qty;
+  orderid_t requeued = limit(order, std::forward<Sink>(sink));
+  return locations.find(requeued) != nullptr ? requeued : 0;
+}
+
+}  // namespace cupid
+
+#endif  // INCLUDE_LADDER_BOOK_H_
@@ -0,0 +1,58 @@
+#ifndef INCLUDE_LADDER_ENGINE_H_
+#define INCLUDE_LADDER_ENGINE_H_
+
+#include <algorithm>
+#include <cstddef>
+#include "engine_types.h"
+#include "ladder_book.h"
+#include "order_pool.h"
+
+namespace cupid {
+
+// Price-time priority on a tick ladder book: an incoming order trades against each level it crosses
+// from the front of the level queue, oldest order first.
+class ladder_engine : public ladder_book<ladder_engine> {
+ public:
+  ladder_engine();
+  ladder_engine(price_t min_px, price_t tick_size, std::size_t num_levels,
+                std::size_t order_capacity = DEFAULT_ORDER_CAPACITY);
+
+ private:
+  friend class ladder_book<ladder_engine>;
+
+  // trade 'order' against one level in time priority
+  template <typename Sink>
+  void match_level(level_t &level, order_t &order, Sink &sink) noexcept;
+};
+
+template <typename Sink>
+void ladder_engine::match_level(level_t &level, order_t &order, Sink &sink) noexcept {
+  while (order.qty > 0 && !level.empty()) {
+    // match happens
+    node_t head = level.orders.head;
+    order_t &resting = pool[head].order;
+    if (resting.trader == order.trader && order.stp != self_trade_prevention::none) [[unlikely]] {
+      // no trade, quantity is cancelled off either order or both instead
+      self_trade_cut cut = prevent_self_trade(order.stp, order.qty, resting.qty);
+      if constexpr (reports_self_trades<Sink>) {
+        sink(cut, resting);
+      }
+      order.qty -= cut.incoming_qty;
+      resting.qty -= cut.resting_qty;
+      level.qty -= cut.resting_qty;
+    } else {
+      quantity_t traded_qty = std::min(resting.qty, order.qty);
+      sink(fill_t{resting.id, order.id, resting.px, traded_qty, order.side}, resting);
+      order.qty -= traded_qty;
+      resting.qty -= traded_qty;
+      level.qty -= traded_qty;
+    }
+    if (resting.qty == 0) {
+      remove_resting(level, head);
+    }
+  }
+}
+
+}  // namespace cupid
+
+#endif  // INCLUDE_LADDER_ENGINE_H_
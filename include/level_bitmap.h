@@ -0,0 +1,113 @@
+#ifndef INCLUDE_LEVEL_BITMAP_H_
+#define INCLUDE_LEVEL_BITMAP_H_
+
+#include <bit>
+#include <cassert>
+#include <cstdint>
+#include <limits>
+#include <vector>
+
+namespace cupid {
+
+// Hierarchical occupancy bitmap of price levels. Layer 0 holds one bit per level, and every bit of
+// the layer above summarizes whether one 64-bit word below has any bit set, up to a single word on
+// top. The next occupied level in either direction is found with one count leading/trailing zeros
+// per layer, however sparse the book is.
+class level_bitmap {
+ public:
+  constexpr static std::size_t NONE = std::numeric_limits<std::size_t>::max();
+
+  explicit level_bitmap(std::size_t num_levels) {
+    assert(num_levels > 0);
+    std::size_t bits = num_levels;
+    do {
+      bits = (bits + 63) / 64;
+      layers.emplace_back(bits, 0);
+    } while (bits > 1);
+  }
+
+  [[nodiscard]] bool test(std::size_t level) const noexcept {
+    return (layers[0][level >> 6] >> (level & 63)) & 1;
+  }
+
+  void set(std::size_t level) noexcept {
+    for (auto &layer : layers) {
+      uint64_t &word = layer[level >> 6];
+      bool was_empty = word == 0;
+      word |= 1ULL << (level & 63);
+      if (!was_empty) {
+        // the layers above already see this word as occupied
+        return;
+      }
+      level >>= 6;
+    }
+  }
+
+  void clear(std::size_t level) noexcept {
+    for (auto &layer : layers) {
+      uint64_t &word = layer[level >> 6];
+      word &= ~(1ULL << (level & 63));
+      if (word != 0) {
+        return;
+      }
+      level >>= 6;
+    }
+  }
+
+  // lowest occupied level >= from, or NONE
+  [[nodiscard]] std::size_t next_set(std::size_t from) const noexcept {
+    std::size_t layer = 0;
+    std::size_t pos = from;
+    while (true) {
+      if (layer == layers.size() || (pos >> 6) >= layers[layer].size()) {
+        return NONE;
+      }
+      uint64_t bits = layers[layer][pos >> 6] & (~0ULL << (pos & 63));
+      if (bits != 0) {
+        pos = (pos & ~std::size_t{63}) | std::countr_zero(bits);
+        break;
+      }
+      pos = (pos >> 6) + 1;
+      ++layer;
+    }
+    // down to the lowest occupied level under the word found
+    while (layer-- > 0) {
+      pos = (pos << 6) | std::countr_zero(layers[layer][pos]);
+    }
+    return pos;
+  }
+
+  // highest occupied level <= from, or NONE
+  [[nodiscard]] std::size_t prev_set(std::size_t from) const noexcept {
+    std::size_t layer = 0;
+    std::size_t pos = from;
+    while (true) {
+      if (layer == layers.size()) {
+        return NONE;
+      }
+      uint64_t bits = layers[layer][pos >> 6] & (~0ULL >> (63 - (pos & 63)));
+      if (bits != 0) {
+        pos = (pos & ~std::size_t{63}) | (63 - std::countl_zero(bits));
+        break;
+      }
+      if ((pos >> 6) == 0) {
+        return NONE;
+      }
+      pos = (pos >> 6) - 1;
+      ++layer;
+    }
+    // down to the highest occupied level under the word found
+    while (layer-- > 0) {
+      pos = (pos << 6) | (63 - std::countl_zero(layers[layer][pos]));
+    }
+    return pos;
+  }
+
+ private:
+  // layers[0] is one bit per level, the last layer is a single word
+  std::vector<std::vector<uint64_t>> layers;
+};
+
+}  // namespace cupid
+
+#endif  // INCLUDE_LEVEL_BITMAP_H_
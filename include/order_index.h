@@ -0,0 +1,149 @@
+#ifndef INCLUDE_ORDER_INDEX_H_
+#define INCLUDE_ORDER_INDEX_H_
+
+#include <bit>
+#include <cassert>
+#include <cstddef>
+#include <utility>
+#include <vector>
+#include "engine_types.h"
+
+namespace cupid {
+
+// Order id -> location of the resting order in an engine book.
+// An open addressed table of the resting orders only, so its size is bounded by how many orders rest
+// at once rather than by how many ids were handed out. Order ids are sequential from 1, so the low
+// bits of an id already spread the ids resting together over distinct slots: the slot of an order is
+// its id modulo the power of two capacity, and an id still resting when a newer id wraps around onto
+// its slot pushes the newer one to the next free slot. Erasing shifts the orders probed past the freed
+// slot back, so no tombstone is left behind. The table doubles once half full, never after reserving
+// room for as many orders as may rest at once.
+// Inserting or erasing an order invalidates the pointers returned by find.
+template <typename Location>
+class order_index {
+ public:
+  void reserve(std::size_t num_orders) {
+    if (2 * num_orders > slots.size()) {
+      rehash(std::bit_ceil(2 * num_orders));
+    }
+  }
+
+  // an order already in the index is moved to 'location'
+  void insert(orderid_t orderid, Location location) {
+    assert(orderid != NO_ORDER);
+    if (2 * (count + 1) > slots.size()) [[unlikely]] {
+      rehash(slots.empty() ? MIN_CAPACITY : 2 * slots.size());
+    }
+    std::size_t idx = probe(orderid);
+    if (slots[idx].id == NO_ORDER) {
+      ++count;
+    }
+    slots[idx] = {orderid, location};
+  }
+
+  // nullptr if the order is unknown or not resting anymore
+  [[nodiscard]] Location *find(orderid_t orderid) noexcept {
+    if (orderid == NO_ORDER || slots.empty()) {
+      return nullptr;
+    }
+    slot &s = slots[probe(orderid)];
+    return s.id == orderid ? &s.location : nullptr;
+  }
+
+  [[nodiscard]] const Location *find(orderid_t orderid) const noexcept {
+    if (orderid == NO_ORDER || slots.empty()) {
+      return nullptr;
+    }
+    const slot &s = slots[probe(orderid)];
+    return s.id == orderid ? &s.location : nullptr;
+  }
+
+  void prefetch(orderid_t orderid) const noexcept {
+    if (!slots.empty()) {
+      __builtin_prefetch(&slots[home(orderid)]);
+    }
+  }
+
+  void erase(orderid_t orderid) noexcept {
+    std::size_t idx = probe(orderid);
+    assert(slots[idx].id == orderid);
+    erase_slot(idx);
+  }
+
+  // erase every order for which pred(orderid, location) holds, in a single pass over the table
+  template <typename Pred>
+  void erase_if(Pred &&pred) {
+    if (count == 0) {
+      return;
+    }
+    // start past a free slot, the orders shifted back by an erase then stay ahead of the walk
+    std::size_t start = 0;
+    while (slots[start].id != NO_ORDER) {
+      start = next(start);
+    }
+    for (std::size_t idx = next(start); idx != start;) {
+      if (slots[idx].id != NO_ORDER && pred(slots[idx].id, slots[idx].location)) {
+        // the slot may now hold an order shifted back, look at it again
+        erase_slot(idx);
+      } else {
+        idx = next(idx);
+      }
+    }
+  }
+
+  [[nodiscard]] std::size_t size() const noexcept { return count; }
+  // whether inserting one more order doubles the table
+  [[nodiscard]] bool full() const noexcept { return 2 * (count + 1) > slots.size(); }
+
+ private:
+  // ids are handed out from 1, so 0 marks a free slot
+  constexpr static orderid_t NO_ORDER = 0;
+  constexpr static std::size_t MIN_CAPACITY = 16;
+
+  struct slot {
+    orderid_t id = NO_ORDER;
+    Location location{};
+  };
+
+  [[nodiscard]] std::size_t home(orderid_t orderid) const noexcept { return orderid & mask; }
+  [[nodiscard]] std::size_t next(std::size_t idx) const noexcept { return (idx + 1) & mask; }
+  // the slot holding 'orderid', or the free slot ending its probe sequence
+  [[nodiscard]] std::size_t probe(orderid_t orderid) const noexcept {
+    std::size_t idx = home(orderid);
+    while (slots[idx].id != orderid && slots[idx].id != NO_ORDER) {
+      idx = next(idx);
+    }
+    return idx;
+  }
+
+  void erase_slot(std::size_t hole) noexcept {
+    // move back every order of the probe sequence which would no longer be found past the hole
+    for (std::size_t idx = next(hole); slots[idx].id != NO_ORDER; idx = next(idx)) {
+      if (((idx - home(slots[idx].id)) & mask) >= ((idx - hole) & mask)) {
+        slots[hole] = slots[idx];
+        hole = idx;
+      }
+    }
+    slots[hole].id = NO_ORDER;
+    --count;
+  }
+
+  void rehash(std::size_t capacity) {
+    std::vector<slot> old(capacity);
+    std::swap(old, slots);
+    mask = capacity - 1;
+    for (const slot &s : old) {
+      if (s.id != NO_ORDER) {
+        slots[probe(s.id)] = s;
+      }
+    }
+  }
+
+  std::vector<slot> slots;
+  std::size_t mask = 0;
+  std::size_t count = 0;
+};
+
+}  // namespace cupid
+
+#endif  // INCLUDE_ORDER_INDEX_H_
@@ -0,0 +1,92 @@
+#ifndef INCLUDE_ORDER_POOL_H_
+#define INCLUDE_ORDER_POOL_H_
+
+#include <cassert>
+#include <cstdint>
+#include <limits>
+#include <vector>
+#include "engine_types.h"
+
+namespace cupid {
+
+// Nodes are addressed by index rather than pointer, so the pool may grow without invalidating links
+using node_t = uint32_t;
+constexpr static node_t NO_NODE = std::numeric_limits<node_t>::max();
+
+struct order_node {
+  order_t order;
+  node_t prev;
+  node_t next;
+};
+
+// FIFO queue of resting orders at one price level, linked through the pool nodes
+struct order_queue {
+  node_t head = NO_NODE;
+  node_t tail = NO_NODE;
+
+  [[nodiscard]] bool empty() const noexcept { return head == NO_NODE; }
+};
+
+// Preallocated slab of order nodes with a free list. Released nodes are reused first, so once the
+// pool has grown to the largest number of orders resting at the same time, allocate and release
+// never touch the heap again.
+class order_pool {
+ public:
+  explicit order_pool(std::size_t capacity) : free_head{NO_NODE} { nodes.reserve(capacity); }
+
+  order_node &operator[](node_t idx) noexcept { return nodes[idx]; }
+  const order_node &operator[](node_t idx) const noexcept { return nodes[idx]; }
+
+  node_t allocate(const order_t &order) {
+    node_t idx = free_head;
+    if (idx != NO_NODE) {
+      free_head = nodes[idx].next;
+    } else {
+      // only grows while warming up
+      assert(nodes.size() < NO_NODE);
+      idx = static_cast<node_t>(nodes.size());
+      nodes.emplace_back();
+    }
+    nodes[idx] = {order, NO_NODE, NO_NODE};
+    return idx;
+  }
+
+  void release(node_t idx) noexcept {
+    nodes[idx].next = free_head;
+    free_head = idx;
+  }
+
+  void push_back(order_queue &queue, node_t idx) noexcept {
+    order_node &node = nodes[idx];
+    node.prev = queue.tail;
+    node.next = NO_NODE;
+    if (queue.tail == NO_NODE) {
+      queue.head = idx;
+    } else {
+      nodes[queue.tail].next = idx;
+    }
+    queue.tail = idx;
+  }
+
+  void unlink(order_queue &queue, node_t idx) noexcept {
+    order_node &node = nodes[idx];
+    if (node.prev == NO_NODE) {
+      queue.head = node.next;
+    } else {
+      nodes[node.prev].next = node.next;
+    }
+    if (node.next == NO_NODE) {
+      queue.tail = node.prev;
+    } else {
+      nodes[node.next].prev = node.prev;
+    }
+  }
+
+ private:
+  std::vector<order_node> nodes;
+  node_t free_head;
+};
+
+}  // namespace cupid
+
+#endif  // INCLUDE_ORDER_POOL_H_
@@ -0,0 +1,160 @@
+#ifndef INCLUDE_PIPELINE_H_
+#define INCLUDE_PIPELINE_H_
+
+#include <array>
+#include <atomic>
+#include <cstdint>
+#include <span>
+#include <thread>
+#include "engine_types.h"
+#include "spsc_ring.h"
+#include "trace_codec.h"
+#include "wait_strategy.h"
+
+namespace cupid {
+
+struct pipeline_stats {
+  uint64_t decoded;
+  // records failing is_valid, the engine only uses up the order id of a rejected limit order
+  uint64_t rejected;
+  uint64_t fills;
+};
+
+// Replays wire trace records through three stages connected by SPSC rings:
+//   decode   parses and validates the records, on the calling thread. A rejected limit order still
+//            goes on as a reject, so its id is used up and the later cancels find their orders
+//   match    owns the engine and runs limit/cancel, on its own thread
+//   publish  encodes the fills and hands them to the writer, on its own thread
+// so that parsing and reporting stay off the matching thread. WaitStrategy decides how a stage
+// waits on an empty input ring or a full output ring, see wait_strategy.h
+template <typename Engine, typename WaitStrategy = backoff_wait, std::size_t RingCapacity = (1 << 14)>
+class pipeline {
+ public:
+  // fills are encoded into blocks of this many bytes before being written
+  constexpr static std::size_t PUBLISH_BLOCK_SIZE = FILL_RECORD_SIZE * 1024;
+
+  explicit pipeline(Engine &engine) : engine{engine} {}
+
+  pipeline(const pipeline &) = delete;
+  pipeline &operator=(const pipeline &) = delete;
+
+  // 'records' holds whole TRACE_RECORD_SIZE records, the encoded fills are handed to
+  // writer(const char *data, std::size_t size) on the publish thread in matching order.
+  // Returns once every record is matched and every fill written
+  template <typename Writer>
+  pipeline_stats run(std::span<const char> records, Writer &&writer);
+
+ private:
+  void decode(std::span<const char> records, pipeline_stats &stats);
+  void match();
+  template <typename Writer>
+  void publish(Writer &writer, pipeline_stats &stats);
+
+  Engine &engine;
+  spsc_ring<action_t, RingCapacity> actions;
+  spsc_ring<fill_t, RingCapacity> fills;
+  // set by a stage once it has pushed its last item
+  alignas(CACHE_LINE_SIZE) std::atomic<bool> decode_done{false};
+  alignas(CACHE_LINE_SIZE) std::atomic<bool> match_done{false};
+};
+
+template <typename Engine, typename WaitStrategy, std::size_t RingCapacity>
+template <typename Writer>
+pipeline_stats pipeline<Engine, WaitStrategy, RingCapacity>::run(std::span<const char> records, Writer &&writer) {
+  pipeline_stats stats{0, 0, 0};
+  decode_done.store(false, std::memory_order_relaxed);
+  match_done.store(false, std::memory_order_relaxed);
+  std::thread publisher([this, &writer, &stats] { publish(writer, stats); });
+  std::thread matcher([this] { match(); });
+  decode(records, stats);
+  matcher.join();
+  publisher.join();
+  return stats;
+}
+
+template <typename Engine, typename WaitStrategy, std::size_t RingCapacity>
+void pipeline<Engine, WaitStrategy, RingCapacity>::decode(std::span<const char> records, pipeline_stats &stats) {
+  WaitStrategy wait;
+  for (std::size_t offset = 0; offset + TRACE_RECORD_SIZE <= records.size(); offset += TRACE_RECORD_SIZE) {
+    action_t action = decode_trace(records.data() + offset);
+    ++stats.decoded;
+    if (!is_valid(action)) {
+      ++stats.rejected;
+      if (!action.is_limit()) {
+        continue;
+      }
+      action = {action_type::reject, {}, 0};
+    }
+    while (!actions.try_push(action)) {
+      wait.idle();
+    }
+    wait.reset();
+  }
+  decode_done.store(true, std::memory_order_release);
+}
+
+template <typename Engine, typename WaitStrategy, std::size_t RingCapacity>
+void pipeline<Engine, WaitStrategy, RingCapacity>::match() {
+  WaitStrategy wait;
+  auto sink = [this, &wait](const fill_t &fill, const order_t &) {
+    while (!fills.try_push(fill)) {
+      wait.idle();
+    }
+    wait.reset();
+  };
+  action_t action;
+  while (true) {
+    if (!actions.try_pop(action)) {
+      // the last push happens before decode_done is set, so an empty ring seen after it is final
+      if (decode_done.load(std::memory_order_acquire) && actions.empty()) {
+        break;
+      }
+      wait.idle();
+      continue;
+    }
+    wait.reset();
+    if (action.is_limit()) {
+      engine.limit(action.order, sink);
+    } else if (action.is_cancel()) {
+      engine.cancel(action.cancel_id);
+    } else {
+      engine.skip_orderid();
+    }
+  }
+  match_done.store(true, std::memory_order_release);
+}
+
+template <typename Engine, typename WaitStrategy, std::size_t RingCapacity>
+template <typename Writer>
+void pipeline<Engine, WaitStrategy, RingCapacity>::publish(Writer &writer, pipeline_stats &stats) {
+  WaitStrategy wait;
+  std::array<char, PUBLISH_BLOCK_SIZE> block;
+  std::size_t used = 0;
+  fill_t fill;
+  while (true) {
+    if (!fills.try_pop(fill)) {
+      if (used > 0) {
+        // nothing more to batch with, do not hold the fills back
+        writer(static_cast<const char *>(block.data()), used);
+        used = 0;
+      }
+      if (match_done.load(std::memory_order_acquire) && fills.empty()) {
+        break;
+      }
+      wait.idle();
+      continue;
+    }
+    wait.reset();
+    encode_fill(fill, block.data() + used);
+    used += FILL_RECORD_SIZE;
+    ++stats.fills;
+    if (used == PUBLISH_BLOCK_SIZE) {
+      writer(static_cast<const char *>(block.data()), used);
+      used = 0;
+    }
+  }
+}
+
+}  // namespace cupid
+
+#endif  // INCLUDE_PIPELINE_H_
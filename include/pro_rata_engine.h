@@ -0,0 +1,122 @@
+#ifndef INCLUDE_PRO_RATA_ENGINE_H_
+#define INCLUDE_PRO_RATA_ENGINE_H_
+
+#include <algorithm>
+#include <cstddef>
+#include <cstdint>
+#include "engine_types.h"
+#include "ladder_book.h"
+#include "order_pool.h"
+
+namespace cupid {
+
+// Same tick ladder book as ladder_engine, but the quantity an incoming order trades at a price level
+// is shared among the resting orders in proportion to their size rather than in time priority.
+// The shares are allocated in a single pass over the level queue: the n-th order gets
+// floor(Q * C(n) / A) - floor(Q * C(n-1) / A), where Q is the quantity traded at the level, A the
+// level's aggregate quantity and C(n) the total size of the first n orders. The shares add up to
+// exactly Q and none exceeds the size of its order, the fractions rounded off one share being carried
+// along the queue rather than lost. Rounding down the running total hands the odd lots left over to
+// the orders further back in the queue, not to the earlier ones: time priority plays no part.
+// Self-trade prevention cancelling the resting orders cancels all of the incoming order's own orders
+// at a level before the shares are allocated, so the rest of the level trades in one pass, with a
+// single fill for each resting order.
+// With a non-zero fifo_percent the engine is a FIFO + pro-rata hybrid: that percentage of the
+// quantity traded at each level is first matched in time priority, and only the rest is prorated.
+class pro_rata_engine : public ladder_book<pro_rata_engine> {
+ public:
+  constexpr static uint32_t DEFAULT_FIFO_PERCENT = 0;
+
+  pro_rata_engine();
+  pro_rata_engine(price_t min_px, price_t tick_size, std::size_t num_levels,
+                  std::size_t order_capacity = DEFAULT_ORDER_CAPACITY, uint32_t fifo_percent = DEFAULT_FIFO_PERCENT);
+
+ private:
+  friend class ladder_book<pro_rata_engine>;
+
+  // trade 'order' against one level, its time priority share first and the rest prorated
+  template <typename Sink>
+  void match_level(level_t &level, order_t &order, Sink &sink) noexcept;
+  // trade 'qty' of 'order' against the resting order in 'node', or cut both as self-trade
+  // prevention says, and drop the resting order once empty
+  template <typename Sink>
+  quantity_t match_order(level_t &level, node_t node, order_t &order, quantity_t qty, Sink &sink) noexcept;
+
+  uint32_t fifo_percent;
+};
+
+template <typename Sink>
+quantity_t pro_rata_engine::match_order(level_t &level, node_t node, order_t &order, quantity_t qty,
+                                        Sink &sink) noexcept {
+  order_t &resting = pool[node].order;
+  quantity_t taken;
+  if (resting.trader == order.trader && order.stp != self_trade_prevention::none) [[unlikely]] {
+    // no trade, quantity is cancelled off either order or both instead; decrement takes off the share
+    self_trade_cut cut = order.stp == self_trade_prevention::decrement
+                             ? self_trade_cut{qty, qty}
+                             : prevent_self_trade(order.stp, order.qty, resting.qty);
+    if constexpr (reports_self_trades<Sink>) {
+      sink(cut, resting);
+    }
+    taken = cut.incoming_qty;
+    resting.qty -= cut.resting_qty;
+    level.qty -= cut.resting_qty;
+  } else {
+    taken = qty;
+    sink(fill_t{resting.id, order.id, resting.px, qty, order.side}, resting);
+    resting.qty -= qty;
+    level.qty -= qty;
+  }
+  order.qty -= taken;
+  // a prorated share seldom takes a whole order
+  if (resting.qty == 0) [[unlikely]] {
+    remove_resting(level, node);
+  }
+  return taken;
+}
+
+template <typename Sink>
+void pro_rata_engine::match_level(level_t &level, order_t &order, Sink &sink) noexcept {
+  // the time priority share, taken from the front of the queue
+  auto fifo_qty = static_cast<quantity_t>(std::min<uint64_t>(order.qty, level.qty) * fifo_percent / 100);
+  while (fifo_qty > 0 && order.qty > 0 && !level.empty()) {
+    node_t head = level.orders.head;
+    quantity_t qty = std::min({pool[head].order.qty, order.qty, fifo_qty});
+    fifo_qty -= std::min(fifo_qty, match_order(level, head, order, qty, sink));
+  }
+  if (order.stp == self_trade_prevention::cancel_oldest && order.qty > 0) [[unlikely]] {
+    // out of the aggregate and the prefixes, a share allocated to an own order would be left over
+    for (node_t node = level.orders.head; node != NO_NODE;) {
+      node_t next = pool[node].next;
+      if (pool[node].order.trader == order.trader) {
+        match_order(level, node, order, 0, sink);
+      }
+      node = next;
+    }
+  }
+  if (order.qty == 0 || level.empty()) {
+    return;
+  }
+  // the rest in proportion to size, the shares being the steps of floor(total * prefix / aggregate)
+  uint64_t aggregate = level.qty;
+  uint64_t total = std::min<uint64_t>(order.qty, aggregate);
+  uint64_t prefix = 0;
+  uint64_t allocated = 0;
+  for (node_t node = level.orders.head; node != NO_NODE && order.qty > 0;) {
+    // read before the order may be released
+    node_t next = pool[node].next;
+    prefix += pool[node].order.qty;
+    auto upto = static_cast<uint64_t>(static_cast<unsigned __int128>(total) * prefix / aggregate);
+    // only less than the share once self-trade prevention has cut the incoming order by a share
+    auto qty = static_cast<quantity_t>(std::min<uint64_t>(upto - allocated, order.qty));
+    allocated = upto;
+    if (qty > 0) {
+      match_order(level, node, order, qty, sink);
+    }
+    node = next;
+  }
+}
+
+}  // namespace cupid
+
+#endif  // INCLUDE_PRO_RATA_ENGINE_H_
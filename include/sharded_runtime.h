@@ -0,0 +1,243 @@
+#ifndef INCLUDE_SHARDED_RUNTIME_H_
+#define INCLUDE_SHARDED_RUNTIME_H_
+
+#include <atomic>
+#include <cstdint>
+#include <memory>
+#include <thread>
+#include <vector>
+#include "engine_interface.h"
+#include "engine_types.h"
+#include "instrument_map.h"
+#include "instrument_router.h"
+#include "order_index.h"
+#include "spsc_ring.h"
+
+namespace cupid {
+
+// Matches instruments on num_shards threads. Instruments are assigned round-robin to the shards
+// in order of first appearance, and each shard thread owns an instrument_router<Engine> holding
+// the books of its instruments. Actions travel from the ingress thread to the shard over one SPSC
+// ring per shard and fills come back over another, so the order of actions and fills of every
+// instrument is preserved while instruments on different shards match in parallel.
+// Cancels are routed by the ids of the orders which may rest only: a shard hands back the ids of the
+// orders which stop resting, or never rest, over a third ring, and a cancel drops its route at once,
+// so the routes on either side are bounded by the orders resting at once rather than by the ids
+// handed out.
+// submit, poll and flush are the ingress side and must all be called from one thread.
+template <typename Engine, std::size_t RingCapacity = (1 << 14)>
+class sharded_runtime {
+ public:
+  constexpr static std::size_t DEFAULT_MAX_INSTRUMENTS_PER_SHARD = 64;
+
+  explicit sharded_runtime(std::size_t num_shards,
+                           std::size_t max_instruments_per_shard = DEFAULT_MAX_INSTRUMENTS_PER_SHARD)
+      : running{true}, next_orderid{1}, instruments(num_shards * max_instruments_per_shard) {
+    for (std::size_t i = 0; i < num_shards; ++i) {
+      shards.push_back(std::make_unique<shard>());
+    }
+    for (auto &s : shards) {
+      s->thread = std::thread([this, &owned = *s, max_instruments_per_shard] {
+        run(owned, max_instruments_per_shard);
+      });
+    }
+  }
+
+  // actions still queued are dropped, call flush first to have them all matched
+  ~sharded_runtime() {
+    running.store(false, std::memory_order_release);
+    for (auto &s : shards) {
+      s->thread.join();
+    }
+  }
+
+  sharded_runtime(const sharded_runtime &) = delete;
+  sharded_runtime &operator=(const sharded_runtime &) = delete;
+
+  // route an action to the shard of its instrument, and return the order id assigned to a limit
+  // order, 0 for a cancel and for a reject, which only uses up an id. A limit order for an instrument
+  // outside of the symbol universe is rejected as the router rejects it: it uses up an id and 0 is
+  // returned. A book only rejects an order on its shard, after submit has returned its id. While the
+  // shard's ring is full, the fills already produced are handed to sink(const fill_t &) so that a
+  // shard waiting on its output ring can make progress
+  template <typename Sink>
+  orderid_t submit(const action_t &action, Sink &&sink);
+
+  // hand every fill available so far to sink(const fill_t &), fill ids are the runtime's order ids,
+  // and drop the routes of the orders the shards closed so far
+  template <typename Sink>
+  std::size_t poll(Sink &&sink);
+
+  // wait until every submitted action is matched and all of its fills are polled
+  template <typename Sink>
+  void flush(Sink &&sink);
+
+  // orders a cancel is still routed to, on the ingress side and summed over the shards, both bounded
+  // by the orders resting at once. The shards' count may only be read once flush has returned
+  [[nodiscard]] std::size_t num_routes() const noexcept { return routes.size(); }
+  [[nodiscard]] std::size_t num_shard_routes() const noexcept {
+    std::size_t count = 0;
+    for (const auto &s : shards) {
+      count += s->orderids.size();
+    }
+    return count;
+  }
+
+ private:
+  struct shard {
+    spsc_ring<action_t, RingCapacity> input;
+    spsc_ring<fill_t, RingCapacity> output;
+    // runtime order ids of the orders which stopped resting or never rested
+    spsc_ring<orderid_t, RingCapacity> closed;
+    // written by the shard thread only
+    alignas(CACHE_LINE_SIZE) std::atomic<uint64_t> processed{0};
+    // runtime order id of each resting order, by the id the shard's router assigned
+    order_index<orderid_t> orderids;
+    // read and written by the ingress thread only
+    alignas(CACHE_LINE_SIZE) uint64_t submitted{0};
+    // limit orders routed so far, which is also the id the shard's router assigns to the last one
+    orderid_t limits{0};
+    std::thread thread;
+  };
+  struct route {
+    uint32_t shard;
+    orderid_t shard_orderid;
+  };
+
+  void run(shard &s, std::size_t max_instruments);
+  // push 'item' from the shard thread, waiting for the ingress to make room
+  template <typename T>
+  void publish(spsc_ring<T, RingCapacity> &ring, const T &item) noexcept {
+    while (!ring.try_push(item) && running.load(std::memory_order_relaxed)) {
+      std::this_thread::yield();
+    }
+  }
+
+  std::atomic<bool> running;
+  // ingress side state
+  orderid_t next_orderid;
+  instrument_map instruments;
+  // shard and shard order id of each order which may rest, by runtime order id
+  order_index<route> routes;
+  std::vector<std::unique_ptr<shard>> shards;
+};
+
+template <typename Engine, std::size_t RingCapacity>
+void sharded_runtime<Engine, RingCapacity>::run(shard &s, std::size_t max_instruments) {
+  instrument_router<Engine> router(max_instruments);
+  action_t action;
+  while (running.load(std::memory_order_acquire)) {
+    if (!s.input.try_pop(action)) {
+      std::this_thread::yield();
+      continue;
+    }
+    if (action.is_limit()) {
+      orderid_t curr_id = action.order.id;
+      orderid_t router_id = router.limit(
+          action.order, overloaded{[&](const fill_t &fill, const order_t &resting) {
+                                     orderid_t resting_id = *s.orderids.find(fill.resting_id);
+                                     if (fill.qty == resting.qty) {
+                                       s.orderids.erase(fill.resting_id);
+                                       publish(s.closed, resting_id);
+                                     }
+                                     publish(s.output, fill_t{resting_id, curr_id, fill.px, fill.qty,
+                                                              fill.aggressor_side});
+                                   },
+                                   [&](const self_trade_cut &cut, const order_t &resting) {
+                                     if (cut.resting_qty == resting.qty) {
+                                       publish(s.closed, *s.orderids.find(resting.id));
+                                       s.orderids.erase(resting.id);
+                                     }
+                                   }});
+      if (router_id != 0 && router.resting(router_id)) {
+        s.orderids.insert(router_id, curr_id);
+      } else {
+        publish(s.closed, curr_id);
+      }
+    } else if (router.cancel(action.cancel_id)) {
+      // the ingress dropped the route when it routed the cancel
+      s.orderids.erase(action.cancel_id);
+    }
+    s.processed.store(s.processed.load(std::memory_order_relaxed) + 1, std::memory_order_release);
+  }
+}
+
+template <typename Engine, std::size_t RingCapacity>
+template <typename Sink>
+orderid_t sharded_runtime<Engine, RingCapacity>::submit(const action_t &action, Sink &&sink) {
+  action_t routed = action;
+  orderid_t curr_id = 0;
+  uint32_t shard_id;
+  if (action.is_reject()) {
+    // the shards never see the order
+    ++next_orderid;
+    return 0;
+  }
+  if (action.is_limit()) {
+    curr_id = next_orderid++;
+    uint32_t idx = instruments.find_or_insert(action.order.instr);
+    if (idx == instrument_map::NO_INDEX) {
+      // outside of the symbol universe, reject
+      return 0;
+    }
+    shard_id = idx % shards.size();
+    routed.order.id = curr_id;
+    routes.insert(curr_id, {shard_id, ++shards[shard_id]->limits});
+  } else {
+    const route *found = routes.find(action.cancel_id);
+    if (found == nullptr) {
+      return 0;
+    }
+    shard_id = found->shard;
+    routed.cancel_id = found->shard_orderid;
+    // the order no longer rests once the shard has run the cancel
+    routes.erase(action.cancel_id);
+  }
+  shard &s = *shards[shard_id];
+  while (!s.input.try_push(routed)) {
+    if (poll(sink) == 0) {
+      std::this_thread::yield();
+    }
+  }
+  ++s.submitted;
+  return curr_id;
+}
+
+template <typename Engine, std::size_t RingCapacity>
+template <typename Sink>
+std::size_t sharded_runtime<Engine, RingCapacity>::poll(Sink &&sink) {
+  std::size_t polled = 0;
+  fill_t fill;
+  orderid_t closed;
+  for (auto &s : shards) {
+    while (s->output.try_pop(fill)) {
+      sink(fill);
+      ++polled;
+    }
+    while (s->closed.try_pop(closed)) {
+      // already dropped if a cancel was routed to the order
+      if (routes.find(closed) != nullptr) {
+        routes.erase(closed);
+      }
+    }
+  }
+  return polled;
+}
+
+template <typename Engine, std::size_t RingCapacity>
+template <typename Sink>
+void sharded_runtime<Engine, RingCapacity>::flush(Sink &&sink) {
+  for (auto &s : shards) {
+    while (s->processed.load(std::memory_order_acquire) < s->submitted) {
+      if (poll(sink) == 0) {
+        std::this_thread::yield();
+      }
+    }
+  }
+  // fills are published before the action is counted as processed
+  poll(sink);
+}
+
+}  // namespace cupid
+
+#endif  // INCLUDE_SHARDED_RUNTIME_H_
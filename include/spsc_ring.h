@@ -0,0 +1,70 @@
+#ifndef INCLUDE_SPSC_RING_H_
+#define INCLUDE_SPSC_RING_H_
+
+#include <atomic>
+#include <cstddef>
+#include <memory>
+#include <type_traits>
+#include "engine_types.h"
+
+namespace cupid {
+
+// Bounded lock-free queue between exactly one producer thread and one consumer thread.
+// The producer and consumer positions sit on their own cache line, and each side keeps a cached
+// copy of the other side's position so the shared line is only read when the cache looks full/empty.
+template <typename T, std::size_t Capacity>
+class spsc_ring {
+  static_assert(Capacity > 0 && (Capacity & (Capacity - 1)) == 0, "capacity must be a power of 2");
+  static_assert(std::is_trivially_copyable_v<T>);
+
+ public:
+  spsc_ring() : slots{std::make_unique<T[]>(Capacity)} {}
+
+  // producer side, false when the ring is full
+  bool try_push(const T &item) noexcept {
+    std::size_t tail = producer.pos.load(std::memory_order_relaxed);
+    if (tail - producer.cached_peer == Capacity) {
+      producer.cached_peer = consumer.pos.load(std::memory_order_acquire);
+      if (tail - producer.cached_peer == Capacity) {
+        return false;
+      }
+    }
+    slots[tail & (Capacity - 1)] = item;
+    producer.pos.store(tail + 1, std::memory_order_release);
+    return true;
+  }
+
+  // consumer side, false when the ring is empty
+  bool try_pop(T &item) noexcept {
+    std::size_t head = consumer.pos.load(std::memory_order_relaxed);
+    if (head == consumer.cached_peer) {
+      consumer.cached_peer = producer.pos.load(std::memory_order_acquire);
+      if (head == consumer.cached_peer) {
+        return false;
+      }
+    }
+    item = slots[head & (Capacity - 1)];
+    consumer.pos.store(head + 1, std::memory_order_release);
+    return true;
+  }
+
+  // consumer side, true when the producer has published nothing more
+  [[nodiscard]] bool empty() const noexcept {
+    return consumer.pos.load(std::memory_order_relaxed) == producer.pos.load(std::memory_order_acquire);
+  }
+
+ private:
+  struct alignas(CACHE_LINE_SIZE) position {
+    std::atomic<std::size_t> pos{0};
+    // last seen position of the other side, only touched by the owner of this position
+    std::size_t cached_peer{0};
+  };
+
+  position producer;
+  position consumer;
+  std::unique_ptr<T[]> slots;
+};
+
+}  // namespace cupid
+
+#endif  // INCLUDE_SPSC_RING_H_
@@ -0,0 +1,90 @@
+#ifndef INCLUDE_TRACE_CODEC_H_
+#define INCLUDE_TRACE_CODEC_H_
+
+#include <cstring>
+#include "engine_types.h"
+
+namespace cupid {
+
+// Wire format of the benchmark traces written by test/order_trace_generator.py, packed little
+// endian as '<b Q Q L b 4s 4s Q': action, order id, px, qty, side, instr, trader, cancel id.
+// The codec copies fields in host byte order, so it assumes a little endian host.
+constexpr static std::size_t TRACE_RECORD_SIZE = 38;
+
+inline action_t decode_trace(const char *record) noexcept {
+  action_t action{};
+  std::memcpy(&action.action, record, sizeof(action.action));
+  std::memcpy(&action.order.id, record + 1, sizeof(action.order.id));
+  std::memcpy(&action.order.px, record + 9, sizeof(action.order.px));
+  std::memcpy(&action.order.qty, record + 17, sizeof(action.order.qty));
+  std::memcpy(&action.order.side, record + 21, sizeof(action.order.side));
+  std::memcpy(action.order.instr.data(), record + 22, INSTRUMENT_LEN);
+  std::memcpy(action.order.trader.data(), record + 26, TRADER_LEN);
+  std::memcpy(&action.cancel_id, record + 30, sizeof(action.cancel_id));
+  return action;
+}
+
+inline void encode_trace(const action_t &action, char *record) noexcept {
+  std::memcpy(record, &action.action, sizeof(action.action));
+  std::memcpy(record + 1, &action.order.id, sizeof(action.order.id));
+  std::memcpy(record + 9, &action.order.px, sizeof(action.order.px));
+  std::memcpy(record + 17, &action.order.qty, sizeof(action.order.qty));
+  std::memcpy(record + 21, &action.order.side, sizeof(action.order.side));
+  std::memcpy(record + 22, action.order.instr.data(), INSTRUMENT_LEN);
+  std::memcpy(record + 26, action.order.trader.data(), TRADER_LEN);
+  std::memcpy(record + 30, &action.cancel_id, sizeof(action.cancel_id));
+}
+
+// sanity checks of a decoded record before it is allowed to reach an engine
+inline bool is_valid(const action_t &action) noexcept {
+  if (action.is_limit()) {
+    return action.order.qty > 0 && (action.order.side == side_t::bid || action.order.side == side_t::ask);
+  }
+  return action.is_cancel() && action.cancel_id > 0;
+}
+
+// Wire format of a fill, packed as resting id, aggressor id, px, qty, aggressor side
+constexpr static std::size_t FILL_RECORD_SIZE = 29;
+
+inline void encode_fill(const fill_t &fill, char *record) noexcept {
+  std::memcpy(record, &fill.resting_id, sizeof(fill.resting_id));
+  std::memcpy(record + 8, &fill.aggressor_id, sizeof(fill.aggressor_id));
+  std::memcpy(record + 16, &fill.px, sizeof(fill.px));
+  std::memcpy(record + 24, &fill.qty, sizeof(fill.qty));
+  std::memcpy(record + 28, &fill.aggressor_side, sizeof(fill.aggressor_side));
+}
+
+inline fill_t decode_fill(const char *record) noexcept {
+  fill_t fill{};
+  std::memcpy(&fill.resting_id, record, sizeof(fill.resting_id));
+  std::memcpy(&fill.aggressor_id, record + 8, sizeof(fill.aggressor_id));
+  std::memcpy(&fill.px, record + 16, sizeof(fill.px));
+  std::memcpy(&fill.qty, record + 24, sizeof(fill.qty));
+  std::memcpy(&fill.aggressor_side, record + 28, sizeof(fill.aggressor_side));
+  return fill;
+}
+
+// Wire format of a level update, packed as type, side, px, aggregate qty, order count
+constexpr static std::size_t LEVEL_UPDATE_RECORD_SIZE = 22;
+
+inline void encode_level_update(const level_update_t &update, char *record) noexcept {
+  std::memcpy(record, &update.type, sizeof(update.type));
+  std::memcpy(record + 1, &update.side, sizeof(update.side));
+  std::memcpy(record + 2, &update.px, sizeof(update.px));
+  std::memcpy(record + 10, &update.qty, sizeof(update.qty));
+  std::memcpy(record + 18, &update.count, sizeof(update.count));
+}
+
+inline level_update_t decode_level_update(const char *record) noexcept {
+  level_update_t update{};
+  std::memcpy(&update.type, record, sizeof(update.type));
+  std::memcpy(&update.side, record + 1, sizeof(update.side));
+  std::memcpy(&update.px, record + 2, sizeof(update.px));
+  std::memcpy(&update.qty, record + 10, sizeof(update.qty));
+  std::memcpy(&update.count, record + 18, sizeof(update.count));
+  return update;
+}
+
+}  // namespace cupid
+
+#endif  // INCLUDE_TRACE_CODEC_H_
@@ -0,0 +1,141 @@
+#ifndef INCLUDE_TRADER_INDEX_H_
+#define INCLUDE_TRADER_INDEX_H_
+
+#include <bit>
+#include <cassert>
+#include <cstdint>
+#include <limits>
+#include <unordered_map>
+#include <vector>
+#include "engine_types.h"
+
+namespace cupid {
+
+// whether an order on 'order_side' and 'order_instr' falls under a mass cancel limited to 'side' and
+// 'instr', side_t::invalid and the empty instrument standing for any
+inline bool in_cancel_scope(side_t order_side, const instr_t &order_instr, side_t side, const instr_t &instr) noexcept {
+  return (side == side_t::invalid || side == order_side) && (instr == instr_t{} || instr == order_instr);
+}
+
+// Resting orders of each trader, for mass cancels. An order is known by a Handle, its order id or
+// the pool node it sits in, and the orders of a trader form a doubly linked list threaded through a
+// vector indexed by handle, so adding or removing an order is O(1) and walking a trader's orders
+// takes as many steps as the trader has resting orders. Pooled engines should key on their nodes:
+// those are reused, so the links stay as compact and cache resident as the pool itself. Engines
+// without a pool use pooled_trader_index instead.
+// Only adding an order looks the trader up in the hash map, to find the head of its list.
+template <typename Handle>
+class trader_index {
+ public:
+  void reserve(std::size_t num_orders) { links.reserve(num_orders); }
+
+  void insert(Handle handle, const trader_t &trader) {
+    auto [it, inserted] = lists.try_emplace(std::bit_cast<uint32_t>(trader), static_cast<uint32_t>(heads.size()));
+    if (inserted) {
+      heads.push_back(NONE);
+    }
+    if (handle >= links.size()) {
+      links.resize(handle + 1);
+    }
+    uint32_t list = it->second;
+    links[handle] = {NONE, heads[list], list};
+    if (heads[list] != NONE) {
+      links[heads[list]].prev = handle;
+    }
+    heads[list] = handle;
+  }
+
+  void erase(Handle handle) noexcept {
+    const link &l = links[handle];
+    if (l.prev == NONE) {
+      heads[l.list] = l.next;
+    } else {
+      links[l.prev].next = l.next;
+    }
+    if (l.next != NONE) {
+      links[l.next].prev = l.prev;
+    }
+  }
+
+  // fn(handle) for every resting order of the trader, newest first; fn may erase the order it is handed
+  template <typename Fn>
+  void for_each(const trader_t &trader, Fn &&fn) const {
+    auto it = lists.find(std::bit_cast<uint32_t>(trader));
+    if (it == lists.end()) {
+      return;
+    }
+    for (Handle handle = heads[it->second]; handle != NONE;) {
+      Handle next = links[handle].next;
+      fn(handle);
+      handle = next;
+    }
+  }
+
+ private:
+  constexpr static Handle NONE = std::numeric_limits<Handle>::max();
+
+  struct link {
+    Handle prev;
+    Handle next;
+    uint32_t list;
+  };
+
+  std::unordered_map<uint32_t, uint32_t> lists;
+  // newest resting order of each list
+  std::vector<Handle> heads;
+  std::vector<link> links;
+};
+
+// Resting orders of each trader for the engines which know their orders by order id only. Keying
+// trader_index on ids would size its links by every id ever handed out, so each resting order takes
+// a slot off a free list instead and the links are keyed on slots. Released slots are reused first,
+// so the index is bounded by the orders resting at once. The engine keeps the slot of each order
+// with its location and hands it back to erase the order.
+class pooled_trader_index {
+ public:
+  using slot_t = uint32_t;
+
+  void reserve(std::size_t num_orders) {
+    orderids.reserve(num_orders);
+    links.reserve(num_orders);
+  }
+
+  slot_t insert(orderid_t orderid, const trader_t &trader) {
+    slot_t slot = free_head;
+    if (slot != NO_SLOT) {
+      free_head = static_cast<slot_t>(orderids[slot]);
+      orderids[slot] = orderid;
+    } else {
+      // only grows while warming up
+      assert(orderids.size() < NO_SLOT);
+      slot = static_cast<slot_t>(orderids.size());
+      orderids.push_back(orderid);
+    }
+    links.insert(slot, trader);
+    return slot;
+  }
+
+  void erase(slot_t slot) noexcept {
+    links.erase(slot);
+    orderids[slot] = free_head;
+    free_head = slot;
+  }
+
+  // fn(orderid) for every resting order of the trader, newest first; fn may erase the order it is handed
+  template <typename Fn>
+  void for_each(const trader_t &trader, Fn &&fn) const {
+    links.for_each(trader, [&](slot_t slot) { fn(orderids[slot]); });
+  }
+
+ private:
+  constexpr static slot_t NO_SLOT = std::numeric_limits<slot_t>::max();
+
+  // order id in each slot in use, and the next free slot in each free one
+  std::vector<orderid_t> orderids;
+  slot_t free_head = NO_SLOT;
+  trader_index<slot_t> links;
+};
+
+}  // namespace cupid
+
+#endif  // INCLUDE_TRADER_INDEX_H_
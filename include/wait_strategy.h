@@ -0,0 +1,47 @@
+#ifndef INCLUDE_WAIT_STRATEGY_H_
+#define INCLUDE_WAIT_STRATEGY_H_
+
+#include <cstdint>
+#include <thread>
+
+namespace cupid {
+
+// hint the core that we are spinning, it frees resources for the sibling hyper-thread
+inline void cpu_relax() noexcept {
+#if defined(__x86_64__) || defined(__i386__)
+  __builtin_ia32_pause();
+#elif defined(__aarch64__)
+  asm volatile("yield");
+#endif
+}
+
+// How a pipeline stage waits on an empty input ring or a full output ring: idle() is called on
+// every attempt which made no progress and reset() after every one which did.
+
+// Never give the core away, lowest latency but each stage needs a core of its own
+struct busy_spin_wait {
+  void idle() noexcept { cpu_relax(); }
+  void reset() noexcept {}
+};
+
+// Spin for a while, then yield the core to the other threads, for stages sharing cores
+class backoff_wait {
+ public:
+  void idle() noexcept {
+    if (spins < SPIN_LIMIT) {
+      ++spins;
+      cpu_relax();
+    } else {
+      std::this_thread::yield();
+    }
+  }
+  void reset() noexcept { spins = 0; }
+
+ private:
+  constexpr static uint32_t SPIN_LIMIT = 1024;
+  uint32_t spins = 0;
+};
+
+}  // namespace cupid
+
+#endif  // INCLUDE_WAIT_STRATEGY_H_
@@ -1,4 +1,7 @@
 #include <cassert>
+#include <cstdint>
+#include <set>
+#include <span>
 #include <utility>
 #include <vector>
 #include "benchmark_engine.h"
@@ -9,92 +12,62 @@ namespace cupid {
 
 benchmark_engine::benchmark_engine() : next_orderid{1} {};
 
-std::pair<orderid_t, std::vector<execution_t>> benchmark_engine::limit(order_t order) noexcept {
-  std::vector<execution_t> execs;
-  orderid_t curr_id = next_orderid++;
-  order.id = curr_id;
-  price_t px = order.px;
-  assert(order.qty > 0);
-  if (order.side == side_t::bid) {
-    for (auto ask_it = ask_side.begin(); ask_it != ask_side.end();) {
-      if (ask_it->px > px) {
-        // bid order rest on book
-        break;
-      } else {
-        // match happen
-        price_t traded_px = ask_it->px;
-        quantity_t traded_qty = std::min(ask_it->qty, order.qty);
-        execs.push_back({ask_it->id, traded_px, traded_qty, side_t::ask, ask_it->instr, ask_it->trader});
-        execs.push_back({curr_id, traded_px, traded_qty, side_t::bid, order.instr, order.trader});
-        auto node = ask_side.extract(ask_it++);
-        node.value().qty -= traded_qty;
-        // ask_it->qty -= traded_qty;
-        order.qty -= traded_qty;
-        if (node.value().qty == 0) {
-          // fully filled
-        } else {
-          ask_side.insert(std::move(node));
-        }
-        if (order.qty == 0) {
-          // full executed
-          break;
-        }
-      }
-    }
-    if (order.qty > 0) {
-      bid_side.insert(order);
+bool benchmark_engine::can_fill(side_t side, price_t px, quantity_t qty) const noexcept {
+  uint64_t available = 0;
+  if (side == side_t::bid) {
+    for (auto ask_it = ask_side.begin(); ask_it != ask_side.end() && ask_it->px <= px && available < qty; ++ask_it) {
+      available += ask_it->qty;
     }
   } else {
-    for (auto bid_it = bid_side.begin(); bid_it != bid_side.end();) {
-      if (bid_it->px < px) {
-        // ask order rest on book
-        break;
-      } else {
-        // match happen
-        price_t traded_px = bid_it->px;
-        quantity_t traded_qty = std::min(bid_it->qty, order.qty);
-        execs.push_back({bid_it->id, traded_px, traded_qty, side_t::bid, bid_it->instr, bid_it->trader});
-        execs.push_back({curr_id, traded_px, traded_qty, side_t::ask, order.instr, order.trader});
-        // bid_it->qty -= traded_qty;
-        auto node = bid_side.extract(bid_it++);
-        node.value().qty -= traded_qty;
-        order.qty -= traded_qty;
-        if (node.value().qty == 0) {
-          // fully filled
-        } else {
-          bid_side.insert(std::move(node));
-        }
-        if (order.qty == 0) {
-          // full executed
-          break;
-        }
-      }
-    }
-    if (order.qty > 0) {
-      ask_side.insert(order);
+    for (auto bid_it = bid_side.begin(); bid_it != bid_side.end() && bid_it->px >= px && available < qty; ++bid_it) {
+      available += bid_it->qty;
     }
   }
-  return {curr_id, execs};
+  return available >= qty;
 }
 
-bool benchmark_engine::cancel(orderid_t orderid) noexcept {
-  for (auto it = bid_side.begin(); it != bid_side.end();) {
-    if (it->id == orderid) {
-      bid_side.erase(it);
-      return true;
+std::size_t benchmark_engine::depth(side_t side, std::span<price_level_t> levels) const noexcept {
+  // the sides hold orders, the consecutive ones of the same price make up a level
+  const auto &book = side == side_t::bid ? bid_side : ask_side;
+  std::size_t n = 0;
+  for (auto it = book.begin(); it != book.end(); ++it) {
+    if (n > 0 && levels[n - 1].px == it->px) {
+      levels[n - 1].qty += it->qty;
+      ++levels[n - 1].count;
+    } else if (n < levels.size()) {
+      levels[n++] = {it->px, it->qty, 1};
     } else {
-      ++it;
+      break;
     }
   }
-  for (auto it = ask_side.begin(); it != ask_side.end();) {
-    if (it->id == orderid) {
-      ask_side.erase(it);
-      return true;
-    } else {
-      ++it;
-    }
+  return n;
+}
+
+bool benchmark_engine::cancel(orderid_t orderid) noexcept {
+  location *loc = locations.find(orderid);
+  if (loc == nullptr) {
+    return false;
+  }
+  if (loc->position->side == side_t::bid) {
+    bid_side.erase(loc->position);
+  } else {
+    ask_side.erase(loc->position);
   }
-  return false;
+  traders.erase(loc->trader_slot);
+  locations.erase(orderid);
+  return true;
+}
+
+std::size_t benchmark_engine::cancel_all(const trader_t &trader, side_t side, const instr_t &instr) noexcept {
+  std::size_t cancelled = 0;
+  traders.for_each(trader, [&](orderid_t orderid) {
+    const order_t &order = *locations.find(orderid)->position;
+    if (in_cancel_scope(order.side, order.instr, side, instr)) {
+      cancel(orderid);
+      ++cancelled;
+    }
+  });
+  return cancelled;
 }
 
 }  // namespace cupid
@@ -1,4 +1,6 @@
 #include <cassert>
+#include <cstdint>
+#include <span>
 #include <algorithm>
 #include <utility>
 #include <vector>
@@ -8,85 +10,94 @@
 
 namespace cupid {
 
-default_engine::default_engine() : next_orderid{1} {};
+template <top_of_book Top>
+sorted_vector_engine<Top>::sorted_vector_engine() : next_orderid{1} {}
 
-std::pair<orderid_t, std::vector<execution_t>> default_engine::limit(order_t order) noexcept {
-  std::vector<execution_t> execs;
-  orderid_t curr_id = next_orderid++;
-  order.id = curr_id;
-  price_t px = order.px;
-  assert(order.qty > 0);
-  if (order.side == side_t::bid) {
-    for (auto ask_it = ask_side.begin(); ask_it != ask_side.end();) {
-      if (ask_it->px > px) {
-        // bid order rest on book
+template <top_of_book Top>
+typename std::vector<typename sorted_vector_engine<Top>::book_entry>::iterator sorted_vector_engine<Top>::find_entry(
+    orderid_t orderid, const location &loc) noexcept {
+  // (px, id) is unique and both sides are sorted on it
+  book_entry key{orderid, loc.px, 0, {}};
+  typename std::vector<book_entry>::iterator it;
+  if (loc.side == side_t::bid) {
+    it = std::lower_bound(bid_side.begin(), bid_side.end(), key, sorts_before<side_t::bid>);
+    assert(it != bid_side.end() && it->id == orderid);
+  } else {
+    it = std::lower_bound(ask_side.begin(), ask_side.end(), key, sorts_before<side_t::ask>);
+    assert(it != ask_side.end() && it->id == orderid);
+  }
+  return it;
+}
+
+template <top_of_book Top>
+bool sorted_vector_engine<Top>::can_fill(side_t side, price_t px, quantity_t qty) const noexcept {
+  uint64_t available = 0;
+  if (side == side_t::bid) {
+    for (const book_entry &ask : from_top(ask_side)) {
+      if (ask.px > px || available >= qty) {
         break;
-      } else {
-        // match happens
-        price_t traded_px = ask_it->px;
-        quantity_t traded_qty = std::min(ask_it->qty, order.qty);
-        execs.push_back({ask_it->id, traded_px, traded_qty, side_t::ask, ask_it->instr, ask_it->trader});
-        execs.push_back({curr_id, traded_px, traded_qty, side_t::bid, order.instr, order.trader});
-        order.qty -= traded_qty;
-        ask_it->qty -= traded_qty;
-        if (ask_it->qty == 0) {
-          ask_it = ask_side.erase(ask_it);
-        }
-        if (order.qty == 0) {
-          // incoming order fully executed
-          break;
-        }
       }
+      available += ask.qty;
     }
   } else {
-    for (auto bid_it = bid_side.begin(); bid_it != bid_side.end();) {
-      if (bid_it->px < px) {
-        // ask order rest on book
+    for (const book_entry &bid : from_top(bid_side)) {
+      if (bid.px < px || available >= qty) {
         break;
-      } else {
-        // match happens
-        price_t traded_px = bid_it->px;
-        quantity_t traded_qty = std::min(bid_it->qty, order.qty);
-        execs.push_back({bid_it->id, traded_px, traded_qty, side_t::bid, bid_it->instr, bid_it->trader});
-        execs.push_back({curr_id, traded_px, traded_qty, side_t::ask, order.instr, order.trader});
-        order.qty -= traded_qty;
-        bid_it->qty -= traded_qty;
-        if (bid_it->qty == 0) {
-          bid_it = bid_side.erase(bid_it);
-        }
-        if (order.qty == 0) {
-          // incoming order fully executed
-          break;
-        }
       }
+      available += bid.qty;
     }
   }
-  if (order.qty > 0) {
-    // not fully executed, rest on book
-    // need to keep the bid/ask_side sorted
-    if (order.side == side_t::bid) {
-      const auto& insert_pos = std::lower_bound(bid_side.begin(), bid_side.end(), order, [](auto& o1, auto& o2) -> bool { return o1.px > o2.px || (o1.px == o2.px && o1.id < o2.id);});
-      bid_side.insert(insert_pos, order);
+  return available >= qty;
+}
+
+template <top_of_book Top>
+std::size_t sorted_vector_engine<Top>::depth(side_t side, std::span<price_level_t> levels) const noexcept {
+  // the sides hold orders, the consecutive ones of the same price make up a level
+  std::size_t n = 0;
+  for (const book_entry &entry : from_top(side == side_t::bid ? bid_side : ask_side)) {
+    if (n > 0 && levels[n - 1].px == entry.px) {
+      levels[n - 1].qty += entry.qty;
+      ++levels[n - 1].count;
+    } else if (n < levels.size()) {
+      levels[n++] = {entry.px, entry.qty, 1};
     } else {
-      const auto& insert_pos = std::lower_bound(ask_side.begin(), ask_side.end(), order, [](auto& o1, auto& o2) -> bool { return o1.px < o2.px || (o1.px == o2.px && o1.id < o2.id);});
-      ask_side.insert(insert_pos, order);
+      break;
     }
   }
-  return {curr_id, execs};
+  return n;
 }
 
-bool default_engine::cancel(orderid_t orderid) noexcept {
-  auto it = std::find_if(bid_side.begin(), bid_side.end(), [orderid](const order_t &this_order) { return this_order.id == orderid; });
-  if (it != bid_side.end()) {
-    bid_side.erase(it);
-    return true;
+template <top_of_book Top>
+bool sorted_vector_engine<Top>::cancel(orderid_t orderid) noexcept {
+  const location *loc = locations.find(orderid);
+  if (loc == nullptr) {
+    return false;
   }
-  it = std::find_if(ask_side.begin(), ask_side.end(), [orderid](const order_t &this_order) { return this_order.id == orderid; });
-  if (it != ask_side.end()) {
+  auto it = find_entry(orderid, *loc);
+  if (loc->side == side_t::bid) {
+    bid_side.erase(it);
+  } else {
     ask_side.erase(it);
-    return true;
   }
-  return false;
+  traders.erase(loc->trader_slot);
+  locations.erase(orderid);
+  return true;
+}
+
+template <top_of_book Top>
+std::size_t sorted_vector_engine<Top>::cancel_all(const trader_t &trader, side_t side, const instr_t &instr) noexcept {
+  std::size_t cancelled = 0;
+  traders.for_each(trader, [&](orderid_t orderid) {
+    const location *loc = locations.find(orderid);
+    if (in_cancel_scope(loc->side, loc->instr, side, instr)) {
+      cancel(orderid);
+      ++cancelled;
+    }
+  });
+  return cancelled;
 }
 
+template class sorted_vector_engine<top_of_book::front>;
+template class sorted_vector_engine<top_of_book::back>;
+
 }  // namespace cupid
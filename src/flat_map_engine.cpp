@@ -0,0 +1,88 @@
+#include <cassert>
+#include <cstdint>
+#include <span>
+#include <algorithm>
+#include <utility>
+#include <vector>
+#include "flat_map_engine.h"
+#include "engine_interface.h"
+#include "engine_types.h"
+
+namespace cupid {
+
+flat_map_engine::flat_map_engine() : flat_map_engine(DEFAULT_ORDER_CAPACITY) {}
+
+flat_map_engine::flat_map_engine(std::size_t order_capacity) : next_orderid{1}, pool(order_capacity) {
+  locations.reserve(order_capacity);
+  traders.reserve(order_capacity);
+}
+
+bool flat_map_engine::can_fill(side_t side, price_t px, quantity_t qty) const noexcept {
+  uint64_t available = 0;
+  if (side == side_t::bid) {
+    for (auto it = ask_levels.rbegin(); it != ask_levels.rend() && it->px <= px && available < qty; ++it) {
+      available += it->qty;
+    }
+  } else {
+    for (auto it = bid_levels.rbegin(); it != bid_levels.rend() && it->px >= px && available < qty; ++it) {
+      available += it->qty;
+    }
+  }
+  return available >= qty;
+}
+
+std::size_t flat_map_engine::depth(side_t side, std::span<price_level_t> levels) const noexcept {
+  const std::vector<level_t> &book = side == side_t::bid ? bid_levels : ask_levels;
+  std::size_t n = std::min(levels.size(), book.size());
+  for (std::size_t i = 0; i < n; ++i) {
+    const level_t &l = book[book.size() - 1 - i];
+    levels[i] = {l.px, l.qty, l.count};
+  }
+  return n;
+}
+
+price_level_t flat_map_engine::level(side_t side, price_t px) const noexcept {
+  const std::vector<level_t> &book = side == side_t::bid ? bid_levels : ask_levels;
+  auto it = side == side_t::bid ? std::lower_bound(book.begin(), book.end(), px, bid_before)
+                                : std::lower_bound(book.begin(), book.end(), px, ask_before);
+  if (it == book.end() || it->px != px) {
+    return {px, 0, 0};
+  }
+  return {px, it->qty, it->count};
+}
+
+bool flat_map_engine::cancel(orderid_t orderid) noexcept {
+  node_t *loc = locations.find(orderid);
+  if (loc == nullptr) {
+    return false;
+  }
+  node_t node = *loc;
+  locations.erase(orderid);
+  traders.erase(node);
+  const order_t &order = pool[node].order;
+  std::vector<level_t> &levels = order.side == side_t::bid ? bid_levels : ask_levels;
+  auto it = find_level(order.side, order.px);
+  assert(it != levels.end() && it->px == order.px);
+  pool.unlink(it->orders, node);
+  it->qty -= order.qty;
+  --it->count;
+  if (it->orders.empty()) {
+    levels.erase(it);
+  }
+  pool.release(node);
+  return true;
+}
+
+std::size_t flat_map_engine::cancel_all(const trader_t &trader, side_t side, const instr_t &instr) noexcept {
+  std::size_t cancelled = 0;
+  traders.for_each(trader, [&](node_t node) {
+    const order_t &order = pool[node].order;
+    if (in_cancel_scope(order.side, order.instr, side, instr)) {
+      cancel(order.id);
+      ++cancelled;
+    }
+  });
+  return cancelled;
+}
+
+}  // namespace cupid
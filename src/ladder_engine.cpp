@@ -0,0 +1,12 @@
+#include <cstddef>
+#include "ladder_engine.h"
+#include "engine_types.h"
+
+namespace cupid {
+
+ladder_engine::ladder_engine() : ladder_engine(DEFAULT_MIN_PX, DEFAULT_TICK_SIZE, DEFAULT_NUM_LEVELS) {}
+
+ladder_engine::ladder_engine(price_t min_px, price_t tick_size, std::size_t num_levels, std::size_t order_capacity)
+    : ladder_book(min_px, tick_size, num_levels, order_capacity) {}
+
+}  // namespace cupid
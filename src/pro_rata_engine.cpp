@@ -0,0 +1,17 @@
+#include <cassert>
+#include <cstddef>
+#include <cstdint>
+#include "pro_rata_engine.h"
+#include "engine_types.h"
+
+namespace cupid {
+
+pro_rata_engine::pro_rata_engine() : pro_rata_engine(DEFAULT_MIN_PX, DEFAULT_TICK_SIZE, DEFAULT_NUM_LEVELS) {}
+
+pro_rata_engine::pro_rata_engine(price_t min_px, price_t tick_size, std::size_t num_levels, std::size_t order_capacity,
+                                 uint32_t fifo_percent)
+    : ladder_book(min_px, tick_size, num_levels, order_capacity), fifo_percent{fifo_percent} {
+  assert(fifo_percent <= 100);
+}
+
+}  // namespace cupid
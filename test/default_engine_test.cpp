@@ -1,5 +1,8 @@
 #include <gtest/gtest.h>
 
+#include <span>
+#include <utility>
+#include <vector>
 #include "default_engine.h"
 #include "engine_interface.h"
 #include "engine_types.h"
@@ -93,6 +96,54 @@ TEST(DefaultEngineTests, BasicCancelTest) {
   EXPECT_TRUE(engine.cancel(2));
 }
 
+TEST(DefaultEngineTests, CancelUnknownOrderTest) {
+  default_engine engine;
+
+  // ids which were never handed out
+  EXPECT_FALSE(engine.cancel(0));
+  EXPECT_FALSE(engine.cancel(1));
+
+  const auto &[id1, exec1] = engine.limit({0, 990000, 100, side_t::bid, instr, b1});
+  const auto &[id2, exec2] = engine.limit({0, 990000, 100, side_t::bid, instr, b2});
+  const auto &[id3, exec3] = engine.limit({0, 990000, 150, side_t::ask, instr, a1});
+  ASSERT_EQ(exec3.size(), 4);
+  EXPECT_FALSE(engine.cancel(3));
+  EXPECT_FALSE(engine.cancel(100));
+
+  // fully filled order is gone, partially filled one still rests with the same id
+  EXPECT_FALSE(engine.cancel(1));
+  EXPECT_TRUE(engine.cancel(2));
+  EXPECT_FALSE(engine.cancel(2));
+}
+
+TEST(DefaultEngineTests, FillSinkTest) {
+  default_engine engine;
+
+  std::vector<fill_t> fills;
+  std::vector<trader_t> resting_traders;
+  auto sink = [&](const fill_t &fill, const order_t &resting) {
+    fills.push_back(fill);
+    resting_traders.push_back(resting.trader);
+  };
+  EXPECT_EQ(engine.limit({0, 990000, 100, side_t::bid, instr, b1}, sink), 1);
+  EXPECT_EQ(engine.limit({0, 990000, 50, side_t::bid, instr, b2}, sink), 2);
+  ASSERT_TRUE(fills.empty());
+
+  // one compact fill per match as it happens, the resting order is available alongside
+  EXPECT_EQ(engine.limit({0, 990000, 120, side_t::ask, instr, a1}, sink), 3);
+  ASSERT_EQ(fills.size(), 2);
+  EXPECT_EQ(fills[0], fill_t({1, 3, 990000, 100, side_t::ask}));
+  EXPECT_EQ(fills[1], fill_t({2, 3, 990000, 20, side_t::ask}));
+  EXPECT_EQ(resting_traders, std::vector<trader_t>({b1, b2}));
+
+  // the vector adapter expands every fill into both sides
+  const auto &[id4, exec4] = engine.limit({0, 990000, 30, side_t::ask, instr, a2});
+  EXPECT_EQ(id4, 4);
+  ASSERT_EQ(exec4.size(), 2);
+  EXPECT_EQ(exec4[0], execution_t({2, 990000, 30, side_t::bid, instr, b2}));
+  EXPECT_EQ(exec4[1], execution_t({4, 990000, 30, side_t::ask, instr, a2}));
+}
+
 TEST(DefaultEngineTests, IntegratedFillCancelTest) {
   default_engine engine;
 
@@ -189,4 +240,210 @@ TEST(DefaultEngineTests, IntegratedFillCancelTest) {
   EXPECT_EQ(exec13[0], execution_t({12, 1020000, 25, side_t::bid, instr, b2}));
   EXPECT_EQ(exec13[1], execution_t({13, 1020000, 25, side_t::ask, instr, a2}));
 }
+
+TEST(DefaultEngineTests, ModifyTest) {
+  default_engine engine;
+  std::vector<fill_t> fills;
+  auto sink = [&fills](const fill_t &fill, const order_t &) { fills.push_back(fill); };
+
+  // $99 @ 200 (id1:100, id2:100) / empty @ 0
+  EXPECT_EQ(engine.limit({0, 990000, 100, side_t::bid, instr, b1}, sink), 1);
+  EXPECT_EQ(engine.limit({0, 990000, 100, side_t::bid, instr, b2}, sink), 2);
+
+  // reducing keeps the id and the time priority, increasing re-queues under a new id
+  EXPECT_EQ(engine.modify(1, 990000, 40, sink), 1);
+  EXPECT_EQ(engine.modify(2, 990000, 150, sink), 3);
+  // $99 @ 190 (id1:40, id3:150) / empty @ 0
+  EXPECT_EQ(engine.limit({0, 990000, 60, side_t::ask, instr, a1}, sink), 4);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{1, 4, 990000, 40, side_t::ask}, {3, 4, 990000, 20, side_t::ask}}));
+
+  // a price change re-queues too, and the re-queued order may trade
+  // $99 @ 130 (id3:130) / $100 @ 100 (id5:100)
+  fills.clear();
+  EXPECT_EQ(engine.limit({0, 1000000, 100, side_t::ask, instr, a1}, sink), 5);
+  EXPECT_EQ(engine.modify(3, 1000000, 130, sink), 6);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{5, 6, 1000000, 100, side_t::bid}}));
+
+  // $100 @ 30 (id6:30) / empty @ 0
+  EXPECT_EQ(engine.modify(1, 990000, 10, sink), 0);
+  EXPECT_EQ(engine.modify(3, 990000, 10, sink), 0);
+  EXPECT_EQ(engine.modify(42, 990000, 10, sink), 0);
+  EXPECT_TRUE(engine.cancel(6));
+
+  // a re-queued order which trades entirely rests under no id, the new id is used up all the same
+  // $99 @ 50 (id8:50) / $100 @ 100 (id7:100)
+  fills.clear();
+  EXPECT_EQ(engine.limit({0, 1000000, 100, side_t::ask, instr, a1}, sink), 7);
+  EXPECT_EQ(engine.limit({0, 990000, 50, side_t::bid, instr, b1}, sink), 8);
+  EXPECT_EQ(engine.modify(8, 1000000, 100, sink), 0);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{7, 9, 1000000, 100, side_t::bid}}));
+  EXPECT_FALSE(engine.cancel(8));
+  EXPECT_FALSE(engine.cancel(9));
+  EXPECT_EQ(engine.limit({0, 990000, 10, side_t::bid, instr, b1}, sink), 10);
+}
+
+TEST(DefaultEngineTests, OrderTypesTest) {
+  default_engine engine;
+  std::vector<fill_t> fills;
+  auto sink = [&fills](const fill_t &fill, const order_t &) { fills.push_back(fill); };
+
+  // empty @ 0 / $100 @ 100 (id1), $101 @ 100 (id2)
+  engine.limit({0, 1000000, 100, side_t::ask, instr, a1}, sink);
+  engine.limit({0, 1010000, 100, side_t::ask, instr, a2}, sink);
+
+  // the unfilled part of an ioc order does not rest
+  EXPECT_EQ(engine.limit({0, 1000000, 150, side_t::bid, instr, b1, order_type::limit, time_in_force::ioc}, sink), 3);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{1, 3, 1000000, 100, side_t::bid}}));
+  EXPECT_FALSE(engine.cancel(3));
+
+  // a fok order trades only if it fills entirely
+  fills.clear();
+  EXPECT_EQ(engine.limit({0, 1010000, 150, side_t::bid, instr, b1, order_type::limit, time_in_force::fok}, sink), 4);
+  EXPECT_TRUE(fills.empty());
+  EXPECT_FALSE(engine.cancel(4));
+  EXPECT_EQ(engine.limit({0, 1010000, 100, side_t::ask, instr, a1}, sink), 5);
+  EXPECT_EQ(engine.limit({0, 1010000, 150, side_t::bid, instr, b1, order_type::limit, time_in_force::fok}, sink), 6);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{2, 6, 1010000, 100, side_t::bid}, {5, 6, 1010000, 50, side_t::bid}}));
+
+  // market orders trade at any price and never rest
+  // empty @ 0 / $101 @ 50 (id5)
+  fills.clear();
+  EXPECT_EQ(engine.limit({0, 0, 10, side_t::ask, instr, a1, order_type::market}, sink), 7);
+  EXPECT_FALSE(engine.cancel(7));
+  EXPECT_EQ(engine.limit({0, 0, 60, side_t::bid, instr, b2, order_type::market}, sink), 8);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{5, 8, 1010000, 50, side_t::bid}}));
+  EXPECT_FALSE(engine.cancel(8));
+  EXPECT_FALSE(engine.cancel(5));
+}
+
+TEST(DefaultEngineTests, DepthTest) {
+  default_engine engine;
+  std::vector<price_level_t> levels(4);
+  auto sink = [](const fill_t &, const order_t &) {};
+
+  // $99 @ 150 (id1:100, id2:50), $98 @ 200 (id3:200) / $100 @ 300 (id4:300)
+  engine.limit({0, 990000, 100, side_t::bid, instr, b1}, sink);
+  engine.limit({0, 990000, 50, side_t::bid, instr, b2}, sink);
+  engine.limit({0, 980000, 200, side_t::bid, instr, b1}, sink);
+  engine.limit({0, 1000000, 300, side_t::ask, instr, a1}, sink);
+  ASSERT_EQ(engine.depth(side_t::bid, levels), 2);
+  EXPECT_EQ(levels[0], price_level_t({990000, 150, 2}));
+  EXPECT_EQ(levels[1], price_level_t({980000, 200, 1}));
+  ASSERT_EQ(engine.depth(side_t::ask, levels), 1);
+  EXPECT_EQ(levels[0], price_level_t({1000000, 300, 1}));
+  ASSERT_EQ(engine.depth(side_t::bid, std::span(levels).first(1)), 1);
+  EXPECT_EQ(levels[0], price_level_t({990000, 150, 2}));
+
+  // fills, cancels and in place modifies keep the aggregates up to date
+  engine.limit({0, 990000, 120, side_t::ask, instr, a1}, sink);
+  ASSERT_EQ(engine.depth(side_t::bid, levels), 2);
+  EXPECT_EQ(levels[0], price_level_t({990000, 30, 1}));
+  EXPECT_TRUE(engine.cancel(3));
+  EXPECT_EQ(engine.modify(2, 990000, 10, sink), 2);
+  ASSERT_EQ(engine.depth(side_t::bid, levels), 1);
+  EXPECT_EQ(levels[0], price_level_t({990000, 10, 1}));
+  EXPECT_TRUE(engine.cancel(2));
+  EXPECT_EQ(engine.depth(side_t::bid, levels), 0);
+}
+
+TEST(DefaultEngineTests, CancelAllTest) {
+  default_engine engine;
+  std::vector<price_level_t> levels(4);
+  auto sink = [](const fill_t &, const order_t &) {};
+
+  engine.limit({0, 990000, 100, side_t::bid, instr, b1}, sink);
+  engine.limit({0, 980000, 100, side_t::bid, instr, b2}, sink);
+  engine.limit({0, 970000, 100, side_t::bid, instr, b1}, sink);
+  engine.limit({0, 1000000, 100, side_t::ask, instr, b1}, sink);
+  engine.limit({0, 1010000, 100, side_t::ask, instr, a1}, sink);
+  // filled orders are no longer the trader's to cancel
+  engine.limit({0, 1000000, 100, side_t::bid, instr, a2}, sink);
+
+  EXPECT_EQ(engine.cancel_all(a2), 0);
+  EXPECT_EQ(engine.cancel_all(b1, side_t::ask), 0);
+  EXPECT_EQ(engine.cancel_all(b1, side_t::bid, {'M', 'S', 'F', 'T'}), 0);
+  EXPECT_EQ(engine.cancel_all(b1, side_t::bid, instr), 2);
+  EXPECT_FALSE(engine.cancel(1));
+  EXPECT_FALSE(engine.cancel(3));
+  ASSERT_EQ(engine.depth(side_t::bid, levels), 1);
+  EXPECT_EQ(levels[0], price_level_t({980000, 100, 1}));
+
+  EXPECT_EQ(engine.cancel_all(b2), 1);
+  EXPECT_EQ(engine.cancel_all(a1), 1);
+  EXPECT_EQ(engine.depth(side_t::bid, levels), 0);
+  EXPECT_EQ(engine.depth(side_t::ask, levels), 0);
+  EXPECT_EQ(engine.cancel_all(a1), 0);
+}
+
+TEST(DefaultEngineTests, CancelAllReusedSlotsTest) {
+  default_engine engine;
+  auto sink = [](const fill_t &, const order_t &) {};
+
+  // orders of one trader leave slots behind which orders of the other take over
+  for (int i = 0; i < 100; ++i) {
+    orderid_t b1_order = engine.limit({0, 990000, 100, side_t::bid, instr, b1}, sink);
+    engine.limit({0, 980000, 100, side_t::bid, instr, b2}, sink);
+    EXPECT_TRUE(engine.cancel(b1_order));
+  }
+  engine.limit({0, 970000, 100, side_t::bid, instr, b1}, sink);
+  EXPECT_EQ(engine.cancel_all(b1), 1);
+  EXPECT_EQ(engine.cancel_all(b2), 100);
+  std::vector<price_level_t> levels(4);
+  EXPECT_EQ(engine.depth(side_t::bid, levels), 0);
+}
+
+TEST(DefaultEngineTests, SelfTradeCutsReportedTest) {
+  default_engine engine;
+  std::vector<fill_t> fills;
+  std::vector<std::pair<orderid_t, quantity_t>> cuts;
+  // a sink also taking cuts is handed them, before they are taken off the orders
+  auto sink = overloaded{[&fills](const fill_t &fill, const order_t &) { fills.push_back(fill); },
+                         [&cuts](const self_trade_cut &cut, const order_t &resting) {
+                           EXPECT_EQ(resting.qty, 100);
+                           cuts.emplace_back(resting.id, cut.resting_qty);
+                         }};
+
+  engine.limit({0, 1000000, 100, side_t::ask, instr, a1}, sink);
+  engine.limit({0, 1000000, 100, side_t::ask, instr, b1}, sink);
+  engine.limit({0, 1000000, 150, side_t::bid, instr, a1, order_type::limit, time_in_force::day,
+                self_trade_prevention::decrement},
+               sink);
+  EXPECT_EQ(cuts, (std::vector<std::pair<orderid_t, quantity_t>>{{1, 100}}));
+  EXPECT_EQ(fills, (std::vector<fill_t>{{2, 3, 1000000, 50, side_t::bid}}));
+}
+
+TEST(DefaultEngineTests, SelfTradePreventionTest) {
+  struct expected {
+    stp_t stp;
+    std::vector<fill_t> fills;
+    std::vector<price_level_t> asks;
+    std::vector<price_level_t> bids;
+  };
+  const std::vector<expected> cases = {
+      {self_trade_prevention::none, {{1, 3, 1000000, 100, side_t::bid}, {2, 3, 1000000, 50, side_t::bid}},
+       {{1000000, 50, 1}}, {}},
+      {self_trade_prevention::cancel_newest, {}, {{1000000, 200, 2}}, {}},
+      {self_trade_prevention::cancel_oldest, {{2, 3, 1000000, 100, side_t::bid}}, {}, {{1000000, 50, 1}}},
+      {self_trade_prevention::cancel_both, {}, {{1000000, 100, 1}}, {}},
+      {self_trade_prevention::decrement, {{2, 3, 1000000, 50, side_t::bid}}, {{1000000, 50, 1}}, {}},
+  };
+  for (const auto &c : cases) {
+    default_engine engine;
+    std::vector<fill_t> fills;
+    auto sink = [&fills](const fill_t &fill, const order_t &) { fills.push_back(fill); };
+    std::vector<price_level_t> levels(4);
+
+    // a1 meets its own order first, then b1's
+    engine.limit({0, 1000000, 100, side_t::ask, instr, a1}, sink);
+    engine.limit({0, 1000000, 100, side_t::ask, instr, b1}, sink);
+    engine.limit({0, 1000000, 150, side_t::bid, instr, a1, order_type::limit, time_in_force::day, c.stp}, sink);
+    EXPECT_EQ(fills, c.fills);
+    levels.resize(engine.depth(side_t::ask, levels));
+    EXPECT_EQ(levels, c.asks);
+    levels.resize(4);
+    levels.resize(engine.depth(side_t::bid, levels));
+    EXPECT_EQ(levels, c.bids);
+  }
+}
+
 }  // namespace cupid
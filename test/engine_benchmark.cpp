@@ -1,57 +1,78 @@
 #include <benchmark/benchmark.h>
+#include <algorithm>
 #include <cassert>
 #include <cstdint>
 #include <filesystem>
 #include <fstream>
+#include <iterator>
 #include <numeric>
+#include <span>
 #include <string>
 #include <vector>
 #include "benchmark_engine.h"
 #include "default_engine.h"
+#include "flat_map_engine.h"
 #include "engine_types.h"
+#include "instrument_router.h"
+#include "l2_feed.h"
+#include "ladder_engine.h"
+#include "pipeline.h"
+#include "pro_rata_engine.h"
+#include "sharded_runtime.h"
+#include "trace_codec.h"
+#include "wait_strategy.h"
 
 namespace cupid {
 
-enum class action_type : int8_t {
-  limit = 0,
-  cancel = 1,
-};
-
-struct benchmark_trace {
-  action_type action;
-  order_t order;
-  orderid_t cancel_id;
-
-  [[nodiscard]] constexpr bool is_limit() const noexcept { return action == action_type::limit; }
-
-  [[nodiscard]] constexpr bool is_cancel() const noexcept { return action == action_type::cancel; }
-};
-
-static std::vector<benchmark_trace> load_trace(const std::string &trace_path) {
+static std::vector<char> load_trace_records(const std::string &trace_path) {
   std::ifstream trace_file(trace_path, std::ios::in | std::ios::binary);
   if (!trace_file.is_open()) {
     throw std::runtime_error("Failed to open trace file: " + trace_path);
   }
-  std::vector<benchmark_trace> traces;
-  while (!trace_file.eof()) {
-    benchmark_trace trace;
-    trace_file.read(reinterpret_cast<char *>(&trace.action), sizeof(trace.action));
-    trace_file.read(reinterpret_cast<char *>(&trace.order.id), sizeof(trace.order.id));
-    trace_file.read(reinterpret_cast<char *>(&trace.order.px), sizeof(trace.order.px));
-    trace_file.read(reinterpret_cast<char *>(&trace.order.qty), sizeof(trace.order.qty));
-    trace_file.read(reinterpret_cast<char *>(&trace.order.side), sizeof(trace.order.side));
-    trace_file.read(reinterpret_cast<char *>(&trace.order.instr), INSTRUMENT_LEN);
-    trace_file.read(reinterpret_cast<char *>(&trace.order.trader), TRADER_LEN);
-    trace_file.read(reinterpret_cast<char *>(&trace.cancel_id), sizeof(trace.cancel_id));
-    if (!trace_file) {  // passed the last trace
-      break;
-    }
-    traces.push_back(trace);
+  std::vector<char> records{std::istreambuf_iterator<char>(trace_file), std::istreambuf_iterator<char>()};
+  // drop a truncated last record
+  records.resize(records.size() - records.size() % TRACE_RECORD_SIZE);
+  return records;
+}
+
+static std::vector<action_t> load_trace(const std::string &trace_path) {
+  std::vector<char> records = load_trace_records(trace_path);
+  std::vector<action_t> traces;
+  traces.reserve(records.size() / TRACE_RECORD_SIZE);
+  for (std::size_t offset = 0; offset < records.size(); offset += TRACE_RECORD_SIZE) {
+    traces.push_back(decode_trace(records.data() + offset));
   }
-  trace_file.close();
   return traces;
 }
 
+// the trace replayed on 'num_symbols' instruments at once, interleaved action by action
+// cancel ids are remapped to the ids the limit orders get in the interleaved flow
+static std::vector<action_t> replicate_trace(const std::vector<action_t> &traces, std::size_t num_symbols) {
+  std::vector<action_t> replicated;
+  replicated.reserve(traces.size() * num_symbols);
+  std::vector<std::vector<orderid_t>> orderids(num_symbols, std::vector<orderid_t>{0});
+  orderid_t next_orderid = 1;
+  for (const auto &trace : traces) {
+    for (std::size_t symbol = 0; symbol < num_symbols; ++symbol) {
+      action_t action = trace;
+      if (action.is_limit()) {
+        action.order.instr = {'S', static_cast<char>('A' + symbol / 26), static_cast<char>('A' + symbol % 26), '\0'};
+        orderids[symbol].push_back(next_orderid++);
+      } else {
+        action.cancel_id = action.cancel_id < orderids[symbol].size() ? orderids[symbol][action.cancel_id] : 0;
+      }
+      replicated.push_back(action);
+    }
+  }
+  return replicated;
+}
+
+// FIFO + pro-rata hybrid matching 40% of what trades at each level in time priority
+struct hybrid_pro_rata_engine : pro_rata_engine {
+  hybrid_pro_rata_engine()
+      : pro_rata_engine(DEFAULT_MIN_PX, DEFAULT_TICK_SIZE, DEFAULT_NUM_LEVELS, DEFAULT_ORDER_CAPACITY, 40) {}
+};
+
 }  // namespace cupid
 
 // global default namespace
@@ -63,9 +84,13 @@ const std::vector<std::filesystem::path> trace_paths = {
     std::filesystem::path(PROJECT_ROOT_PATH) / "500k_default.bin",
 };
 
-template <typename EngineType>
+// with every limit order of the trace carrying the self-trade prevention mode 'STP'
+template <typename EngineType, cupid::stp_t STP = cupid::self_trade_prevention::none>
 static void BM_Engine(benchmark::State &state) {  // NOLINT(runtime/references)
   auto traces = cupid::load_trace(trace_paths[state.range(0)].string());
+  for (auto &trace : traces) {
+    trace.order.stp = STP;
+  }
   state.counters["traces"] = traces.size();
   state.counters["limit_order"] = std::accumulate(
       traces.begin(), traces.end(), 0ULL,
@@ -74,22 +99,94 @@ static void BM_Engine(benchmark::State &state) {  // NOLINT(runtime/references)
       traces.begin(), traces.end(), 0ULL,
       [](uint64_t accumulator, const auto &trace) { return accumulator + static_cast<uint64_t>(trace.is_cancel()); });
   state.counters["memory_mb"] =
-      benchmark::Counter(static_cast<double>(traces.size()) * sizeof(cupid::benchmark_trace) / (1024.0 * 1024.0));
+      benchmark::Counter(static_cast<double>(traces.size()) * sizeof(cupid::action_t) / (1024.0 * 1024.0));
   state.counters["operations_per_second"] =
       benchmark::Counter(static_cast<double>(traces.size()), benchmark::Counter::kIsRate);
 
+  uint64_t fills = 0;
   for (auto _ : state) {
     EngineType engine;
+    fills = 0;
     for (const auto &trace : traces) {
       if (trace.action == cupid::action_type::limit) {
-        engine.limit(trace.order);
+        engine.limit(trace.order, [&fills](const cupid::fill_t &, const cupid::order_t &) { ++fills; });
       } else if (trace.action == cupid::action_type::cancel) {
         engine.cancel(trace.cancel_id);
       } else {
         assert(false);
       }
     }
+    benchmark::DoNotOptimize(fills);
   }
+  state.counters["fills"] = fills;
+}
+
+template <typename EngineType>
+static void BM_Sharded(benchmark::State &state) {  // NOLINT(runtime/references)
+  constexpr std::size_t num_symbols = 16;
+  auto traces = cupid::replicate_trace(cupid::load_trace(trace_paths[state.range(0)].string()), num_symbols);
+  state.counters["traces"] = traces.size();
+  state.counters["shards"] = state.range(1);
+  state.counters["operations_per_second"] =
+      benchmark::Counter(static_cast<double>(traces.size()), benchmark::Counter::kIsRate);
+
+  uint64_t fills = 0;
+  for (auto _ : state) {
+    cupid::sharded_runtime<EngineType> runtime(state.range(1), num_symbols);
+    fills = 0;
+    auto sink = [&fills](const cupid::fill_t &) { ++fills; };
+    for (const auto &trace : traces) {
+      runtime.submit(trace, sink);
+    }
+    runtime.flush(sink);
+    benchmark::DoNotOptimize(fills);
+  }
+  state.counters["fills"] = fills;
+}
+
+// the trace replayed through the batch API, 'batch_size' actions at a time
+template <typename EngineType>
+static void BM_Batch(benchmark::State &state) {  // NOLINT(runtime/references)
+  auto traces = cupid::load_trace(trace_paths[state.range(0)].string());
+  auto batch_size = static_cast<std::size_t>(state.range(1));
+  state.counters["traces"] = traces.size();
+  state.counters["batch_size"] = batch_size;
+  state.counters["operations_per_second"] =
+      benchmark::Counter(static_cast<double>(traces.size()), benchmark::Counter::kIsRate);
+
+  std::vector<cupid::orderid_t> results(batch_size);
+  uint64_t fills = 0;
+  for (auto _ : state) {
+    EngineType engine;
+    fills = 0;
+    auto sink = [&fills](const cupid::fill_t &, const cupid::order_t &) { ++fills; };
+    for (std::size_t start = 0; start < traces.size(); start += batch_size) {
+      std::size_t size = std::min(batch_size, traces.size() - start);
+      engine.submit(std::span<const cupid::action_t>(traces.data() + start, size), results, sink);
+    }
+    benchmark::DoNotOptimize(fills);
+    benchmark::DoNotOptimize(results.data());
+  }
+  state.counters["fills"] = fills;
+}
+
+// raw trace records decoded, matched and published by the pipeline stages on their own threads
+template <typename EngineType, typename WaitStrategy>
+static void BM_Pipeline(benchmark::State &state) {  // NOLINT(runtime/references)
+  auto records = cupid::load_trace_records(trace_paths[state.range(0)].string());
+  state.counters["traces"] = records.size() / cupid::TRACE_RECORD_SIZE;
+  state.counters["operations_per_second"] =
+      benchmark::Counter(static_cast<double>(records.size() / cupid::TRACE_RECORD_SIZE), benchmark::Counter::kIsRate);
+
+  cupid::pipeline_stats stats{};
+  for (auto _ : state) {
+    EngineType engine;
+    cupid::pipeline<EngineType, WaitStrategy> stages(engine);
+    uint64_t published = 0;
+    stats = stages.run(records, [&published](const char *, std::size_t size) { published += size; });
+    benchmark::DoNotOptimize(published);
+  }
+  state.counters["fills"] = stats.fills;
 }
 
 // Benchmark Engine
@@ -150,4 +247,274 @@ BENCHMARK_TEMPLATE(BM_Engine, cupid::default_engine)
     ->Iterations(1)
     ->MeasureProcessCPUTime();
 
+// Reverse Vector Engine
+BENCHMARK_TEMPLATE(BM_Engine, cupid::reverse_vector_engine)
+    ->Name("ReverseVectorEngine/100k_default")
+    ->Args({0})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::reverse_vector_engine)
+    ->Name("ReverseVectorEngine/100k_major_cancel")
+    ->Args({1})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::reverse_vector_engine)
+    ->Name("ReverseVectorEngine/100k_major_depth")
+    ->Args({2})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::reverse_vector_engine)
+    ->Name("ReverseVectorEngine/500K_default")
+    ->Args({3})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(1)
+    ->MeasureProcessCPUTime();
+
+// Ladder Engine
+BENCHMARK_TEMPLATE(BM_Engine, cupid::ladder_engine)
+    ->Name("LadderEngine/100k_default")
+    ->Args({0})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::ladder_engine)
+    ->Name("LadderEngine/100k_major_cancel")
+    ->Args({1})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::ladder_engine)
+    ->Name("LadderEngine/100k_major_depth")
+    ->Args({2})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::ladder_engine)
+    ->Name("LadderEngine/500K_default")
+    ->Args({3})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(1)
+    ->MeasureProcessCPUTime();
+
+// Flat Map Engine
+BENCHMARK_TEMPLATE(BM_Engine, cupid::flat_map_engine)
+    ->Name("FlatMapEngine/100k_default")
+    ->Args({0})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::flat_map_engine)
+    ->Name("FlatMapEngine/100k_major_cancel")
+    ->Args({1})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::flat_map_engine)
+    ->Name("FlatMapEngine/100k_major_depth")
+    ->Args({2})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::flat_map_engine)
+    ->Name("FlatMapEngine/500K_default")
+    ->Args({3})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(1)
+    ->MeasureProcessCPUTime();
+
+// Pro-Rata Engine
+BENCHMARK_TEMPLATE(BM_Engine, cupid::pro_rata_engine)
+    ->Name("ProRataEngine/100k_default")
+    ->Args({0})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::pro_rata_engine)
+    ->Name("ProRataEngine/100k_major_cancel")
+    ->Args({1})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::pro_rata_engine)
+    ->Name("ProRataEngine/100k_major_depth")
+    ->Args({2})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::pro_rata_engine)
+    ->Name("ProRataEngine/500K_default")
+    ->Args({3})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(1)
+    ->MeasureProcessCPUTime();
+
+// FIFO + Pro-Rata Hybrid Engine
+BENCHMARK_TEMPLATE(BM_Engine, cupid::hybrid_pro_rata_engine)
+    ->Name("HybridProRataEngine/100k_default")
+    ->Args({0})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::hybrid_pro_rata_engine)
+    ->Name("HybridProRataEngine/100k_major_cancel")
+    ->Args({1})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::hybrid_pro_rata_engine)
+    ->Name("HybridProRataEngine/100k_major_depth")
+    ->Args({2})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::hybrid_pro_rata_engine)
+    ->Name("HybridProRataEngine/500K_default")
+    ->Args({3})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(1)
+    ->MeasureProcessCPUTime();
+
+// Ladder Engine with self-trade prevention
+BENCHMARK_TEMPLATE(BM_Engine, cupid::ladder_engine, cupid::self_trade_prevention::cancel_oldest)
+    ->Name("LadderEngineSTP/100k_default")
+    ->Args({0})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::ladder_engine, cupid::self_trade_prevention::cancel_oldest)
+    ->Name("LadderEngineSTP/100k_major_cancel")
+    ->Args({1})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::ladder_engine, cupid::self_trade_prevention::cancel_oldest)
+    ->Name("LadderEngineSTP/100k_major_depth")
+    ->Args({2})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::ladder_engine, cupid::self_trade_prevention::cancel_oldest)
+    ->Name("LadderEngineSTP/500K_default")
+    ->Args({3})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(1)
+    ->MeasureProcessCPUTime();
+
+// Ladder Engine publishing its L2 feed
+BENCHMARK_TEMPLATE(BM_Engine, cupid::l2_feed<cupid::ladder_engine>)
+    ->Name("LadderL2Feed/100k_default")
+    ->Args({0})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::l2_feed<cupid::ladder_engine>)
+    ->Name("LadderL2Feed/100k_major_cancel")
+    ->Args({1})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::l2_feed<cupid::ladder_engine>)
+    ->Name("LadderL2Feed/100k_major_depth")
+    ->Args({2})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::l2_feed<cupid::ladder_engine>)
+    ->Name("LadderL2Feed/500K_default")
+    ->Args({3})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(1)
+    ->MeasureProcessCPUTime();
+
+// Ladder Engine per instrument behind the router
+BENCHMARK_TEMPLATE(BM_Engine, cupid::instrument_router<cupid::ladder_engine>)
+    ->Name("LadderRouter/100k_default")
+    ->Args({0})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::instrument_router<cupid::ladder_engine>)
+    ->Name("LadderRouter/100k_major_cancel")
+    ->Args({1})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::instrument_router<cupid::ladder_engine>)
+    ->Name("LadderRouter/100k_major_depth")
+    ->Args({2})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Engine, cupid::instrument_router<cupid::ladder_engine>)
+    ->Name("LadderRouter/500K_default")
+    ->Args({3})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(1)
+    ->MeasureProcessCPUTime();
+
+// Ladder Engine replayed through the batch API, by batches of 16 and 256 actions
+BENCHMARK_TEMPLATE(BM_Batch, cupid::ladder_engine)
+    ->Name("LadderEngineBatch/100k_default")
+    ->ArgsProduct({{0}, {16, 256}})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+BENCHMARK_TEMPLATE(BM_Batch, cupid::ladder_engine)
+    ->Name("LadderEngineBatch/100k_major_cancel")
+    ->ArgsProduct({{1}, {16, 256}})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->MeasureProcessCPUTime();
+
+// Ladder Engine sharded over threads, 16 instruments each replaying the trace
+BENCHMARK_TEMPLATE(BM_Sharded, cupid::ladder_engine)
+    ->Name("ShardedLadder/100k_default")
+    ->ArgsProduct({{0}, {1, 2, 4}})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->UseRealTime();
+
+// Ladder Engine behind the decode, match and publish stages, busy spinning needs a core per stage
+BENCHMARK_TEMPLATE(BM_Pipeline, cupid::ladder_engine, cupid::busy_spin_wait)
+    ->Name("PipelineLadder/busy_spin/100k_default")
+    ->Args({0})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->UseRealTime();
+
+BENCHMARK_TEMPLATE(BM_Pipeline, cupid::ladder_engine, cupid::backoff_wait)
+    ->Name("PipelineLadder/backoff/100k_default")
+    ->Args({0})
+    ->Unit(benchmark::kMillisecond)
+    ->Iterations(3)
+    ->UseRealTime();
+
 BENCHMARK_MAIN();
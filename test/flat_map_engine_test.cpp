@@ -0,0 +1,138 @@
+#include <gtest/gtest.h>
+
+#include <span>
+#include <vector>
+#include "engine_interface.h"
+#include "engine_types.h"
+#include "flat_map_engine.h"
+
+namespace cupid {
+
+constexpr instr_t instr = {'A', 'A', 'P', 'L'};
+constexpr trader_t a1 = {'A', '1', '\0', '\0'};
+constexpr trader_t a2 = {'A', '2', '\0', '\0'};
+constexpr trader_t b1 = {'B', '1', '\0', '\0'};
+constexpr trader_t b2 = {'B', '2', '\0', '\0'};
+
+TEST(FlatMapEngineTests, PriceTimePriorityTest) {
+  flat_map_engine engine;
+
+  // $99 @ 150 (id1:100, id3:50), $98 @ 100 (id2:100) / empty @ 0
+  const auto &[id1, exec1] = engine.limit({0, 990000, 100, side_t::bid, instr, b1});
+  const auto &[id2, exec2] = engine.limit({0, 980000, 100, side_t::bid, instr, b2});
+  const auto &[id3, exec3] = engine.limit({0, 990000, 50, side_t::bid, instr, b2});
+  ASSERT_TRUE(exec1.empty());
+  ASSERT_TRUE(exec2.empty());
+  ASSERT_TRUE(exec3.empty());
+
+  // best price first, then time priority within the price
+  const auto &[id4, exec4] = engine.limit({0, 980000, 200, side_t::ask, instr, a1});
+  EXPECT_EQ(id4, 4);
+  ASSERT_EQ(exec4.size(), 6);
+  EXPECT_EQ(exec4[0], execution_t({1, 990000, 100, side_t::bid, instr, b1}));
+  EXPECT_EQ(exec4[1], execution_t({4, 990000, 100, side_t::ask, instr, a1}));
+  EXPECT_EQ(exec4[2], execution_t({3, 990000, 50, side_t::bid, instr, b2}));
+  EXPECT_EQ(exec4[3], execution_t({4, 990000, 50, side_t::ask, instr, a1}));
+  EXPECT_EQ(exec4[4], execution_t({2, 980000, 50, side_t::bid, instr, b2}));
+  EXPECT_EQ(exec4[5], execution_t({4, 980000, 50, side_t::ask, instr, a1}));
+
+  // $98 @ 50 (id2:50) / empty @ 0
+  // rest asks at several prices and sweep them with one bid
+  const auto &[id5, exec5] = engine.limit({0, 1010000, 100, side_t::ask, instr, a1});
+  const auto &[id6, exec6] = engine.limit({0, 1000000, 100, side_t::ask, instr, a2});
+  const auto &[id7, exec7] = engine.limit({0, 1000000, 100, side_t::ask, instr, a1});
+  const auto &[id8, exec8] = engine.limit({0, 1005000, 250, side_t::bid, instr, b1});
+  EXPECT_EQ(id8, 8);
+  ASSERT_EQ(exec8.size(), 4);
+  EXPECT_EQ(exec8[0], execution_t({6, 1000000, 100, side_t::ask, instr, a2}));
+  EXPECT_EQ(exec8[1], execution_t({8, 1000000, 100, side_t::bid, instr, b1}));
+  EXPECT_EQ(exec8[2], execution_t({7, 1000000, 100, side_t::ask, instr, a1}));
+  EXPECT_EQ(exec8[3], execution_t({8, 1000000, 100, side_t::bid, instr, b1}));
+
+  // $100.5 @ 50 (id8:50), $98 @ 50 (id2:50) / $101 @ 100 (id5:100)
+  const auto &[id9, exec9] = engine.limit({0, 1000000, 100, side_t::ask, instr, a2});
+  ASSERT_EQ(exec9.size(), 2);
+  EXPECT_EQ(exec9[0], execution_t({8, 1005000, 50, side_t::bid, instr, b1}));
+  EXPECT_EQ(exec9[1], execution_t({9, 1005000, 50, side_t::ask, instr, a2}));
+}
+
+TEST(FlatMapEngineTests, CancelTest) {
+  flat_map_engine engine;
+
+  // $99 @ 150 (id1:100, id2:50), $98 @ 100 (id3:100) / empty @ 0
+  const auto &[id1, exec1] = engine.limit({0, 990000, 100, side_t::bid, instr, b1});
+  const auto &[id2, exec2] = engine.limit({0, 990000, 50, side_t::bid, instr, b2});
+  const auto &[id3, exec3] = engine.limit({0, 980000, 100, side_t::bid, instr, b1});
+
+  // emptying the best level removes it, the next level becomes the top of book
+  EXPECT_TRUE(engine.cancel(2));
+  EXPECT_TRUE(engine.cancel(1));
+  EXPECT_FALSE(engine.cancel(1));
+  EXPECT_FALSE(engine.cancel(42));
+
+  const auto &[id4, exec4] = engine.limit({0, 980000, 150, side_t::ask, instr, a1});
+  EXPECT_EQ(id4, 4);
+  ASSERT_EQ(exec4.size(), 2);
+  EXPECT_EQ(exec4[0], execution_t({3, 980000, 100, side_t::bid, instr, b1}));
+  EXPECT_EQ(exec4[1], execution_t({4, 980000, 100, side_t::ask, instr, a1}));
+
+  // empty @ 0 / $98 @ 50 (id4:50)
+  EXPECT_TRUE(engine.cancel(4));
+  EXPECT_FALSE(engine.cancel(3));
+}
+
+TEST(FlatMapEngineTests, UnboundedPriceRangeTest) {
+  flat_map_engine engine;
+
+  // prices no fixed ladder would cover, and off any tick
+  const auto &[id1, exec1] = engine.limit({0, 1, 100, side_t::bid, instr, b1});
+  const auto &[id2, exec2] = engine.limit({0, 1000000000000, 100, side_t::ask, instr, a1});
+  const auto &[id3, exec3] = engine.limit({0, 123457, 100, side_t::ask, instr, a2});
+  ASSERT_TRUE(exec1.empty());
+  ASSERT_TRUE(exec2.empty());
+  ASSERT_TRUE(exec3.empty());
+
+  const auto &[id4, exec4] = engine.limit({0, 1000000000000, 150, side_t::bid, instr, b2});
+  ASSERT_EQ(exec4.size(), 4);
+  EXPECT_EQ(exec4[0], execution_t({3, 123457, 100, side_t::ask, instr, a2}));
+  EXPECT_EQ(exec4[1], execution_t({4, 123457, 100, side_t::bid, instr, b2}));
+  EXPECT_EQ(exec4[2], execution_t({2, 1000000000000, 50, side_t::ask, instr, a1}));
+  EXPECT_EQ(exec4[3], execution_t({4, 1000000000000, 50, side_t::bid, instr, b2}));
+
+  const auto &[id5, exec5] = engine.limit({0, 1, 100, side_t::ask, instr, a1});
+  ASSERT_EQ(exec5.size(), 2);
+  EXPECT_EQ(exec5[0], execution_t({1, 1, 100, side_t::bid, instr, b1}));
+  EXPECT_EQ(exec5[1], execution_t({5, 1, 100, side_t::ask, instr, a1}));
+}
+
+TEST(FlatMapEngineTests, DepthTest) {
+  flat_map_engine engine;
+  std::vector<price_level_t> levels(4);
+  auto sink = [](const fill_t &, const order_t &) {};
+
+  // $99 @ 150 (id1:100, id2:50), $98 @ 200 (id3:200) / $100 @ 300 (id4:300)
+  engine.limit({0, 990000, 100, side_t::bid, instr, b1}, sink);
+  engine.limit({0, 990000, 50, side_t::bid, instr, b2}, sink);
+  engine.limit({0, 980000, 200, side_t::bid, instr, b1}, sink);
+  engine.limit({0, 1000000, 300, side_t::ask, instr, a1}, sink);
+  ASSERT_EQ(engine.depth(side_t::bid, levels), 2);
+  EXPECT_EQ(levels[0], price_level_t({990000, 150, 2}));
+  EXPECT_EQ(levels[1], price_level_t({980000, 200, 1}));
+  ASSERT_EQ(engine.depth(side_t::ask, levels), 1);
+  EXPECT_EQ(levels[0], price_level_t({1000000, 300, 1}));
+  ASSERT_EQ(engine.depth(side_t::bid, std::span(levels).first(1)), 1);
+  EXPECT_EQ(levels[0], price_level_t({990000, 150, 2}));
+
+  // fills, cancels and in place modifies keep the aggregates up to date
+  engine.limit({0, 990000, 120, side_t::ask, instr, a1}, sink);
+  ASSERT_EQ(engine.depth(side_t::bid, levels), 2);
+  EXPECT_EQ(levels[0], price_level_t({990000, 30, 1}));
+  EXPECT_TRUE(engine.cancel(3));
+  EXPECT_EQ(engine.modify(2, 990000, 10, sink), 2);
+  ASSERT_EQ(engine.depth(side_t::bid, levels), 1);
+  EXPECT_EQ(levels[0], price_level_t({990000, 10, 1}));
+  EXPECT_TRUE(engine.cancel(2));
+  EXPECT_EQ(engine.depth(side_t::bid, levels), 0);
+}
+
+}  // namespace cupid
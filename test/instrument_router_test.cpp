@@ -0,0 +1,189 @@
+#include <gtest/gtest.h>
+
+#include <memory>
+#include <vector>
+#include "default_engine.h"
+#include "engine_interface.h"
+#include "engine_types.h"
+#include "instrument_map.h"
+#include "instrument_router.h"
+#include "ladder_engine.h"
+
+namespace cupid {
+
+constexpr instr_t aapl = {'A', 'A', 'P', 'L'};
+constexpr instr_t msft = {'M', 'S', 'F', 'T'};
+constexpr instr_t goog = {'G', 'O', 'O', 'G'};
+constexpr trader_t a1 = {'A', '1', '\0', '\0'};
+constexpr trader_t b1 = {'B', '1', '\0', '\0'};
+
+TEST(InstrumentMapTests, FindOrInsertTest) {
+  instrument_map map(2);
+  EXPECT_EQ(map.find(aapl), instrument_map::NO_INDEX);
+  EXPECT_EQ(map.find_or_insert(aapl), 0);
+  EXPECT_EQ(map.find_or_insert(msft), 1);
+  EXPECT_EQ(map.find_or_insert(aapl), 0);
+  EXPECT_EQ(map.find(msft), 1);
+
+  // the universe is exhausted, and the empty symbol is never valid
+  EXPECT_EQ(map.find_or_insert(goog), instrument_map::NO_INDEX);
+  EXPECT_EQ(map.find_or_insert({}), instrument_map::NO_INDEX);
+  EXPECT_EQ(map.find({}), instrument_map::NO_INDEX);
+  EXPECT_EQ(map.size(), 2);
+}
+
+TEST(InstrumentRouterTests, SeparateBooksTest) {
+  instrument_router<ladder_engine> router;
+
+  const auto &[id1, exec1] = router.limit({0, 990000, 100, side_t::bid, aapl, b1});
+  const auto &[id2, exec2] = router.limit({0, 1000000, 100, side_t::bid, msft, b1});
+  EXPECT_EQ(id1, 1);
+  EXPECT_EQ(id2, 2);
+  EXPECT_EQ(router.num_books(), 2);
+
+  // does not cross the AAPL bid although the price would
+  const auto &[id3, exec3] = router.limit({0, 980000, 100, side_t::ask, msft, a1});
+  EXPECT_EQ(id3, 3);
+  ASSERT_EQ(exec3.size(), 2);
+  EXPECT_EQ(exec3[0], execution_t({2, 1000000, 100, side_t::bid, msft, b1}));
+  EXPECT_EQ(exec3[1], execution_t({3, 1000000, 100, side_t::ask, msft, a1}));
+
+  // ids are the router's in fills as well as in cancels
+  const auto &[id4, exec4] = router.limit({0, 980000, 150, side_t::ask, aapl, a1});
+  EXPECT_EQ(id4, 4);
+  ASSERT_EQ(exec4.size(), 2);
+  EXPECT_EQ(exec4[0], execution_t({1, 990000, 100, side_t::bid, aapl, b1}));
+  EXPECT_EQ(exec4[1], execution_t({4, 990000, 100, side_t::ask, aapl, a1}));
+  EXPECT_FALSE(router.cancel(1));
+  EXPECT_FALSE(router.cancel(3));
+  EXPECT_TRUE(router.cancel(4));
+  EXPECT_FALSE(router.cancel(4));
+  EXPECT_FALSE(router.cancel(5));
+}
+
+TEST(InstrumentRouterTests, UniverseLimitTest) {
+  instrument_router<default_engine> router(1, [](const instr_t &) { return std::make_unique<default_engine>(); });
+
+  const auto &[id1, exec1] = router.limit({0, 990000, 100, side_t::bid, aapl, b1});
+  // no book left for a second instrument, the order is rejected but still consumes an id
+  const auto &[id2, exec2] = router.limit({0, 980000, 100, side_t::ask, msft, a1});
+  EXPECT_EQ(id2, 0);
+  ASSERT_TRUE(exec2.empty());
+  EXPECT_FALSE(router.cancel(2));
+  EXPECT_EQ(router.num_books(), 1);
+
+  const auto &[id3, exec3] = router.limit({0, 990000, 40, side_t::ask, aapl, a1});
+  EXPECT_EQ(id3, 3);
+  ASSERT_EQ(exec3.size(), 2);
+  EXPECT_EQ(exec3[0], execution_t({1, 990000, 40, side_t::bid, aapl, b1}));
+  EXPECT_TRUE(router.cancel(1));
+}
+
+TEST(InstrumentRouterTests, BookPerInstrumentTest) {
+  // MSFT trades in whole dollars, every other symbol in cents
+  instrument_router<ladder_engine> router(2, [](const instr_t &instr) {
+    price_t tick_size = instr == msft ? 10000 : 100;
+    return std::make_unique<ladder_engine>(0, tick_size, 1 << 12);
+  });
+
+  EXPECT_EQ(router.limit({0, 100, 100, side_t::bid, aapl, b1}).first, 1);
+  EXPECT_EQ(router.limit({0, 100, 100, side_t::bid, msft, b1}).first, 0);
+  EXPECT_EQ(router.limit({0, 10000, 100, side_t::bid, msft, b1}).first, 3);
+  EXPECT_TRUE(router.resting(1));
+  EXPECT_TRUE(router.resting(3));
+}
+
+TEST(InstrumentRouterTests, BookRejectTest) {
+  instrument_router<ladder_engine> router;
+
+  EXPECT_EQ(router.limit({0, 990000, 100, side_t::bid, aapl, b1}).first, 1);
+  // off the AAPL ladder, the book rejects the order and the router passes on 0
+  const auto &[id2, exec2] = router.limit({0, 990050, 100, side_t::ask, aapl, a1});
+  EXPECT_EQ(id2, 0);
+  ASSERT_TRUE(exec2.empty());
+  EXPECT_FALSE(router.resting(2));
+
+  // the rejected order used up an id in the router and in the book alike, so they stay in step
+  const auto &[id3, exec3] = router.limit({0, 990000, 40, side_t::ask, aapl, a1});
+  EXPECT_EQ(id3, 3);
+  ASSERT_EQ(exec3.size(), 2);
+  EXPECT_EQ(exec3[0], execution_t({1, 990000, 40, side_t::bid, aapl, b1}));
+  EXPECT_EQ(exec3[1], execution_t({3, 990000, 40, side_t::ask, aapl, a1}));
+  EXPECT_TRUE(router.cancel(1));
+}
+
+TEST(InstrumentRouterTests, ModifyTest) {
+  instrument_router<ladder_engine> router;
+  std::vector<fill_t> fills;
+  auto sink = [&fills](const fill_t &fill, const order_t &) { fills.push_back(fill); };
+
+  EXPECT_EQ(router.limit({0, 990000, 100, side_t::bid, aapl, b1}, sink), 1);
+  EXPECT_EQ(router.limit({0, 1000000, 100, side_t::ask, msft, a1}, sink), 2);
+  EXPECT_EQ(router.limit({0, 1000000, 100, side_t::ask, aapl, a1}, sink), 3);
+
+  // in place in the AAPL book, the id is kept
+  EXPECT_EQ(router.modify(1, 990000, 50, sink), 1);
+  // re-queued in the AAPL book under the next router id, and trades there only
+  EXPECT_EQ(router.modify(1, 1000000, 150, sink), 4);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{3, 4, 1000000, 100, side_t::bid}}));
+  EXPECT_EQ(router.limit({0, 1000000, 10, side_t::ask, aapl, a1}, sink), 5);
+  EXPECT_EQ(fills.back(), fill_t({4, 5, 1000000, 10, side_t::ask}));
+
+  EXPECT_EQ(router.modify(1, 990000, 10, sink), 0);
+  EXPECT_EQ(router.modify(6, 990000, 10, sink), 0);
+
+  // re-queued in the MSFT book against its own ask, trades entirely and no longer rests
+  fills.clear();
+  EXPECT_EQ(router.limit({0, 990000, 100, side_t::bid, msft, b1}, sink), 6);
+  EXPECT_EQ(router.modify(6, 1000000, 100, sink), 0);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{2, 7, 1000000, 100, side_t::bid}}));
+  EXPECT_FALSE(router.resting(6));
+  EXPECT_FALSE(router.resting(7));
+  // the ids of both the router and the book stay in step
+  EXPECT_EQ(router.limit({0, 1000000, 30, side_t::ask, msft, a1}, sink), 8);
+  EXPECT_EQ(router.limit({0, 1000000, 10, side_t::bid, msft, b1}, sink), 9);
+  EXPECT_EQ(fills.back(), fill_t({8, 9, 1000000, 10, side_t::bid}));
+  EXPECT_TRUE(router.cancel(4));
+  EXPECT_TRUE(router.cancel(8));
+}
+TEST(InstrumentRouterTests, CancelAllTest) {
+  instrument_router<ladder_engine> router;
+  auto sink = [](const fill_t &, const order_t &) {};
+
+  router.limit({0, 990000, 100, side_t::bid, aapl, b1}, sink);
+  router.limit({0, 990000, 100, side_t::bid, msft, b1}, sink);
+  router.limit({0, 1000000, 100, side_t::ask, msft, b1}, sink);
+  router.limit({0, 1000000, 100, side_t::ask, aapl, a1}, sink);
+
+  // limited to an instrument, or across every book
+  EXPECT_EQ(router.cancel_all(b1, side_t::invalid, goog), 0);
+  EXPECT_EQ(router.cancel_all(b1, side_t::invalid, msft), 2);
+  EXPECT_FALSE(router.cancel(3));
+  EXPECT_EQ(router.cancel_all(b1), 1);
+  EXPECT_FALSE(router.cancel(1));
+  EXPECT_TRUE(router.cancel(4));
+}
+
+TEST(InstrumentRouterTests, MassCancelledRoutesTest) {
+  instrument_router<ladder_engine> router;
+  auto sink = [](const fill_t &, const order_t &) {};
+
+  EXPECT_EQ(router.limit({0, 1000000, 100, side_t::ask, msft, a1}, sink), 1);
+  // the routes left behind by mass cancels are dropped along the way, the others are kept
+  for (orderid_t i = 0; i < 1000; ++i) {
+    orderid_t orderid = router.limit({0, 990000, 100, side_t::bid, aapl, b1}, sink);
+    EXPECT_EQ(router.limit({0, 980000, 100, side_t::bid, msft, b1}, sink), orderid + 1);
+    EXPECT_EQ(router.cancel_all(b1, side_t::invalid, aapl), 1);
+    EXPECT_FALSE(router.resting(orderid));
+    EXPECT_TRUE(router.resting(orderid + 1));
+  }
+  EXPECT_FALSE(router.cancel(2));
+  EXPECT_EQ(router.limit({0, 980000, 150, side_t::ask, msft, a1}, sink), 2002);
+  EXPECT_FALSE(router.resting(3));
+  EXPECT_TRUE(router.resting(5));
+  EXPECT_EQ(router.modify(5, 980000, 50, sink), 5);
+  EXPECT_EQ(router.cancel_all(b1), 999);
+  EXPECT_TRUE(router.cancel(1));
+}
+
+}  // namespace cupid
@@ -0,0 +1,157 @@
+#include <gtest/gtest.h>
+
+#include <algorithm>
+#include <map>
+#include <random>
+#include <utility>
+#include <vector>
+#include "engine_types.h"
+#include "flat_map_engine.h"
+#include "l2_feed.h"
+#include "ladder_engine.h"
+#include "pro_rata_engine.h"
+#include "trace_codec.h"
+
+namespace cupid {
+
+constexpr instr_t instr = {'A', 'A', 'P', 'L'};
+constexpr trader_t a1 = {'A', '1', '\0', '\0'};
+constexpr trader_t b1 = {'B', '1', '\0', '\0'};
+
+static std::vector<level_update_t> updates_of(std::span<const level_update_t> updates) {
+  return {updates.begin(), updates.end()};
+}
+
+TEST(L2FeedTests, LevelUpdatesTest) {
+  l2_feed<ladder_engine> feed;
+  auto sink = [](const fill_t &, const order_t &) {};
+
+  feed.limit({0, 990000, 100, side_t::bid, instr, b1}, sink);
+  EXPECT_EQ(updates_of(feed.updates()),
+            (std::vector<level_update_t>{{level_update_type::add, side_t::bid, 990000, 100, 1}}));
+  feed.limit({0, 990000, 50, side_t::bid, instr, b1}, sink);
+  feed.limit({0, 980000, 70, side_t::bid, instr, b1}, sink);
+  EXPECT_EQ(updates_of(feed.updates()),
+            (std::vector<level_update_t>{{level_update_type::add, side_t::bid, 980000, 70, 1}}));
+
+  // a sweep through several orders of a level is one update per level, and the remainder rests
+  feed.limit({0, 980000, 250, side_t::ask, instr, a1}, sink);
+  EXPECT_EQ(updates_of(feed.updates()), (std::vector<level_update_t>{
+                                             {level_update_type::add, side_t::ask, 980000, 30, 1},
+                                             {level_update_type::remove, side_t::bid, 990000, 0, 0},
+                                             {level_update_type::remove, side_t::bid, 980000, 0, 0},
+                                         }));
+
+  // an ioc order which does not trade leaves the book unchanged
+  feed.limit({0, 970000, 10, side_t::bid, instr, b1, order_type::limit, time_in_force::ioc}, sink);
+  EXPECT_TRUE(feed.updates().empty());
+
+  EXPECT_EQ(feed.modify(4, 980000, 20, sink), 4);
+  EXPECT_EQ(updates_of(feed.updates()),
+            (std::vector<level_update_t>{{level_update_type::change, side_t::ask, 980000, 20, 1}}));
+  EXPECT_TRUE(feed.cancel(4));
+  EXPECT_EQ(updates_of(feed.updates()),
+            (std::vector<level_update_t>{{level_update_type::remove, side_t::ask, 980000, 0, 0}}));
+  EXPECT_FALSE(feed.cancel(4));
+  EXPECT_TRUE(feed.updates().empty());
+}
+
+TEST(L2FeedTests, CancelAllUpdatesTest) {
+  l2_feed<ladder_engine> feed;
+  auto sink = [](const fill_t &, const order_t &) {};
+
+  feed.limit({0, 990000, 100, side_t::bid, instr, b1}, sink);
+  feed.limit({0, 990000, 50, side_t::bid, instr, a1}, sink);
+  feed.limit({0, 990000, 30, side_t::bid, instr, b1}, sink);
+  feed.limit({0, 980000, 70, side_t::bid, instr, b1}, sink);
+  feed.limit({0, 1000000, 70, side_t::ask, instr, b1}, sink);
+
+  // one update per level, whatever the number of orders cancelled from it
+  EXPECT_EQ(feed.cancel_all(b1, side_t::bid, {}), 3);
+  EXPECT_EQ(updates_of(feed.updates()), (std::vector<level_update_t>{
+                                             {level_update_type::remove, side_t::bid, 980000, 0, 0},
+                                             {level_update_type::change, side_t::bid, 990000, 50, 1},
+                                         }));
+  EXPECT_EQ(feed.cancel_all(b1, side_t::bid, {}), 0);
+  EXPECT_TRUE(feed.updates().empty());
+}
+
+TEST(L2FeedTests, SelfTradeUpdatesTest) {
+  l2_feed<ladder_engine> feed;
+  auto sink = [](const fill_t &, const order_t &) {};
+
+  feed.limit({0, 1000000, 100, side_t::ask, instr, a1}, sink);
+  feed.limit({0, 1010000, 100, side_t::ask, instr, a1}, sink);
+  // the resting ask is cancelled off by prevention rather than traded, its level is still published
+  feed.limit({0, 1000000, 50, side_t::bid, instr, a1, order_type::limit, time_in_force::day,
+              self_trade_prevention::cancel_oldest},
+             sink);
+  EXPECT_EQ(updates_of(feed.updates()), (std::vector<level_update_t>{
+                                             {level_update_type::add, side_t::bid, 1000000, 50, 1},
+                                             {level_update_type::remove, side_t::ask, 1000000, 0, 0},
+                                         }));
+}
+
+// a consumer applying the encoded feed holds the same levels as the engine
+template <typename Engine>
+static void expect_feed_replays_book() {
+  l2_feed<Engine> feed;
+  std::map<std::pair<side_t, price_t>, std::pair<uint64_t, uint32_t>> book;
+  std::vector<char> stream;
+  auto sink = [](const fill_t &, const order_t &) {};
+  std::mt19937 rng(11);
+  orderid_t limits = 0;
+  for (int i = 0; i < 20000; ++i) {
+    trader_t trader = rng() % 2 == 0 ? a1 : b1;
+    if (rng() % 256 == 0) {
+      feed.cancel_all(trader, rng() % 2 == 0 ? side_t::bid : side_t::invalid, {});
+    } else if (limits > 0 && rng() % 4 == 0) {
+      feed.cancel(1 + rng() % limits);
+    } else if (limits > 0 && rng() % 4 == 0) {
+      limits = std::max(limits, feed.modify(1 + rng() % limits, 990000 + (rng() % 21) * 1000, 50, sink));
+    } else {
+      side_t side = rng() % 2 == 0 ? side_t::bid : side_t::ask;
+      auto tif = rng() % 8 == 0 ? time_in_force::ioc : time_in_force::day;
+      // self-trade prevention cuts resting orders without a fill
+      auto stp = static_cast<stp_t>(rng() % 5);
+      order_t order{0,     990000 + (rng() % 21) * 1000, 100 + static_cast<quantity_t>(rng() % 5) * 100, side,
+                    instr, trader, order_type::limit, tif, stp};
+      limits = feed.limit(order, sink);
+    }
+    for (const auto &update : feed.updates()) {
+      stream.resize(stream.size() + LEVEL_UPDATE_RECORD_SIZE);
+      encode_level_update(update, stream.data() + stream.size() - LEVEL_UPDATE_RECORD_SIZE);
+    }
+  }
+  for (std::size_t offset = 0; offset < stream.size(); offset += LEVEL_UPDATE_RECORD_SIZE) {
+    level_update_t update = decode_level_update(stream.data() + offset);
+    auto key = std::make_pair(update.side, update.px);
+    ASSERT_EQ(book.contains(key), update.type != level_update_type::add);
+    if (update.type == level_update_type::remove) {
+      book.erase(key);
+    } else {
+      book[key] = {update.qty, update.count};
+    }
+  }
+
+  std::vector<price_level_t> levels(64);
+  std::size_t num_bids = feed.depth(side_t::bid, levels);
+  for (std::size_t i = 0; i < num_bids; ++i) {
+    auto key = std::make_pair(side_t::bid, levels[i].px);
+    EXPECT_EQ(book[key], std::make_pair(levels[i].qty, levels[i].count));
+  }
+  std::size_t num_asks = feed.depth(side_t::ask, levels);
+  for (std::size_t i = 0; i < num_asks; ++i) {
+    auto key = std::make_pair(side_t::ask, levels[i].px);
+    EXPECT_EQ(book[key], std::make_pair(levels[i].qty, levels[i].count));
+  }
+  EXPECT_EQ(book.size(), num_bids + num_asks);
+}
+
+TEST(L2FeedTests, LadderFeedReplaysBookTest) { expect_feed_replays_book<ladder_engine>(); }
+
+TEST(L2FeedTests, FlatMapFeedReplaysBookTest) { expect_feed_replays_book<flat_map_engine>(); }
+
+TEST(L2FeedTests, ProRataFeedReplaysBookTest) { expect_feed_replays_book<pro_rata_engine>(); }
+
+}  // namespace cupid
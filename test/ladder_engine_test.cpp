@@ -0,0 +1,344 @@
+#include <gtest/gtest.h>
+
+#include <span>
+#include <utility>
+#include <vector>
+#include "engine_interface.h"
+#include "engine_types.h"
+#include "ladder_engine.h"
+
+namespace cupid {
+
+constexpr instr_t instr = {'A', 'A', 'P', 'L'};
+constexpr trader_t a1 = {'A', '1', '\0', '\0'};
+constexpr trader_t a2 = {'A', '2', '\0', '\0'};
+constexpr trader_t b1 = {'B', '1', '\0', '\0'};
+constexpr trader_t b2 = {'B', '2', '\0', '\0'};
+
+TEST(LadderEngineTests, BasicFillTest) {
+  ladder_engine engine;
+
+  const auto &[id1, exec1] = engine.limit({0, 990000, 100, side_t::bid, instr, b1});
+  const auto &[id2, exec2] = engine.limit({0, 990000, 50, side_t::bid, instr, b2});
+  const auto &[id3, exec3] = engine.limit({0, 1000000, 200, side_t::ask, instr, a1});
+  EXPECT_EQ(id1, 1);
+  EXPECT_EQ(id2, 2);
+  EXPECT_EQ(id3, 3);
+  ASSERT_TRUE(exec1.empty());
+  ASSERT_TRUE(exec2.empty());
+  ASSERT_TRUE(exec3.empty());
+
+  // $99 @ 150 (id1:100, id2:50) / $100 @ 200
+  // fill the bid level in time priority
+  const auto &[id4, exec4] = engine.limit({0, 980000, 120, side_t::ask, instr, a1});
+  EXPECT_EQ(id4, 4);
+  ASSERT_EQ(exec4.size(), 4);
+  EXPECT_EQ(exec4[0], execution_t({1, 990000, 100, side_t::bid, instr, b1}));
+  EXPECT_EQ(exec4[1], execution_t({4, 990000, 100, side_t::ask, instr, a1}));
+  EXPECT_EQ(exec4[2], execution_t({2, 990000, 20, side_t::bid, instr, b2}));
+  EXPECT_EQ(exec4[3], execution_t({4, 990000, 20, side_t::ask, instr, a1}));
+
+  // $99 @ 30 (id2:30) / $100 @ 200
+  // sweep the ask side and rest the remaining on the bid side
+  const auto &[id5, exec5] = engine.limit({0, 1010000, 250, side_t::bid, instr, b1});
+  EXPECT_EQ(id5, 5);
+  ASSERT_EQ(exec5.size(), 2);
+  EXPECT_EQ(exec5[0], execution_t({3, 1000000, 200, side_t::ask, instr, a1}));
+  EXPECT_EQ(exec5[1], execution_t({5, 1000000, 200, side_t::bid, instr, b1}));
+
+  // $101 @ 50 (id5:50), $99 @ 30 (id2:30) / empty @ 0
+  const auto &[id6, exec6] = engine.limit({0, 990000, 100, side_t::ask, instr, a1});
+  EXPECT_EQ(id6, 6);
+  ASSERT_EQ(exec6.size(), 4);
+  EXPECT_EQ(exec6[0], execution_t({5, 1010000, 50, side_t::bid, instr, b1}));
+  EXPECT_EQ(exec6[1], execution_t({6, 1010000, 50, side_t::ask, instr, a1}));
+  EXPECT_EQ(exec6[2], execution_t({2, 990000, 30, side_t::bid, instr, b2}));
+  EXPECT_EQ(exec6[3], execution_t({6, 990000, 30, side_t::ask, instr, a1}));
+
+  // empty @ 0 / $99 @ 20 (id6:20)
+  EXPECT_TRUE(engine.cancel(6));
+  EXPECT_FALSE(engine.cancel(2));
+}
+
+TEST(LadderEngineTests, CancelBestLevelTest) {
+  ladder_engine engine;
+
+  const auto &[id1, exec1] = engine.limit({0, 990000, 100, side_t::bid, instr, b1});
+  const auto &[id2, exec2] = engine.limit({0, 900000, 100, side_t::bid, instr, b2});
+  const auto &[id3, exec3] = engine.limit({0, 995000, 100, side_t::bid, instr, b1});
+
+  // cancelling the best level moves the top of book to the next non-empty level
+  // $99.5 @ 100 (id3), $99 @ 100 (id1), $90 @ 100 (id2) / empty @ 0
+  EXPECT_TRUE(engine.cancel(3));
+  EXPECT_TRUE(engine.cancel(1));
+  EXPECT_FALSE(engine.cancel(1));
+
+  const auto &[id4, exec4] = engine.limit({0, 0, 150, side_t::ask, instr, a1});
+  EXPECT_EQ(id4, 4);
+  ASSERT_EQ(exec4.size(), 2);
+  EXPECT_EQ(exec4[0], execution_t({2, 900000, 100, side_t::bid, instr, b2}));
+  EXPECT_EQ(exec4[1], execution_t({4, 900000, 100, side_t::ask, instr, a1}));
+}
+
+TEST(LadderEngineTests, OffLadderPriceTest) {
+  // $99 to $100.9, 20 levels
+  ladder_engine engine(990000, 1000, 20);
+
+  const auto &[id1, exec1] = engine.limit({0, 995000, 100, side_t::ask, instr, a1});
+  ASSERT_TRUE(exec1.empty());
+
+  // a day bid above the ladder could not rest, it is rejected without trading
+  const auto &[id2, exec2] = engine.limit({0, 2000000, 150, side_t::bid, instr, b1});
+  EXPECT_EQ(id2, 0);
+  ASSERT_TRUE(exec2.empty());
+  EXPECT_TRUE(engine.resting(1));
+
+  // so is a day bid off tick, and each rejected order still uses up an id
+  const auto &[id3, exec3] = engine.limit({0, 995500, 100, side_t::bid, instr, b1});
+  EXPECT_EQ(id3, 0);
+  ASSERT_TRUE(exec3.empty());
+  EXPECT_FALSE(engine.cancel(2));
+  EXPECT_FALSE(engine.cancel(3));
+
+  // an ioc bid never rests, so it may be priced off the ladder and trades
+  const auto &[id4, exec4] =
+      engine.limit({0, 2000000, 150, side_t::bid, instr, b1, order_type::limit, time_in_force::ioc});
+  EXPECT_EQ(id4, 4);
+  ASSERT_EQ(exec4.size(), 2);
+  EXPECT_EQ(exec4[0], execution_t({1, 995000, 100, side_t::ask, instr, a1}));
+  EXPECT_EQ(exec4[1], execution_t({4, 995000, 100, side_t::bid, instr, b1}));
+  EXPECT_FALSE(engine.resting(4));
+
+  // a resting order modified off the ladder is cancelled and its re-queued order rejected
+  const auto &[id5, exec5] = engine.limit({0, 995000, 100, side_t::ask, instr, a1});
+  EXPECT_EQ(id5, 5);
+  ASSERT_TRUE(exec5.empty());
+  EXPECT_EQ(engine.modify(5, 1100000, 100, [](const fill_t &, const order_t &) {}), 0);
+  EXPECT_FALSE(engine.resting(5));
+  EXPECT_FALSE(engine.resting(6));
+  EXPECT_EQ(engine.limit({0, 995000, 100, side_t::ask, instr, a1}).first, 7);
+}
+
+TEST(LadderEngineTests, BatchSubmitTest) {
+  std::vector<action_t> actions = {
+      {action_type::limit, {0, 990000, 100, side_t::bid, instr, b1}, 0},
+      {action_type::limit, {0, 990000, 50, side_t::bid, instr, b2}, 0},
+      {action_type::cancel, {}, 1},
+      {action_type::cancel, {}, 1},
+      // rejected upstream, uses up id 3
+      {action_type::reject, {}, 0},
+      {action_type::limit, {0, 1000000, 200, side_t::ask, instr, a1}, 0},
+      {action_type::limit, {0, 980000, 120, side_t::ask, instr, a1}, 0},
+      {action_type::cancel, {}, 9},
+  };
+  ladder_engine engine;
+  std::vector<orderid_t> results(actions.size());
+  std::vector<fill_t> fills;
+  engine.submit(actions, results, [&fills](const fill_t &fill, const order_t &) { fills.push_back(fill); });
+
+  EXPECT_EQ(results, (std::vector<orderid_t>{1, 2, 1, 0, 0, 4, 5, 0}));
+  EXPECT_EQ(fills, (std::vector<fill_t>{{2, 5, 990000, 50, side_t::ask}}));
+  // $100 @ 200 (id4) and $98 @ 70 (id5) are resting
+  EXPECT_TRUE(engine.cancel(4));
+  EXPECT_TRUE(engine.cancel(5));
+}
+
+TEST(LadderEngineTests, ModifyTest) {
+  ladder_engine engine;
+  std::vector<fill_t> fills;
+  auto sink = [&fills](const fill_t &fill, const order_t &) { fills.push_back(fill); };
+
+  // $99 @ 200 (id1:100, id2:100) / empty @ 0
+  EXPECT_EQ(engine.limit({0, 990000, 100, side_t::bid, instr, b1}, sink), 1);
+  EXPECT_EQ(engine.limit({0, 990000, 100, side_t::bid, instr, b2}, sink), 2);
+
+  // reducing keeps the id and the time priority, increasing re-queues under a new id
+  EXPECT_EQ(engine.modify(1, 990000, 40, sink), 1);
+  EXPECT_EQ(engine.modify(2, 990000, 150, sink), 3);
+  // $99 @ 190 (id1:40, id3:150) / empty @ 0
+  EXPECT_EQ(engine.limit({0, 990000, 60, side_t::ask, instr, a1}, sink), 4);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{1, 4, 990000, 40, side_t::ask}, {3, 4, 990000, 20, side_t::ask}}));
+
+  // a price change re-queues too, and the re-queued order may trade
+  // $99 @ 130 (id3:130) / $100 @ 100 (id5:100)
+  fills.clear();
+  EXPECT_EQ(engine.limit({0, 1000000, 100, side_t::ask, instr, a1}, sink), 5);
+  EXPECT_EQ(engine.modify(3, 1000000, 130, sink), 6);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{5, 6, 1000000, 100, side_t::bid}}));
+
+  // $100 @ 30 (id6:30) / empty @ 0
+  EXPECT_EQ(engine.modify(1, 990000, 10, sink), 0);
+  EXPECT_EQ(engine.modify(3, 990000, 10, sink), 0);
+  EXPECT_EQ(engine.modify(42, 990000, 10, sink), 0);
+  EXPECT_TRUE(engine.cancel(6));
+
+  // a re-queued order which trades entirely rests under no id, the new id is used up all the same
+  // $99 @ 50 (id8:50) / $100 @ 100 (id7:100)
+  fills.clear();
+  EXPECT_EQ(engine.limit({0, 1000000, 100, side_t::ask, instr, a1}, sink), 7);
+  EXPECT_EQ(engine.limit({0, 990000, 50, side_t::bid, instr, b1}, sink), 8);
+  EXPECT_EQ(engine.modify(8, 1000000, 100, sink), 0);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{7, 9, 1000000, 100, side_t::bid}}));
+  EXPECT_FALSE(engine.cancel(8));
+  EXPECT_FALSE(engine.cancel(9));
+  EXPECT_EQ(engine.limit({0, 990000, 10, side_t::bid, instr, b1}, sink), 10);
+}
+
+TEST(LadderEngineTests, OrderTypesTest) {
+  ladder_engine engine;
+  std::vector<fill_t> fills;
+  auto sink = [&fills](const fill_t &fill, const order_t &) { fills.push_back(fill); };
+
+  // empty @ 0 / $100 @ 100 (id1), $101 @ 100 (id2)
+  engine.limit({0, 1000000, 100, side_t::ask, instr, a1}, sink);
+  engine.limit({0, 1010000, 100, side_t::ask, instr, a2}, sink);
+
+  // the unfilled part of an ioc order does not rest
+  EXPECT_EQ(engine.limit({0, 1000000, 150, side_t::bid, instr, b1, order_type::limit, time_in_force::ioc}, sink), 3);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{1, 3, 1000000, 100, side_t::bid}}));
+  EXPECT_FALSE(engine.cancel(3));
+
+  // a fok order trades only if it fills entirely
+  fills.clear();
+  EXPECT_EQ(engine.limit({0, 1010000, 150, side_t::bid, instr, b1, order_type::limit, time_in_force::fok}, sink), 4);
+  EXPECT_TRUE(fills.empty());
+  EXPECT_FALSE(engine.cancel(4));
+  EXPECT_EQ(engine.limit({0, 1010000, 100, side_t::ask, instr, a1}, sink), 5);
+  EXPECT_EQ(engine.limit({0, 1010000, 150, side_t::bid, instr, b1, order_type::limit, time_in_force::fok}, sink), 6);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{2, 6, 1010000, 100, side_t::bid}, {5, 6, 1010000, 50, side_t::bid}}));
+
+  // market orders trade at any price and never rest
+  // empty @ 0 / $101 @ 50 (id5)
+  fills.clear();
+  EXPECT_EQ(engine.limit({0, 0, 10, side_t::ask, instr, a1, order_type::market}, sink), 7);
+  EXPECT_FALSE(engine.cancel(7));
+  EXPECT_EQ(engine.limit({0, 0, 60, side_t::bid, instr, b2, order_type::market}, sink), 8);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{5, 8, 1010000, 50, side_t::bid}}));
+  EXPECT_FALSE(engine.cancel(8));
+  EXPECT_FALSE(engine.cancel(5));
+}
+
+TEST(LadderEngineTests, DepthTest) {
+  ladder_engine engine;
+  std::vector<price_level_t> levels(4);
+  auto sink = [](const fill_t &, const order_t &) {};
+
+  // $99 @ 150 (id1:100, id2:50), $98 @ 200 (id3:200) / $100 @ 300 (id4:300)
+  engine.limit({0, 990000, 100, side_t::bid, instr, b1}, sink);
+  engine.limit({0, 990000, 50, side_t::bid, instr, b2}, sink);
+  engine.limit({0, 980000, 200, side_t::bid, instr, b1}, sink);
+  engine.limit({0, 1000000, 300, side_t::ask, instr, a1}, sink);
+  ASSERT_EQ(engine.depth(side_t::bid, levels), 2);
+  EXPECT_EQ(levels[0], price_level_t({990000, 150, 2}));
+  EXPECT_EQ(levels[1], price_level_t({980000, 200, 1}));
+  ASSERT_EQ(engine.depth(side_t::ask, levels), 1);
+  EXPECT_EQ(levels[0], price_level_t({1000000, 300, 1}));
+  ASSERT_EQ(engine.depth(side_t::bid, std::span(levels).first(1)), 1);
+  EXPECT_EQ(levels[0], price_level_t({990000, 150, 2}));
+
+  // fills, cancels and in place modifies keep the aggregates up to date
+  engine.limit({0, 990000, 120, side_t::ask, instr, a1}, sink);
+  ASSERT_EQ(engine.depth(side_t::bid, levels), 2);
+  EXPECT_EQ(levels[0], price_level_t({990000, 30, 1}));
+  EXPECT_TRUE(engine.cancel(3));
+  EXPECT_EQ(engine.modify(2, 990000, 10, sink), 2);
+  ASSERT_EQ(engine.depth(side_t::bid, levels), 1);
+  EXPECT_EQ(levels[0], price_level_t({990000, 10, 1}));
+  EXPECT_TRUE(engine.cancel(2));
+  EXPECT_EQ(engine.depth(side_t::bid, levels), 0);
+}
+
+TEST(LadderEngineTests, CancelAllTest) {
+  ladder_engine engine;
+  std::vector<price_level_t> levels(4);
+  auto sink = [](const fill_t &, const order_t &) {};
+
+  engine.limit({0, 990000, 100, side_t::bid, instr, b1}, sink);
+  engine.limit({0, 980000, 100, side_t::bid, instr, b2}, sink);
+  engine.limit({0, 970000, 100, side_t::bid, instr, b1}, sink);
+  engine.limit({0, 1000000, 100, side_t::ask, instr, b1}, sink);
+  engine.limit({0, 1010000, 100, side_t::ask, instr, a1}, sink);
+  // filled orders are no longer the trader's to cancel
+  engine.limit({0, 1000000, 100, side_t::bid, instr, a2}, sink);
+
+  EXPECT_EQ(engine.cancel_all(a2), 0);
+  EXPECT_EQ(engine.cancel_all(b1, side_t::ask), 0);
+  EXPECT_EQ(engine.cancel_all(b1, side_t::bid, {'M', 'S', 'F', 'T'}), 0);
+  EXPECT_EQ(engine.cancel_all(b1, side_t::bid, instr), 2);
+  EXPECT_FALSE(engine.cancel(1));
+  EXPECT_FALSE(engine.cancel(3));
+  ASSERT_EQ(engine.depth(side_t::bid, levels), 1);
+  EXPECT_EQ(levels[0], price_level_t({980000, 100, 1}));
+
+  EXPECT_EQ(engine.cancel_all(b2), 1);
+  EXPECT_EQ(engine.cancel_all(a1), 1);
+  EXPECT_EQ(engine.depth(side_t::bid, levels), 0);
+  EXPECT_EQ(engine.depth(side_t::ask, levels), 0);
+  EXPECT_EQ(engine.cancel_all(a1), 0);
+}
+
+TEST(LadderEngineTests, SelfTradePreventionTest) {
+  struct expected {
+    stp_t stp;
+    std::vector<fill_t> fills;
+    std::vector<price_level_t> asks;
+    std::vector<price_level_t> bids;
+  };
+  const std::vector<expected> cases = {
+      {self_trade_prevention::none, {{1, 3, 1000000, 100, side_t::bid}, {2, 3, 1000000, 50, side_t::bid}},
+       {{1000000, 50, 1}}, {}},
+      {self_trade_prevention::cancel_newest, {}, {{1000000, 200, 2}}, {}},
+      {self_trade_prevention::cancel_oldest, {{2, 3, 1000000, 100, side_t::bid}}, {}, {{1000000, 50, 1}}},
+      {self_trade_prevention::cancel_both, {}, {{1000000, 100, 1}}, {}},
+      {self_trade_prevention::decrement, {{2, 3, 1000000, 50, side_t::bid}}, {{1000000, 50, 1}}, {}},
+  };
+  for (const auto &c : cases) {
+    ladder_engine engine;
+    std::vector<fill_t> fills;
+    auto sink = [&fills](const fill_t &fill, const order_t &) { fills.push_back(fill); };
+    std::vector<price_level_t> levels(4);
+
+    // a1 meets its own order first, then b1's
+    engine.limit({0, 1000000, 100, side_t::ask, instr, a1}, sink);
+    engine.limit({0, 1000000, 100, side_t::ask, instr, b1}, sink);
+    engine.limit({0, 1000000, 150, side_t::bid, instr, a1, order_type::limit, time_in_force::day, c.stp}, sink);
+    EXPECT_EQ(fills, c.fills);
+    levels.resize(engine.depth(side_t::ask, levels));
+    EXPECT_EQ(levels, c.asks);
+    levels.resize(4);
+    levels.resize(engine.depth(side_t::bid, levels));
+    EXPECT_EQ(levels, c.bids);
+  }
+}
+
+TEST(LadderEngineTests, SelfTradeCutsReportedTest) {
+  ladder_engine engine;
+  std::vector<fill_t> fills;
+  std::vector<std::pair<orderid_t, quantity_t>> cuts;
+  // a sink also taking cuts is handed them, before they are taken off the orders
+  auto sink = overloaded{[&fills](const fill_t &fill, const order_t &) { fills.push_back(fill); },
+                         [&cuts](const self_trade_cut &cut, const order_t &resting) {
+                           EXPECT_EQ(resting.qty, 100);
+                           cuts.emplace_back(resting.id, cut.resting_qty);
+                         }};
+
+  engine.limit({0, 1000000, 100, side_t::ask, instr, a1}, sink);
+  engine.limit({0, 1000000, 100, side_t::ask, instr, b1}, sink);
+  engine.limit({0, 1000000, 150, side_t::bid, instr, a1, order_type::limit, time_in_force::day,
+                self_trade_prevention::decrement},
+               sink);
+  EXPECT_EQ(cuts, (std::vector<std::pair<orderid_t, quantity_t>>{{1, 100}}));
+  EXPECT_EQ(fills, (std::vector<fill_t>{{2, 3, 1000000, 50, side_t::bid}}));
+}
+
+TEST(LadderEngineTests, UnknownSelfTradePreventionTest) {
+  ladder_engine engine;
+  auto sink = [](const fill_t &, const order_t &) {};
+  engine.limit({0, 1000000, 100, side_t::ask, instr, a1}, sink);
+  // not a mode, asserts in a debug build and must not leave the matching loop spinning otherwise
+  order_t order{0, 1000000, 100, side_t::bid, instr, a1};
+  order.stp = static_cast<stp_t>(7);
+  EXPECT_DEBUG_DEATH(engine.limit(order, sink), "");
+}
+
+}  // namespace cupid
@@ -0,0 +1,57 @@
+#include <gtest/gtest.h>
+
+#include <random>
+#include <iterator>
+#include <set>
+#include "level_bitmap.h"
+
+namespace cupid {
+
+TEST(LevelBitmapTests, SparseLevelsTest) {
+  level_bitmap bitmap(1 << 16);
+  EXPECT_EQ(bitmap.next_set(0), level_bitmap::NONE);
+  EXPECT_EQ(bitmap.prev_set((1 << 16) - 1), level_bitmap::NONE);
+
+  // levels far apart, in different words of every layer
+  bitmap.set(3);
+  bitmap.set(5000);
+  bitmap.set(65535);
+  EXPECT_TRUE(bitmap.test(5000));
+  EXPECT_FALSE(bitmap.test(4999));
+  EXPECT_EQ(bitmap.next_set(0), 3);
+  EXPECT_EQ(bitmap.next_set(4), 5000);
+  EXPECT_EQ(bitmap.next_set(5000), 5000);
+  EXPECT_EQ(bitmap.next_set(5001), 65535);
+  EXPECT_EQ(bitmap.prev_set(65534), 5000);
+  EXPECT_EQ(bitmap.prev_set(4999), 3);
+  EXPECT_EQ(bitmap.prev_set(2), level_bitmap::NONE);
+
+  bitmap.clear(5000);
+  EXPECT_EQ(bitmap.next_set(4), 65535);
+  EXPECT_EQ(bitmap.prev_set(65534), 3);
+}
+
+TEST(LevelBitmapTests, MatchesOrderedSetTest) {
+  // not a multiple of 64, with three layers
+  constexpr std::size_t num_levels = 5000;
+  level_bitmap bitmap(num_levels);
+  std::set<std::size_t> levels;
+  std::mt19937 rng(1);
+  for (int i = 0; i < 20000; ++i) {
+    std::size_t level = rng() % num_levels;
+    if (rng() % 2 == 0) {
+      bitmap.set(level);
+      levels.insert(level);
+    } else {
+      bitmap.clear(level);
+      levels.erase(level);
+    }
+    std::size_t from = rng() % num_levels;
+    auto next = levels.lower_bound(from);
+    EXPECT_EQ(bitmap.next_set(from), next == levels.end() ? level_bitmap::NONE : *next);
+    auto prev = levels.upper_bound(from);
+    EXPECT_EQ(bitmap.prev_set(from), prev == levels.begin() ? level_bitmap::NONE : *std::prev(prev));
+  }
+}
+
+}  // namespace cupid
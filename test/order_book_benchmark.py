@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+"""
+Micro benchmarks of the Python OrderBook used by the trace generator
+Every case builds a fresh book outside of the timed region, runs a batch of
+operations on it and reports the time per operation, results are written as JSON
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from order_trace_generator import OrderBook, OrderTraceGenerator
+
+REFERENCE_PX = 1000000
+BID, ASK = 1, -1
+
+def build_book(levels: int, orders_per_level: int = 1, qty: int = 100) -> OrderBook:
+    """both sides with 'levels' price levels around the reference price"""
+    ob = OrderBook()
+    for i in range(levels):
+        for _ in range(orders_per_level):
+            ob.add_limit_order(BID, REFERENCE_PX - (i + 1) * ob.tick_size, qty)
+            ob.add_limit_order(ASK, REFERENCE_PX + (i + 1) * ob.tick_size, qty)
+    return ob
+
+def measure(setup: Callable[[], Callable[[], None]], ops: int, repeat: int) -> Dict:
+    """'setup' returns the timed callable which performs 'ops' operations"""
+    samples = []
+    for _ in range(repeat):
+        run = setup()
+        start = time.perf_counter_ns()
+        run()
+        samples.append((time.perf_counter_ns() - start) / ops)
+    return {
+        'ops': ops,
+        'repeat': repeat,
+        'ns_per_op_min': min(samples),
+        'ns_per_op_median': statistics.median(samples),
+    }
+
+def bench_add_resting(depth: int, ops: int) -> Callable[[], None]:
+    ob = build_book(depth)
+    # deeper than any existing level so nothing crosses
+    prices = [REFERENCE_PX - (depth + 1 + i % 100) * ob.tick_size for i in range(ops)]
+
+    def run():
+        for px in prices:
+            ob.add_limit_order(BID, px, 100)
+    return run
+
+def bench_add_cross_one_level(depth: int, ops: int) -> Callable[[], None]:
+    ob = build_book(depth)
+    best_ask = REFERENCE_PX + ob.tick_size
+    # enough resting quantity at the best ask so that every order fills there
+    ob.add_limit_order(ASK, best_ask, 100 * ops)
+
+    def run():
+        for _ in range(ops):
+            ob.add_limit_order(BID, best_ask, 100)
+    return run
+
+def bench_add_sweep(levels: int) -> Callable[[], None]:
+    ob = build_book(levels)
+
+    def run():
+        ob.add_limit_order(BID, REFERENCE_PX + levels * ob.tick_size, 100 * levels)
+    return run
+
+def bench_cancel(queue_len: int, position: str) -> Callable[[], None]:
+    ob = build_book(10)
+    px = REFERENCE_PX - ob.tick_size
+    ids = [ob.add_limit_order(BID, px, 100) for _ in range(queue_len)]
+    target = {'front': ids[0], 'middle': ids[len(ids) // 2], 'back': ids[-1]}[position]
+
+    def run():
+        ob.cancel_order(target)
+    return run
+
+def bench_update_bbo(depth: int, ops: int) -> Callable[[], None]:
+    ob = build_book(depth)
+
+    def run():
+        for _ in range(ops):
+            ob._update_bbo()
+    return run
+
+def bench_generate(count: int, seed: int) -> Callable[[], None]:
+    random.seed(seed)
+    generator = OrderTraceGenerator(depth_prob=0.8, cancel_prob=0.2)
+
+    def run():
+        generator.generate_N_trace(count)
+    return run
+
+def run_suite(repeat: int, quick: bool) -> List[Dict]:
+    ops = 200 if quick else 2000
+    depths = (10, 100) if quick else (10, 100, 1000)
+    results = []
+
+    def record(name: str, params: Dict, setup: Callable[[], Callable[[], None]], n: int):
+        results.append({'name': name, 'params': params, **measure(setup, n, repeat)})
+
+    for depth in depths:
+        record('add_limit_order/resting', {'depth': depth}, lambda: bench_add_resting(depth, ops), ops)
+        record('add_limit_order/cross_one_level', {'depth': depth}, lambda: bench_add_cross_one_level(depth, ops), ops)
+        record('_update_bbo', {'depth': depth}, lambda: bench_update_bbo(depth, ops), ops)
+    for levels in (1, 10, 100):
+        record('add_limit_order/sweep', {'levels': levels}, lambda: bench_add_sweep(levels), 1)
+    for queue_len in (10, 1000):
+        for position in ('front', 'middle', 'back'):
+            record('cancel_order', {'queue_len': queue_len, 'position': position},
+                   lambda: bench_cancel(queue_len, position), 1)
+    count = 1000 if quick else 10000
+    record('generate_N_trace', {'count': count}, lambda: bench_generate(count, seed=0), count)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the Python OrderBook used for trace generation')
+    parser.add_argument('-o', '--output', type=str, default="order_book_benchmark.json", help="The output path for the JSON results")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="How many times each case is run, min and median are reported")
+    parser.add_argument('--quick', action='store_true', help="Smaller sizes for a fast smoke run")
+    args = parser.parse_args()
+    results = run_suite(args.repeat, args.quick)
+    for result in results:
+        params = ' '.join(f"{k}={v}" for k, v in result['params'].items())
+        print(f"{result['name']:<32} {params:<32} {result['ns_per_op_median']:>14,.0f} ns/op")
+    with open(args.output, 'w') as f:
+        json.dump({'python': platform.python_version(), 'repeat': args.repeat, 'benchmarks': results}, f, indent=2)
@@ -0,0 +1,58 @@
+#include <gtest/gtest.h>
+
+#include <vector>
+#include "engine_types.h"
+#include "order_pool.h"
+
+namespace cupid {
+
+static std::vector<orderid_t> queue_ids(order_pool &pool, const order_queue &queue) {
+  std::vector<orderid_t> ids;
+  for (node_t idx = queue.head; idx != NO_NODE; idx = pool[idx].next) {
+    ids.push_back(pool[idx].order.id);
+  }
+  return ids;
+}
+
+TEST(OrderPoolTests, QueueLinkTest) {
+  order_pool pool(4);
+  order_queue queue;
+  ASSERT_TRUE(queue.empty());
+
+  node_t n1 = pool.allocate({1, 990000, 100, side_t::bid, {}, {}});
+  node_t n2 = pool.allocate({2, 990000, 100, side_t::bid, {}, {}});
+  node_t n3 = pool.allocate({3, 990000, 100, side_t::bid, {}, {}});
+  pool.push_back(queue, n1);
+  pool.push_back(queue, n2);
+  pool.push_back(queue, n3);
+  EXPECT_EQ(queue_ids(pool, queue), std::vector<orderid_t>({1, 2, 3}));
+
+  // unlink from the middle, the head and the tail
+  pool.unlink(queue, n2);
+  EXPECT_EQ(queue_ids(pool, queue), std::vector<orderid_t>({1, 3}));
+  pool.unlink(queue, n1);
+  EXPECT_EQ(queue_ids(pool, queue), std::vector<orderid_t>({3}));
+  pool.unlink(queue, n3);
+  EXPECT_TRUE(queue.empty());
+  EXPECT_EQ(queue.tail, NO_NODE);
+}
+
+TEST(OrderPoolTests, FreeListReuseTest) {
+  order_pool pool(2);
+  node_t n1 = pool.allocate({1, 990000, 100, side_t::bid, {}, {}});
+  node_t n2 = pool.allocate({2, 990000, 100, side_t::bid, {}, {}});
+  EXPECT_NE(n1, n2);
+
+  // released nodes are handed out again, last released first
+  pool.release(n1);
+  pool.release(n2);
+  EXPECT_EQ(pool.allocate({3, 990000, 100, side_t::ask, {}, {}}), n2);
+  EXPECT_EQ(pool.allocate({4, 990000, 100, side_t::ask, {}, {}}), n1);
+  EXPECT_EQ(pool[n1].order.id, 4);
+
+  // beyond the free list the pool grows
+  node_t n5 = pool.allocate({5, 990000, 100, side_t::ask, {}, {}});
+  EXPECT_NE(n5, n1);
+  EXPECT_NE(n5, n2);
+}
+}  // namespace cupid
@@ -7,15 +7,37 @@ Based on the assumption that for a single instrument:
 2. but most activities happen close to the top of the book
 """
 
+import cProfile
+import json
+import pstats
 import random
 import struct
+import sys
+import time
 from enum import IntEnum
 from typing import List, Dict, Tuple, Optional, Deque
 from dataclasses import dataclass
 import argparse
+import shutil
 from pathlib import Path
 from collections import defaultdict, deque
-from tqdm import tqdm
+from contextlib import contextmanager
+
+# bump whenever a change alters the generated bytes for the same parameters,
+# it is part of the trace cache key
+GENERATOR_VERSION = 1
+
+PROGRESS_MODES = ("none", "line", "tqdm")
+
+# reported first and always in this order by --profile, even when never called
+PROFILED_FUNCTIONS = (
+    "add_limit_order",
+    "cancel_order",
+    "_update_bbo",
+    "_generate_depth",
+    "generate_random_cancel",
+    "serialize_to_file",
+)
 
 class ActionType(IntEnum):
     LIMIT = 0
@@ -155,6 +177,84 @@ class OrderBook:
     def active_order_ids(self) -> List[int]:
         return list(self.all_orders.keys())
 
+class GeneratorMetrics:
+    """
+    Throughput counters of a generation run
+    The hot loop only accumulates per-phase time, everything else
+    (snapshot, progress output) is refreshed once every 'interval' actions
+    """
+
+    def __init__(self, total: int, interval: int = 10000, progress: str = "none"):
+        assert interval > 0
+        assert progress in PROGRESS_MODES
+        self.total = total
+        self.interval = interval
+        self.progress = progress
+        self.actions = 0
+        self.phase_s: Dict[str, float] = defaultdict(float)
+        self.history: List[Dict] = []
+        self.start = time.perf_counter()
+        self._bar = None
+        if progress == "tqdm":
+            from tqdm import tqdm  # optional dependency, only needed for this mode
+            self._bar = tqdm(total=total)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_s[name] += time.perf_counter() - start
+
+    def snapshot(self, ob: OrderBook) -> Dict:
+        elapsed = time.perf_counter() - self.start
+        return {
+            'actions': self.actions,
+            'total': self.total,
+            'elapsed_s': elapsed,
+            'actions_per_sec': self.actions / elapsed if elapsed > 0 else 0.0,
+            'bid_levels': len(ob.bid_pricelevels),
+            'ask_levels': len(ob.ask_pricelevels),
+            'resting_orders': len(ob.all_orders),
+            'phase_s': dict(self.phase_s),
+        }
+
+    def progress_line(self, snapshot: Dict) -> str:
+        return (f"{snapshot['actions']}/{snapshot['total']} actions | "
+                f"{snapshot['actions_per_sec']:,.0f} actions/s | "
+                f"depth {snapshot['bid_levels']}x{snapshot['ask_levels']} levels | "
+                f"{snapshot['resting_orders']} resting orders")
+
+    def report(self, actions: int, ob: OrderBook):
+        """record a snapshot after a batch of actions and refresh the progress output"""
+        batch = actions - self.actions
+        self.actions = actions
+        snapshot = self.snapshot(ob)
+        self.history.append(snapshot)
+        if self._bar is not None:
+            self._bar.update(batch)
+        elif self.progress == "line":
+            print('\r' + self.progress_line(snapshot), end='', file=sys.stderr, flush=True)
+
+    def close(self):
+        if self._bar is not None:
+            self._bar.close()
+        elif self.progress == "line" and self.history:
+            print(file=sys.stderr)
+
+    def to_json(self) -> Dict:
+        return {
+            'actions': self.actions,
+            'elapsed_s': time.perf_counter() - self.start,
+            'phase_s': dict(self.phase_s),
+            'history': self.history,
+        }
+
+    def dump_json(self, filename: Path | str):
+        with open(filename, 'w') as f:
+            json.dump(self.to_json(), f, indent=2)
+
 class OrderTraceGenerator:
     """simulate a series of traces of realistic market order activity"""
     def __init__(self, depth_prob: float, cancel_prob:float):
@@ -229,16 +329,31 @@ class OrderTraceGenerator:
         trader = random.choice(self.traders)
         self.generate_limit_order_trace(side, price, quantity, self.ticker, trader)
 
-    def generate_N_trace(self, N: int):
+    def generate_N_trace(self, N: int, metrics: Optional[GeneratorMetrics] = None):
+        if metrics is None:
+            metrics = GeneratorMetrics(N)
         self.traces.clear()
-        self.seed_initial_book(num_levels=10)
-        for _ in tqdm(range(N)):
-            if random.random() < self.cancel_prob and self.ob.active_order_ids():
-                # cancel
-                self.generate_random_cancel()
-            else:
-                self.generate_random_limit_order()
-                
+        with metrics.phase('seed'):
+            self.seed_initial_book(num_levels=10)
+        clock = time.perf_counter
+        done = 0
+        while done < N:
+            batch = min(metrics.interval, N - done)
+            limit_s = cancel_s = 0.0
+            for _ in range(batch):
+                start = clock()
+                if random.random() < self.cancel_prob and self.ob.all_orders:
+                    # cancel
+                    self.generate_random_cancel()
+                    cancel_s += clock() - start
+                else:
+                    self.generate_random_limit_order()
+                    limit_s += clock() - start
+            metrics.phase_s['limit'] += limit_s
+            metrics.phase_s['cancel'] += cancel_s
+            done += batch
+            metrics.report(done, self.ob)
+        metrics.close()
 
     def generate_random_cancel(self):
         active_order_ids = self.ob.active_order_ids()
@@ -291,13 +406,90 @@ class OrderTraceGenerator:
                                         trace.cancel_id)      # cancel_id
                 f.write(packed)
                     
+def write_profile(profiler: cProfile.Profile, filename: Path | str, header: str):
+    """
+    Dump a per-function breakdown of the functions defined in this file
+    Rows are keyed and ordered by function name only (no line numbers, no stdlib frames),
+    so two profiles of different generator versions can be diffed line by line
+    """
+    rows: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+    this_file = Path(__file__).name
+    for (path, _, name), (_, ncalls, tottime, cumtime, _) in pstats.Stats(profiler).stats.items():
+        if Path(path).name != this_file:
+            continue
+        row = rows[name]
+        row[0] += ncalls
+        row[1] += tottime
+        row[2] += cumtime
+
+    def format_row(name: str) -> str:
+        ncalls, tottime, cumtime = rows[name]
+        percall_us = cumtime / ncalls * 1e6 if ncalls else 0.0
+        return f"{name:<32} {ncalls:>12} {tottime:>12.3f} {cumtime:>12.3f} {percall_us:>12.2f}"
+
+    columns = f"{'function':<32} {'ncalls':>12} {'tottime_s':>12} {'cumtime_s':>12} {'percall_us':>12}"
+    with open(filename, 'w') as f:
+        f.write(f"# {header}\n")
+        f.write(columns + "\n")
+        for name in PROFILED_FUNCTIONS:
+            f.write(format_row(name) + "\n")
+        f.write(f"\n# all functions in {this_file}\n")
+        f.write(columns + "\n")
+        for name in sorted(rows):
+            f.write(format_row(name) + "\n")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate a realistic market order trace for performance benchmark purpose')
     parser.add_argument('-c', '--count', type=int, default=10000, help="How many traces to generate")
-    parser.add_argument('-o', '--output', type=str, default="trace.bin", help="The output path for the binary file")
+    parser.add_argument('-o', '--output', type=str, default=None, help="The output path for the binary file. default is trace.bin, or only the cached path when caching")
     parser.add_argument('--depth-prob', type=float, default=0.8, help="The probability of activity happening not on top of book. default is 80 percent on tob of book")
     parser.add_argument('--cancel-prob', type=float, default=0.2, help="The probability that cancel happens")
+    parser.add_argument('--seed', type=int, default=None, help="Seed of the random generator, required to make a trace reproducible")
+    parser.add_argument('--scenario', type=str, default="default", help="Name of the trace family, part of the cache key")
+    parser.add_argument('--cache-dir', type=str, default=None, help="Reuse traces generated with the same parameters from this directory")
+    parser.add_argument('--cache-max-mb', type=int, default=4096, help="Size limit of the cache directory, least recently used traces are evicted first")
+    parser.add_argument('--progress', choices=PROGRESS_MODES, default="line", help="How to report progress on stderr. tqdm is only imported for the tqdm mode")
+    parser.add_argument('--metrics-interval', type=int, default=10000, help="How many actions between two metrics snapshots")
+    parser.add_argument('--metrics-json', type=str, default=None, help="Dump the generation metrics as JSON to this path")
+    parser.add_argument('--profile', action='store_true', help="Run the generation under cProfile and write a per-function breakdown")
+    parser.add_argument('--profile-output', type=str, default="trace_profile.txt", help="The output path for the --profile breakdown")
     args = parser.parse_args()
-    generator = OrderTraceGenerator(depth_prob=args.depth_prob, cancel_prob=args.cancel_prob)
-    generator.generate_N_trace(args.count)
-    generator.serialize_to_file(args.output)
\ No newline at end of file
+    if args.cache_dir is not None and args.seed is None:
+        parser.error("--cache-dir requires --seed, an unseeded trace cannot be reused")
+    if args.cache_dir is not None and args.profile:
+        parser.error("--profile cannot be combined with --cache-dir, a cache hit would profile nothing")
+
+    def produce(path: Path | str):
+        if args.seed is not None:
+            random.seed(args.seed)
+        generator = OrderTraceGenerator(depth_prob=args.depth_prob, cancel_prob=args.cancel_prob)
+        metrics = GeneratorMetrics(args.count, args.metrics_interval, args.progress)
+        generator.generate_N_trace(args.count, metrics)
+        with metrics.phase('serialize'):
+            generator.serialize_to_file(path)
+        if args.metrics_json is not None:
+            metrics.dump_json(args.metrics_json)
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.runcall(produce, args.output or "trace.bin")
+        write_profile(profiler, args.profile_output,
+                      f"count={args.count} depth_prob={args.depth_prob} cancel_prob={args.cancel_prob} "
+                      f"seed={args.seed} version={GENERATOR_VERSION}")
+    elif args.cache_dir is None:
+        produce(args.output or "trace.bin")
+    else:
+        from trace_cache import TraceCache
+        cache = TraceCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+        params = {
+            'version': GENERATOR_VERSION,
+            'count': args.count,
+            'depth_prob': args.depth_prob,
+            'cancel_prob': args.cancel_prob,
+            'seed': args.seed,
+            'scenario': args.scenario,
+        }
+        cached_path = cache.get_or_create(params, produce)
+        if args.output is not None:
+            shutil.copyfile(cached_path, args.output)
+        print(cached_path)
@@ -0,0 +1,149 @@
+#include <gtest/gtest.h>
+
+#include <random>
+#include <vector>
+#include "engine_types.h"
+#include "ladder_engine.h"
+#include "pipeline.h"
+#include "trace_codec.h"
+#include "wait_strategy.h"
+
+namespace cupid {
+
+constexpr instr_t msft = {'M', 'S', 'F', 'T'};
+constexpr trader_t a1 = {'A', '1', '\0', '\0'};
+
+// random limit orders around $100 with cancels of earlier orders, encoded as wire records
+static std::vector<char> random_records(std::size_t num_actions) {
+  std::mt19937 rng(7);
+  std::vector<char> records(num_actions * TRACE_RECORD_SIZE);
+  orderid_t limits = 0;
+  for (std::size_t i = 0; i < num_actions; ++i) {
+    action_t action;
+    if (limits > 0 && rng() % 4 == 0) {
+      action = {action_type::cancel, {}, 1 + rng() % limits};
+    } else {
+      side_t side = rng() % 2 == 0 ? side_t::bid : side_t::ask;
+      price_t px = 990000 + (rng() % 21) * 1000;
+      auto qty = static_cast<quantity_t>(100 + rng() % 5 * 100);
+      action = {action_type::limit, {0, px, qty, side, msft, a1}, 0};
+      ++limits;
+    }
+    encode_trace(action, records.data() + i * TRACE_RECORD_SIZE);
+  }
+  return records;
+}
+
+static std::vector<fill_t> decode_fills(const std::vector<char> &bytes) {
+  std::vector<fill_t> fills;
+  for (std::size_t offset = 0; offset < bytes.size(); offset += FILL_RECORD_SIZE) {
+    fills.push_back(decode_fill(bytes.data() + offset));
+  }
+  return fills;
+}
+
+template <typename WaitStrategy>
+static void expect_matches_direct_replay(const std::vector<char> &records) {
+  std::vector<fill_t> expected;
+  ladder_engine direct;
+  for (std::size_t offset = 0; offset < records.size(); offset += TRACE_RECORD_SIZE) {
+    action_t action = decode_trace(records.data() + offset);
+    if (action.is_limit()) {
+      direct.limit(action.order, [&expected](const fill_t &fill, const order_t &) { expected.push_back(fill); });
+    } else {
+      direct.cancel(action.cancel_id);
+    }
+  }
+
+  // tiny rings so that every stage runs into full and empty rings
+  ladder_engine engine;
+  pipeline<ladder_engine, WaitStrategy, 16> stages(engine);
+  std::vector<char> published;
+  pipeline_stats stats = stages.run(records, [&published](const char *data, std::size_t size) {
+    published.insert(published.end(), data, data + size);
+  });
+  EXPECT_EQ(stats.decoded, records.size() / TRACE_RECORD_SIZE);
+  EXPECT_EQ(stats.rejected, 0);
+  EXPECT_EQ(stats.fills, expected.size());
+  ASSERT_EQ(published.size(), expected.size() * FILL_RECORD_SIZE);
+  EXPECT_EQ(decode_fills(published), expected);
+}
+
+TEST(PipelineTests, TraceCodecRoundTripTest) {
+  action_t limit{action_type::limit, {3, 1000000, 200, side_t::ask, msft, a1}, 0};
+  action_t cancel{action_type::cancel, {}, 42};
+  char record[TRACE_RECORD_SIZE];
+  encode_trace(limit, record);
+  action_t decoded = decode_trace(record);
+  EXPECT_TRUE(decoded.is_limit());
+  EXPECT_EQ(decoded.order, limit.order);
+  encode_trace(cancel, record);
+  decoded = decode_trace(record);
+  EXPECT_TRUE(decoded.is_cancel());
+  EXPECT_EQ(decoded.cancel_id, 42);
+
+  fill_t fill{1, 2, 1000000, 100, side_t::bid};
+  char fill_record[FILL_RECORD_SIZE];
+  encode_fill(fill, fill_record);
+  EXPECT_EQ(decode_fill(fill_record), fill);
+}
+
+TEST(PipelineTests, BackoffMatchesDirectReplayTest) {
+  expect_matches_direct_replay<backoff_wait>(random_records(20000));
+}
+
+TEST(PipelineTests, BusySpinMatchesDirectReplayTest) {
+  expect_matches_direct_replay<busy_spin_wait>(random_records(2000));
+}
+
+TEST(PipelineTests, RejectInvalidRecordsTest) {
+  std::vector<char> records(4 * TRACE_RECORD_SIZE);
+  encode_trace({action_type::limit, {0, 1000000, 100, side_t::bid, msft, a1}, 0}, records.data());
+  // no quantity
+  encode_trace({action_type::limit, {0, 1000000, 0, side_t::ask, msft, a1}, 0}, records.data() + TRACE_RECORD_SIZE);
+  // unknown action
+  encode_trace({static_cast<action_type>(7), {}, 1}, records.data() + 2 * TRACE_RECORD_SIZE);
+  encode_trace({action_type::limit, {0, 1000000, 100, side_t::ask, msft, a1}, 0},
+               records.data() + 3 * TRACE_RECORD_SIZE);
+
+  ladder_engine engine;
+  pipeline<ladder_engine> stages(engine);
+  std::vector<char> published;
+  pipeline_stats stats = stages.run(records, [&published](const char *data, std::size_t size) {
+    published.insert(published.end(), data, data + size);
+  });
+  EXPECT_EQ(stats.decoded, 4);
+  EXPECT_EQ(stats.rejected, 2);
+  // the rejected limit order used up id 2
+  EXPECT_EQ(decode_fills(published), (std::vector<fill_t>{{1, 3, 1000000, 100, side_t::ask}}));
+}
+
+TEST(PipelineTests, CancelAfterRejectedLimitTest) {
+  std::vector<action_t> actions = {
+      {action_type::limit, {0, 1000000, 100, side_t::bid, msft, a1}, 0},
+      // no quantity, rejected as order 2
+      {action_type::limit, {0, 1000000, 0, side_t::bid, msft, a1}, 0},
+      {action_type::limit, {0, 990000, 100, side_t::bid, msft, a1}, 0},
+      // order 2 never reached the engine, so this cancels nothing rather than order 3
+      {action_type::cancel, {}, 2},
+      {action_type::cancel, {}, 1},
+      {action_type::limit, {0, 990000, 100, side_t::ask, msft, a1}, 0},
+  };
+  std::vector<char> records(actions.size() * TRACE_RECORD_SIZE);
+  for (std::size_t i = 0; i < actions.size(); ++i) {
+    encode_trace(actions[i], records.data() + i * TRACE_RECORD_SIZE);
+  }
+
+  ladder_engine engine;
+  pipeline<ladder_engine> stages(engine);
+  std::vector<char> published;
+  pipeline_stats stats = stages.run(records, [&published](const char *data, std::size_t size) {
+    published.insert(published.end(), data, data + size);
+  });
+  EXPECT_EQ(stats.rejected, 1);
+  EXPECT_EQ(decode_fills(published), (std::vector<fill_t>{{3, 4, 990000, 100, side_t::ask}}));
+  EXPECT_FALSE(engine.resting(1));
+  EXPECT_FALSE(engine.resting(3));
+}
+
+}  // namespace cupid
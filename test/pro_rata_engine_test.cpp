@@ -0,0 +1,147 @@
+#include <gtest/gtest.h>
+
+#include <random>
+#include <vector>
+#include "engine_interface.h"
+#include "engine_types.h"
+#include "ladder_engine.h"
+#include "pro_rata_engine.h"
+
+namespace cupid {
+
+constexpr instr_t instr = {'A', 'A', 'P', 'L'};
+constexpr trader_t a1 = {'A', '1', '\0', '\0'};
+constexpr trader_t b1 = {'B', '1', '\0', '\0'};
+constexpr trader_t b2 = {'B', '2', '\0', '\0'};
+
+TEST(ProRataEngineTests, ProRataAllocationTest) {
+  pro_rata_engine engine;
+  std::vector<fill_t> fills;
+  auto sink = [&fills](const fill_t &fill, const order_t &) { fills.push_back(fill); };
+  std::vector<price_level_t> levels(4);
+
+  // $100 @ 1000 (id1:100, id2:300, id3:600)
+  engine.limit({0, 1000000, 100, side_t::ask, instr, b1}, sink);
+  engine.limit({0, 1000000, 300, side_t::ask, instr, b2}, sink);
+  engine.limit({0, 1000000, 600, side_t::ask, instr, b1}, sink);
+
+  // half of the level trades, so half of every order does
+  EXPECT_EQ(engine.limit({0, 1000000, 500, side_t::bid, instr, a1}, sink), 4);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{1, 4, 1000000, 50, side_t::bid},
+                                        {2, 4, 1000000, 150, side_t::bid},
+                                        {3, 4, 1000000, 300, side_t::bid}}));
+  ASSERT_EQ(engine.depth(side_t::ask, levels), 1);
+  EXPECT_EQ(levels[0], price_level_t({1000000, 500, 3}));
+
+  // a third of 100 each, the fractions carried along the queue still add up to 100
+  fills.clear();
+  EXPECT_EQ(engine.limit({0, 1000000, 100, side_t::bid, instr, a1}, sink), 5);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{1, 5, 1000000, 10, side_t::bid},
+                                        {2, 5, 1000000, 30, side_t::bid},
+                                        {3, 5, 1000000, 60, side_t::bid}}));
+
+  // more than the level, every order is filled and the rest sweeps on or rests
+  fills.clear();
+  EXPECT_EQ(engine.limit({0, 1000000, 450, side_t::bid, instr, a1}, sink), 6);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{1, 6, 1000000, 40, side_t::bid},
+                                        {2, 6, 1000000, 120, side_t::bid},
+                                        {3, 6, 1000000, 240, side_t::bid}}));
+  EXPECT_EQ(engine.depth(side_t::ask, levels), 0);
+  ASSERT_EQ(engine.depth(side_t::bid, levels), 1);
+  EXPECT_EQ(levels[0], price_level_t({1000000, 50, 1}));
+}
+
+TEST(ProRataEngineTests, RoundingTest) {
+  pro_rata_engine engine;
+  std::vector<fill_t> fills;
+  auto sink = [&fills](const fill_t &fill, const order_t &) { fills.push_back(fill); };
+
+  engine.limit({0, 1000000, 100, side_t::ask, instr, b1}, sink);
+  engine.limit({0, 1000000, 100, side_t::ask, instr, b2}, sink);
+  engine.limit({0, 1000000, 100, side_t::ask, instr, b1}, sink);
+  engine.limit({0, 1000000, 100, side_t::bid, instr, a1}, sink);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{1, 4, 1000000, 33, side_t::bid},
+                                        {2, 4, 1000000, 33, side_t::bid},
+                                        {3, 4, 1000000, 34, side_t::bid}}));
+
+  // a share too small to round to a unit is skipped
+  fills.clear();
+  engine.limit({0, 1000000, 1, side_t::bid, instr, a1}, sink);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{3, 5, 1000000, 1, side_t::bid}}));
+}
+
+TEST(ProRataEngineTests, HybridTest) {
+  pro_rata_engine engine(pro_rata_engine::DEFAULT_MIN_PX, pro_rata_engine::DEFAULT_TICK_SIZE,
+                         pro_rata_engine::DEFAULT_NUM_LEVELS, pro_rata_engine::DEFAULT_ORDER_CAPACITY, 40);
+  std::vector<fill_t> fills;
+  auto sink = [&fills](const fill_t &fill, const order_t &) { fills.push_back(fill); };
+
+  engine.limit({0, 1000000, 100, side_t::ask, instr, b1}, sink);
+  engine.limit({0, 1000000, 300, side_t::ask, instr, b2}, sink);
+  engine.limit({0, 1000000, 600, side_t::ask, instr, b1}, sink);
+
+  // 40% of 500 in time priority, then 300 over the 800 left
+  engine.limit({0, 1000000, 500, side_t::bid, instr, a1}, sink);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{1, 4, 1000000, 100, side_t::bid},
+                                        {2, 4, 1000000, 100, side_t::bid},
+                                        {2, 4, 1000000, 75, side_t::bid},
+                                        {3, 4, 1000000, 225, side_t::bid}}));
+}
+
+TEST(ProRataEngineTests, SelfTradePreventionTest) {
+  pro_rata_engine engine;
+  std::vector<fill_t> fills;
+  auto sink = [&fills](const fill_t &fill, const order_t &) { fills.push_back(fill); };
+  std::vector<price_level_t> levels(4);
+
+  engine.limit({0, 1000000, 100, side_t::ask, instr, a1}, sink);
+  engine.limit({0, 1000000, 100, side_t::ask, instr, b1}, sink);
+  // the own order is cancelled, what is left trades against the rest of the level
+  engine.limit({0, 1000000, 100, side_t::bid, instr, a1, order_type::limit, time_in_force::day,
+                self_trade_prevention::cancel_oldest},
+               sink);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{2, 3, 1000000, 100, side_t::bid}}));
+  EXPECT_FALSE(engine.cancel(1));
+  EXPECT_EQ(engine.depth(side_t::ask, levels), 0);
+
+  // the own order in the middle of the queue is out of the shares, the others are prorated once
+  fills.clear();
+  engine.limit({0, 1000000, 100, side_t::ask, instr, b1}, sink);
+  engine.limit({0, 1000000, 100, side_t::ask, instr, a1}, sink);
+  engine.limit({0, 1000000, 200, side_t::ask, instr, b2}, sink);
+  engine.limit({0, 1000000, 150, side_t::bid, instr, a1, order_type::limit, time_in_force::day,
+                self_trade_prevention::cancel_oldest},
+               sink);
+  EXPECT_EQ(fills, (std::vector<fill_t>{{4, 7, 1000000, 50, side_t::bid}, {6, 7, 1000000, 100, side_t::bid}}));
+  EXPECT_FALSE(engine.cancel(5));
+  ASSERT_EQ(engine.depth(side_t::ask, levels), 1);
+  EXPECT_EQ(levels[0], price_level_t({1000000, 150, 2}));
+}
+
+// with all of every level matched in time priority, the hybrid is the FIFO engine
+TEST(ProRataEngineTests, FullFifoMatchesLadderTest) {
+  pro_rata_engine pro_rata(pro_rata_engine::DEFAULT_MIN_PX, pro_rata_engine::DEFAULT_TICK_SIZE,
+                           pro_rata_engine::DEFAULT_NUM_LEVELS, pro_rata_engine::DEFAULT_ORDER_CAPACITY, 100);
+  ladder_engine ladder;
+  std::vector<fill_t> pro_rata_fills;
+  std::vector<fill_t> ladder_fills;
+  auto pro_rata_sink = [&](const fill_t &fill, const order_t &) { pro_rata_fills.push_back(fill); };
+  auto ladder_sink = [&](const fill_t &fill, const order_t &) { ladder_fills.push_back(fill); };
+  std::mt19937 rng(7);
+  orderid_t limits = 0;
+  for (int i = 0; i < 20000; ++i) {
+    if (limits > 0 && rng() % 4 == 0) {
+      orderid_t orderid = 1 + rng() % limits;
+      EXPECT_EQ(pro_rata.cancel(orderid), ladder.cancel(orderid));
+    } else {
+      order_t order{0, 990000 + (rng() % 21) * 1000, 100 + static_cast<quantity_t>(rng() % 5) * 100,
+                    rng() % 2 == 0 ? side_t::bid : side_t::ask, instr, rng() % 2 == 0 ? a1 : b1};
+      order.stp = static_cast<stp_t>(rng() % 5);
+      limits = pro_rata.limit(order, pro_rata_sink);
+      EXPECT_EQ(ladder.limit(order, ladder_sink), limits);
+    }
+  }
+  EXPECT_EQ(pro_rata_fills, ladder_fills);
+}
+
+}  // namespace cupid
@@ -0,0 +1,130 @@
+#include <gtest/gtest.h>
+
+#include <algorithm>
+#include <random>
+#include <vector>
+#include "default_engine.h"
+#include "engine_interface.h"
+#include "engine_types.h"
+
+namespace cupid {
+
+constexpr instr_t instr = {'A', 'A', 'P', 'L'};
+constexpr trader_t a1 = {'A', '1', '\0', '\0'};
+constexpr trader_t a2 = {'A', '2', '\0', '\0'};
+constexpr trader_t b1 = {'B', '1', '\0', '\0'};
+constexpr trader_t b2 = {'B', '2', '\0', '\0'};
+
+TEST(ReverseVectorEngineTests, PriceTimePriorityTest) {
+  reverse_vector_engine engine;
+
+  // $99 @ 150 (id1:100, id3:50), $98 @ 100 (id2:100) / empty @ 0
+  const auto &[id1, exec1] = engine.limit({0, 990000, 100, side_t::bid, instr, b1});
+  const auto &[id2, exec2] = engine.limit({0, 980000, 100, side_t::bid, instr, b2});
+  const auto &[id3, exec3] = engine.limit({0, 990000, 50, side_t::bid, instr, b2});
+  ASSERT_TRUE(exec1.empty());
+  ASSERT_TRUE(exec2.empty());
+  ASSERT_TRUE(exec3.empty());
+
+  // best price first, then time priority within the price
+  const auto &[id4, exec4] = engine.limit({0, 980000, 200, side_t::ask, instr, a1});
+  EXPECT_EQ(id4, 4);
+  ASSERT_EQ(exec4.size(), 6);
+  EXPECT_EQ(exec4[0], execution_t({1, 990000, 100, side_t::bid, instr, b1}));
+  EXPECT_EQ(exec4[1], execution_t({4, 990000, 100, side_t::ask, instr, a1}));
+  EXPECT_EQ(exec4[2], execution_t({3, 990000, 50, side_t::bid, instr, b2}));
+  EXPECT_EQ(exec4[3], execution_t({4, 990000, 50, side_t::ask, instr, a1}));
+  EXPECT_EQ(exec4[4], execution_t({2, 980000, 50, side_t::bid, instr, b2}));
+  EXPECT_EQ(exec4[5], execution_t({4, 980000, 50, side_t::ask, instr, a1}));
+
+  // $98 @ 50 (id2:50) / empty @ 0
+  // rest asks at several prices and sweep them with one bid
+  const auto &[id5, exec5] = engine.limit({0, 1010000, 100, side_t::ask, instr, a1});
+  const auto &[id6, exec6] = engine.limit({0, 1000000, 100, side_t::ask, instr, a2});
+  const auto &[id7, exec7] = engine.limit({0, 1000000, 100, side_t::ask, instr, a1});
+  const auto &[id8, exec8] = engine.limit({0, 1005000, 250, side_t::bid, instr, b1});
+  EXPECT_EQ(id8, 8);
+  ASSERT_EQ(exec8.size(), 4);
+  EXPECT_EQ(exec8[0], execution_t({6, 1000000, 100, side_t::ask, instr, a2}));
+  EXPECT_EQ(exec8[1], execution_t({8, 1000000, 100, side_t::bid, instr, b1}));
+  EXPECT_EQ(exec8[2], execution_t({7, 1000000, 100, side_t::ask, instr, a1}));
+  EXPECT_EQ(exec8[3], execution_t({8, 1000000, 100, side_t::bid, instr, b1}));
+
+  // $100.5 @ 50 (id8:50), $98 @ 50 (id2:50) / $101 @ 100 (id5:100)
+  const auto &[id9, exec9] = engine.limit({0, 1000000, 100, side_t::ask, instr, a2});
+  ASSERT_EQ(exec9.size(), 2);
+  EXPECT_EQ(exec9[0], execution_t({8, 1005000, 50, side_t::bid, instr, b1}));
+  EXPECT_EQ(exec9[1], execution_t({9, 1005000, 50, side_t::ask, instr, a2}));
+}
+
+TEST(ReverseVectorEngineTests, CancelTest) {
+  reverse_vector_engine engine;
+
+  const auto &[id1, exec1] = engine.limit({0, 990000, 100, side_t::bid, instr, b1});
+  const auto &[id2, exec2] = engine.limit({0, 990000, 100, side_t::bid, instr, b2});
+  const auto &[id3, exec3] = engine.limit({0, 990000, 100, side_t::bid, instr, b1});
+  const auto &[id4, exec4] = engine.limit({0, 1000000, 100, side_t::ask, instr, a1});
+
+  // cancel from the middle of the queue, from the top of book and twice
+  EXPECT_TRUE(engine.cancel(2));
+  EXPECT_FALSE(engine.cancel(2));
+  EXPECT_TRUE(engine.cancel(4));
+  EXPECT_FALSE(engine.cancel(5));
+
+  // $99 @ 200 (id1:100, id3:100) / empty @ 0
+  const auto &[id5, exec5] = engine.limit({0, 990000, 150, side_t::ask, instr, a1});
+  ASSERT_EQ(exec5.size(), 4);
+  EXPECT_EQ(exec5[0], execution_t({1, 990000, 100, side_t::bid, instr, b1}));
+  EXPECT_EQ(exec5[2], execution_t({3, 990000, 50, side_t::bid, instr, b1}));
+
+  // partially filled order can still be cancelled
+  EXPECT_FALSE(engine.cancel(1));
+  EXPECT_TRUE(engine.cancel(3));
+}
+
+// only where the top of book sits differs, so both ends must trade, rest and cancel alike
+TEST(ReverseVectorEngineTests, MatchesDefaultEngineTest) {
+  reverse_vector_engine reverse;
+  default_engine front;
+  std::vector<fill_t> reverse_fills;
+  std::vector<fill_t> front_fills;
+  auto reverse_sink = [&](const fill_t &fill, const order_t &) { reverse_fills.push_back(fill); };
+  auto front_sink = [&](const fill_t &fill, const order_t &) { front_fills.push_back(fill); };
+  std::vector<price_level_t> reverse_levels(8);
+  std::vector<price_level_t> front_levels(8);
+  const trader_t traders[] = {a1, a2, b1, b2};
+  std::mt19937 rng(11);
+  orderid_t limits = 0;
+  for (int i = 0; i < 20000; ++i) {
+    uint32_t action = rng() % 16;
+    if (limits > 0 && action < 4) {
+      orderid_t orderid = 1 + rng() % limits;
+      EXPECT_EQ(reverse.cancel(orderid), front.cancel(orderid));
+    } else if (limits > 0 && action < 6) {
+      orderid_t orderid = 1 + rng() % limits;
+      price_t px = 990000 + (rng() % 21) * 1000;
+      auto qty = 1 + static_cast<quantity_t>(rng() % 300);
+      orderid_t modified = reverse.modify(orderid, px, qty, reverse_sink);
+      EXPECT_EQ(front.modify(orderid, px, qty, front_sink), modified);
+      limits = std::max(limits, modified);
+    } else if (action < 7) {
+      const trader_t &trader = traders[rng() % 4];
+      EXPECT_EQ(reverse.cancel_all(trader), front.cancel_all(trader));
+    } else {
+      order_t order{0, 990000 + (rng() % 21) * 1000, 1 + static_cast<quantity_t>(rng() % 300),
+                    rng() % 2 == 0 ? side_t::bid : side_t::ask, instr, traders[rng() % 4]};
+      order.tif = static_cast<tif_t>(rng() % 3);
+      order.stp = static_cast<stp_t>(rng() % 5);
+      limits = reverse.limit(order, reverse_sink);
+      EXPECT_EQ(front.limit(order, front_sink), limits);
+    }
+    for (side_t side : {side_t::bid, side_t::ask}) {
+      std::size_t n = reverse.depth(side, reverse_levels);
+      ASSERT_EQ(front.depth(side, front_levels), n);
+      EXPECT_TRUE(std::equal(reverse_levels.begin(), reverse_levels.begin() + n, front_levels.begin()));
+    }
+  }
+  EXPECT_EQ(reverse_fills, front_fills);
+}
+
+}  // namespace cupid
@@ -0,0 +1,132 @@
+#include <gtest/gtest.h>
+
+#include <algorithm>
+#include <random>
+#include <vector>
+#include "engine_types.h"
+#include "instrument_router.h"
+#include "ladder_engine.h"
+#include "sharded_runtime.h"
+
+namespace cupid {
+
+constexpr trader_t a1 = {'A', '1', '\0', '\0'};
+
+// random limit orders around $100 over 'num_instruments' symbols, with cancels of earlier orders
+static std::vector<action_t> random_flow(std::size_t num_actions, std::size_t num_instruments) {
+  std::mt19937 rng(42);
+  std::vector<action_t> actions;
+  orderid_t limits = 0;
+  for (std::size_t i = 0; i < num_actions; ++i) {
+    if (limits > 0 && rng() % 4 == 0) {
+      actions.push_back({action_type::cancel, {}, 1 + rng() % limits});
+      continue;
+    }
+    instr_t instr = {'S', static_cast<char>('A' + rng() % num_instruments), '\0', '\0'};
+    side_t side = rng() % 2 == 0 ? side_t::bid : side_t::ask;
+    price_t px = 990000 + (rng() % 21) * 1000;
+    auto qty = static_cast<quantity_t>(100 + rng() % 5 * 100);
+    actions.push_back({action_type::limit, {0, px, qty, side, instr, a1}, 0});
+    ++limits;
+  }
+  return actions;
+}
+
+TEST(ShardedRuntimeTests, MatchesSingleThreadedRouterTest) {
+  std::vector<action_t> actions = random_flow(20000, 7);
+
+  std::vector<fill_t> expected;
+  std::vector<orderid_t> expected_ids;
+  instrument_router<ladder_engine> router(7);
+  for (const auto &action : actions) {
+    if (action.is_limit()) {
+      expected_ids.push_back(
+          router.limit(action.order, [&expected](const fill_t &fill, const order_t &) { expected.push_back(fill); }));
+    } else {
+      router.cancel(action.cancel_id);
+    }
+  }
+
+  // tiny rings so that both the ingress and the shards run into full rings
+  std::vector<fill_t> fills;
+  std::vector<orderid_t> ids;
+  auto sink = [&fills](const fill_t &fill) { fills.push_back(fill); };
+  {
+    sharded_runtime<ladder_engine, 16> runtime(3, 3);
+    for (const auto &action : actions) {
+      orderid_t id = runtime.submit(action, sink);
+      if (action.is_limit()) {
+        ids.push_back(id);
+      }
+    }
+    runtime.flush(sink);
+  }
+  EXPECT_EQ(ids, expected_ids);
+  ASSERT_EQ(fills.size(), expected.size());
+
+  // fills of different shards interleave, but fills of one aggressor stay in matching order
+  std::vector<fill_t> sorted = fills;
+  std::stable_sort(sorted.begin(), sorted.end(),
+                   [](const fill_t &f1, const fill_t &f2) { return f1.aggressor_id < f2.aggressor_id; });
+  EXPECT_EQ(sorted, expected);
+}
+
+TEST(ShardedRuntimeTests, UniverseLimitTest) {
+  std::vector<fill_t> fills;
+  auto sink = [&fills](const fill_t &fill) { fills.push_back(fill); };
+  sharded_runtime<ladder_engine, 16> runtime(2, 1);
+
+  instr_t s1 = {'S', '1', '\0', '\0'};
+  instr_t s2 = {'S', '2', '\0', '\0'};
+  instr_t s3 = {'S', '3', '\0', '\0'};
+  EXPECT_EQ(runtime.submit({action_type::limit, {0, 990000, 100, side_t::bid, s1, a1}, 0}, sink), 1);
+  EXPECT_EQ(runtime.submit({action_type::limit, {0, 990000, 100, side_t::bid, s2, a1}, 0}, sink), 2);
+  // no shard has room for a third instrument, the order is rejected but still consumes an id
+  EXPECT_EQ(runtime.submit({action_type::limit, {0, 990000, 100, side_t::ask, s3, a1}, 0}, sink), 0);
+  EXPECT_EQ(runtime.submit({action_type::cancel, {}, 3}, sink), 0);
+  EXPECT_EQ(runtime.submit({action_type::limit, {0, 990000, 60, side_t::ask, s2, a1}, 0}, sink), 4);
+  EXPECT_EQ(runtime.submit({action_type::cancel, {}, 2}, sink), 0);
+  runtime.flush(sink);
+
+  ASSERT_EQ(fills.size(), 1);
+  EXPECT_EQ(fills[0], fill_t({2, 4, 990000, 60, side_t::ask}));
+}
+
+TEST(ShardedRuntimeTests, BoundedRoutesTest) {
+  std::size_t num_fills = 0;
+  auto sink = [&num_fills](const fill_t &) { ++num_fills; };
+  sharded_runtime<ladder_engine, 16> runtime(2, 2);
+
+  instr_t s1 = {'S', '1', '\0', '\0'};
+  instr_t s2 = {'S', '2', '\0', '\0'};
+  EXPECT_EQ(runtime.submit({action_type::limit, {0, 900000, 100, side_t::bid, s1, a1}, 0}, sink), 1);
+  // orders filled in full, cancelled, trading without resting or never reaching a book only ever
+  // leave the one order resting throughout routed
+  for (int i = 0; i < 10000; ++i) {
+    instr_t instr = i % 2 == 0 ? s1 : s2;
+    orderid_t bid = runtime.submit({action_type::limit, {0, 990000, 100, side_t::bid, instr, a1}, 0}, sink);
+    runtime.submit({action_type::limit, {0, 990000, 100, side_t::ask, instr, a1}, 0}, sink);
+    EXPECT_EQ(runtime.submit({action_type::cancel, {}, bid}, sink), 0);
+    orderid_t ask = runtime.submit({action_type::limit, {0, 1000000, 100, side_t::ask, instr, a1}, 0}, sink);
+    runtime.submit({action_type::cancel, {}, ask}, sink);
+    order_t ioc{0, 980000, 100, side_t::ask, instr, a1, order_type::limit, time_in_force::ioc};
+    runtime.submit({action_type::limit, ioc, 0}, sink);
+    runtime.submit({action_type::reject, {}, 0}, sink);
+    if (i % 1000 == 0) {
+      runtime.flush(sink);
+      EXPECT_EQ(runtime.num_routes(), 1);
+      EXPECT_EQ(runtime.num_shard_routes(), 1);
+    }
+  }
+  runtime.flush(sink);
+  EXPECT_EQ(num_fills, 10000);
+  EXPECT_EQ(runtime.num_routes(), 1);
+  EXPECT_EQ(runtime.num_shard_routes(), 1);
+
+  // the order resting throughout is still cancelled by its runtime id
+  runtime.submit({action_type::cancel, {}, 1}, sink);
+  runtime.flush(sink);
+  EXPECT_EQ(runtime.num_routes(), 0);
+  EXPECT_EQ(runtime.num_shard_routes(), 0);
+}
+}  // namespace cupid
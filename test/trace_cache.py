@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+"""
+Content-addressed cache of generated traces
+A trace is stored under the hash of every parameter that affects its bytes,
+so asking twice for the same trace only generates it once
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+TRACE_SUFFIX = ".bin"
+
+class TraceCache:
+    """a directory of traces with size-based LRU eviction"""
+
+    def __init__(self, root: Path | str, max_bytes: int):
+        assert max_bytes > 0
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(params: Dict[str, Any]) -> str:
+        """stable hash of the generator parameters, independent of dict ordering"""
+        canonical = json.dumps(params, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.root / (key + TRACE_SUFFIX)
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """return the cached trace path if present, and mark it as most recently used"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_or_create(self, params: Dict[str, Any], producer: Callable[[Path], None]) -> Path:
+        """
+        Return the trace for 'params', calling 'producer(tmp_path)' to write it on a miss
+        The trace is written to a temporary file first and renamed into place,
+        so an interrupted run never leaves a truncated trace in the cache
+        """
+        key = self.key(params)
+        path = self.lookup(key)
+        if path is not None:
+            return path
+        path = self.path_for(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            producer(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[Path] = None):
+        """drop least recently used traces until the cache fits in 'max_bytes'"""
+        entries = []
+        total = 0
+        for path in self.root.glob('*' + TRACE_SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+"""
+Slice and concatenate binary traces produced by order_trace_generator.py
+Cancel actions refer to the order id the engine assigns to a limit order,
+which is the count of limit actions so far, so cutting or stitching traces
+shifts every cancel_id. Records are streamed from a mmap in chunks and only
+the cancel_id field of cancel actions is ever rewritten
+"""
+
+import argparse
+import mmap
+import struct
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional
+
+from order_trace_generator import ActionType
+
+# '<b Q Q L b 4s 4s Q', see OrderTraceGenerator.serialize_to_file
+RECORD_SIZE = 38
+CANCEL_ID_OFFSET = 30
+CANCEL_ID = struct.Struct('<Q')
+LIMIT_BYTE = bytes([ActionType.LIMIT])
+CANCEL_BYTE = bytes([ActionType.CANCEL])
+
+CHUNK_RECORDS = 1 << 16
+
+@contextmanager
+def open_trace(path: Path | str) -> Iterator[memoryview]:
+    """map a trace read-only, the view covers whole records only"""
+    with open(path, 'rb') as f:
+        size = Path(path).stat().st_size
+        if size % RECORD_SIZE != 0:
+            raise ValueError(f"{path} is {size} bytes, not a multiple of the {RECORD_SIZE} bytes record")
+        if size == 0:  # mmap refuses empty files
+            yield memoryview(b'')
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                yield view
+            finally:
+                view.release()
+
+def record_count(trace: memoryview) -> int:
+    return len(trace) // RECORD_SIZE
+
+def action_bytes(trace: memoryview, start: int, end: int) -> bytes:
+    """the action byte of records [start, end), one byte per record"""
+    return trace[start * RECORD_SIZE:end * RECORD_SIZE:RECORD_SIZE].tobytes()
+
+def count_limits(trace: memoryview, start: int, end: int) -> int:
+    limits = 0
+    for chunk_start in range(start, end, CHUNK_RECORDS):
+        chunk_end = min(chunk_start + CHUNK_RECORDS, end)
+        limits += action_bytes(trace, chunk_start, chunk_end).count(LIMIT_BYTE)
+    return limits
+
+def copy_rebased(trace: memoryview, start: int, end: int, delta: int, out: BinaryIO) -> int:
+    """
+    Write records [start, end) to 'out' with every cancel_id shifted by 'delta'
+    Cancels whose shifted target falls before the first order id are dropped
+    Return the number of limit records written
+    """
+    limits = 0
+    for chunk_start in range(start, end, CHUNK_RECORDS):
+        chunk_end = min(chunk_start + CHUNK_RECORDS, end)
+        actions = action_bytes(trace, chunk_start, chunk_end)
+        limits += actions.count(LIMIT_BYTE)
+        raw = trace[chunk_start * RECORD_SIZE:chunk_end * RECORD_SIZE]
+        i = actions.find(CANCEL_BYTE)
+        if i == -1 or delta == 0:
+            out.write(raw)
+            continue
+        chunk = bytearray(raw)
+        segment_start = 0
+        while i != -1:
+            record_start = i * RECORD_SIZE
+            cancel_id = CANCEL_ID.unpack_from(chunk, record_start + CANCEL_ID_OFFSET)[0] + delta
+            if cancel_id < 1:
+                # the cancelled order is not part of the output
+                out.write(chunk[segment_start:record_start])
+                segment_start = record_start + RECORD_SIZE
+            else:
+                CANCEL_ID.pack_into(chunk, record_start + CANCEL_ID_OFFSET, cancel_id)
+            i = actions.find(CANCEL_BYTE, i + 1)
+        out.write(chunk[segment_start:])
+    return limits
+
+def slice_trace(path: Path | str, output: Path | str, start: int, end: Optional[int]):
+    with open_trace(path) as trace, open(output, 'wb') as out:
+        count = record_count(trace)
+        end = count if end is None else min(end, count)
+        if not 0 <= start <= end:
+            raise ValueError(f"invalid slice [{start}, {end}) of a {count} records trace")
+        copy_rebased(trace, start, end, -count_limits(trace, 0, start), out)
+
+def concat_traces(paths: List[Path | str], output: Path | str):
+    limits = 0
+    with open(output, 'wb') as out:
+        for path in paths:
+            with open_trace(path) as trace:
+                limits += copy_rebased(trace, 0, record_count(trace), limits, out)
+
+def print_info(path: Path | str):
+    with open_trace(path) as trace:
+        count = record_count(trace)
+        limits = count_limits(trace, 0, count)
+        print(f"{path}: {count} records, {limits} limit, {count - limits} cancel")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Slice or concatenate binary traces while keeping cancel ids consistent')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    slice_parser = subparsers.add_parser('slice', help="Keep the records [start, end) of a trace")
+    slice_parser.add_argument('input', type=str)
+    slice_parser.add_argument('-o', '--output', type=str, required=True, help="The output path for the binary file")
+    slice_parser.add_argument('--start', type=int, default=0, help="Index of the first record kept")
+    slice_parser.add_argument('--end', type=int, default=None, help="Index past the last record kept. default is the end of trace")
+
+    concat_parser = subparsers.add_parser('concat', help="Stitch traces one after another")
+    concat_parser.add_argument('inputs', type=str, nargs='+')
+    concat_parser.add_argument('-o', '--output', type=str, required=True, help="The output path for the binary file")
+
+    info_parser = subparsers.add_parser('info', help="Count the records of traces")
+    info_parser.add_argument('inputs', type=str, nargs='+')
+
+    args = parser.parse_args()
+    try:
+        if args.command == 'slice':
+            slice_trace(args.input, args.output, args.start, args.end)
+        elif args.command == 'concat':
+            concat_traces(args.inputs, args.output)
+        else:
+            for path in args.inputs:
+                print_info(path)
+    except ValueError as e:
+        sys.exit(f"error: {e}")